@@ -0,0 +1,44 @@
+"""
+Per row cost of decoding a CountryField value, constructing a Country every time (the old
+`CountryField.python_value`) against the shared registry.
+
+    python -m benchmarks.country_decode [rows]
+"""
+import random
+import sys
+import timeit
+
+import pycountry
+
+from src.utils.country import Country, CountryRegistry
+
+
+def main(rows: int = 500):
+    codes = [x.alpha_2 for x in pycountry.countries]
+    rng = random.Random(0)
+    sample = [rng.choice(codes[:60]) for _ in range(rows)]
+
+    def construct():
+        for code in sample:
+            try:
+                Country(code)
+            except Exception:
+                pass
+
+    registry = CountryRegistry()
+
+    def lookup():
+        for code in sample:
+            try:
+                registry.get(code)
+            except Exception:
+                pass
+
+    lookup()
+    for name, func in (("construct", construct), ("registry", lookup)):
+        seconds = min(timeit.repeat(func, number=1, repeat=5))
+        print(f"{name:<10} {seconds / rows * 1e6:>10.2f} us/row  ({rows} rows)")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 500)
@@ -0,0 +1,70 @@
+"""
+Picking a random row from a synthetic 100k row SQLite table, `ORDER BY RANDOM() LIMIT 1` against `rand()`.
+
+    python -m benchmarks.random_row [rows]
+"""
+import os
+import random
+import sys
+import tempfile
+import timeit
+
+import peewee
+
+from src.database.random_rows import RandomSelectMixin
+
+database = peewee.SqliteDatabase(None)
+
+
+class Select(RandomSelectMixin, peewee.ModelSelect):
+    pass
+
+
+class Row(peewee.Model):
+    category = peewee.IntegerField(index=True)
+    value = peewee.TextField()
+
+    @classmethod
+    def select(cls, *fields):
+        is_default = not fields
+        return Select(cls, fields or cls._meta.sorted_fields, is_default=is_default)
+
+    class Meta:
+        database = database
+
+
+def fill(rows: int):
+    rng = random.Random(0)
+    database.create_tables([Row])
+    with database.atomic():
+        for start in range(0, rows, 1000):
+            Row.insert_many([{"category": rng.randrange(10), "value": "x" * 40}
+                             for _ in range(start, min(rows, start + 1000))]).execute()
+    # leave gaps in the primary keys, like a table that has seen deletes.
+    Row.delete().where(peewee.SQL("id % 7 = 0")).execute()
+
+
+def main(rows: int = 100_000, number: int = 200):
+    path = os.path.join(tempfile.mkdtemp(), "random_row.sqlite")
+    database.init(path)
+    fill(rows)
+    print(f"{Row.select().count()} rows")
+
+    cases = {
+        "order by random()": lambda: Row.select().order_by(peewee.fn.Random()).limit(1).first(),
+        "rand()": lambda: Row.select().rand().limit(1).first(),
+        "order by random(), filtered": lambda: Row.select().where(Row.category == 3)
+            .order_by(peewee.fn.Random()).limit(1).first(),
+        "rand(), filtered": lambda: Row.select().where(Row.category == 3).rand().limit(1).first(),
+        "rand(), 5 rows": lambda: list(Row.select().rand().limit(5)),
+    }
+    for name, func in cases.items():
+        seconds = min(timeit.repeat(func, number=number, repeat=3)) / number
+        print(f"{name:<30} {seconds * 1000:>8.3f} ms/pick")
+
+    database.close()
+    os.remove(path)
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 100_000)
@@ -0,0 +1,72 @@
+"""
+Per text cost of filling in pigeon placeholders, a regex per placeholder (the old `format_placeholders`)
+against the compiled templates, over the texts in resources/scenarios/scenarios.yml.
+
+    python -m benchmarks.template_render [copies]
+"""
+import os
+import re
+import sys
+import timeit
+
+import yaml
+
+from src.utils import template
+
+VALUES = {
+    "[name]": "McPigeon",
+    "[they]": "she",
+    "[them]": "her",
+    "[their]": "her",
+    "[name2]": "Bob",
+    "[they2]": "they",
+    "[them2]": "them",
+    "[their2]": "their",
+}
+
+
+def with_case(placeholder: str, value: str) -> str:
+    if placeholder.isupper():
+        return value.upper()
+    elif placeholder[1].isupper():
+        return value.capitalize()
+    return value
+
+
+def scenario_texts():
+    path = os.path.join(os.path.dirname(__file__), "..", "resources", "scenarios", "scenarios.yml")
+    with open(path, encoding="utf-8") as file:
+        raw = yaml.safe_load(file)
+    return [scenario["text"]
+            for planet in raw["planets"]
+            for location in planet["locations"]
+            for action in location["actions"]
+            for scenario in action["scenarios"]]
+
+
+def main(copies: int = 20):
+    texts = []
+    for text in scenario_texts():
+        texts.extend([text, text.replace("Your pigeon", "[Name]").replace("your", "[their]")])
+    texts *= copies
+    getters = {k: (lambda raw, value=v: with_case(raw, value)) for k, v in VALUES.items()}
+
+    def regex():
+        for text in texts:
+            for placeholder, value in VALUES.items():
+                pattern = re.compile(re.escape(placeholder), re.IGNORECASE)
+                for match in pattern.findall(text):
+                    text = text.replace(match, with_case(match, value), 1)
+
+    def compiled():
+        for text in texts:
+            template.render(text, getters)
+
+    compiled()
+    for name, func in (("regex", regex), ("templates", compiled)):
+        seconds = min(timeit.repeat(func, number=1, repeat=5))
+        print(f"{name:<10} {seconds / len(texts) * 1e6:>10.2f} us/text  ({len(texts)} texts)")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 20)
@@ -0,0 +1,20 @@
+import discord
+import peewee
+from discord import app_commands
+
+from src import config
+from src.classes import Config, Mode, Settings
+from src.utils.cache import shared_cache
+
+# models read `config` when they are imported, tests run them against in-memory SQLite instead of the server.
+# every connection to it starts out empty, tests create the tables they need on their own connection.
+if config.config is None:
+    config.config = Config(
+        Mode.development,
+        shared_cache,
+        Settings(peewee.SqliteDatabase(":memory:"), peewee.SqliteDatabase(":memory:")),
+        ".",
+        {},
+    )
+    # command modules register on the tree when they are imported.
+    config.config.tree = app_commands.CommandTree(discord.Client(intents=discord.Intents.none()))
@@ -2,10 +2,13 @@ import argparse
 import os.path
 
 import peewee
+from playhouse.pool import PooledMySQLDatabase, PooledSqliteDatabase
 
 from src.disc.bot import Locus
 from src import config
-from src.classes import Mode, Cache, Settings, Config
+from src.classes import Mode, Settings, Config
+from src.database import DatabaseExecutor, ConnectionManager
+from src.utils.cache import shared_cache
 from src.utils.environmental_variables import EnvironmentalVariables
 
 parser = argparse.ArgumentParser()
@@ -29,24 +32,39 @@ def init_environ() -> EnvironmentalVariables:
 
 
 def create_database(environ: EnvironmentalVariables, database_name: str) -> peewee.Database:
+    pool_settings = {
+        "max_connections": int(environ.get("db_max_connections") or 8),
+        "stale_timeout": int(environ.get("db_stale_timeout") or 300),
+        "timeout": 10,
+    }
     if sqlite:
-        db = peewee.SqliteDatabase(f'data/{database_name}.sqlite')
+        db = PooledSqliteDatabase(f'data/{database_name}.sqlite', **pool_settings)
         return db
-    return peewee.MySQLDatabase(
+    return PooledMySQLDatabase(
         database_name,
         user=environ["mysql_user"],
         password=environ["mysql_password"],
         host=environ["mysql_host"],
         port=int(environ["mysql_port"]),
-        charset='utf8mb4'
+        charset='utf8mb4',
+        **pool_settings
     )
 
 
+def create_executor(environ: EnvironmentalVariables,
+                    database: peewee.Database,
+                    connections: ConnectionManager) -> DatabaseExecutor:
+    return DatabaseExecutor(database, max_workers=int(environ.get("db_max_workers") or 4), connections=connections)
+
+
 environ = init_environ()
+base_database = create_database(environ, environ["mysql_db_name"])
+birthday_database = create_database(environ, 'birthday_db')
+connections = ConnectionManager([base_database, birthday_database])
 config.config = Config(
     mode,
-    Cache(),
-    Settings(create_database(environ, environ["mysql_db_name"]), create_database(environ, 'birthday_db')),
+    shared_cache,
+    Settings(base_database, birthday_database, create_executor(environ, base_database, connections), connections),
     PATH,
     environ,
 )
@@ -6,36 +6,21 @@ import peewee
 from discord import app_commands
 from discord.ext import commands
 
+from src.utils.cache import Cache
 from src.utils.environmental_variables import EnvironmentalVariables
 
 
-class Cache:
-    def __init__(self):
-        self.cache = dict()
-
-    def __hash_func_call(self, func, args, kwargs) -> str:
-        return str(hash(func.__name__) + hash(args) + hash(frozenset(kwargs)))
-
-    def __call__(self, category=None):
-        def wrapper(func):
-            def decorator(*args, **kwargs):
-                hash = self.__hash_func_call(func, args, kwargs)
-                cached = self.cache.get(hash)
-                if cached is not None:
-                    return cached
-                result = func(*args, **kwargs)
-                self.cache[hash] = result
-                return result
-
-            return decorator
-
-        return wrapper
-
-
 class Settings:
-    def __init__(self, base_database: peewee.Database, birthday_database: peewee.Database):
+    def __init__(self,
+                 base_database: peewee.Database,
+                 birthday_database: peewee.Database,
+                 executor: 'src.database.DatabaseExecutor' = None,
+                 connections: 'src.database.ConnectionManager' = None
+                 ):
         self.base_database = base_database
         self.birthday_database = birthday_database
+        self.executor = executor
+        self.connections = connections
 
 
 class Mode(enum.Enum):
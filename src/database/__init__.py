@@ -0,0 +1,4 @@
+from .deferred import after_commit, deferred
+from .executor import DatabaseExecutor, ExecutorStats
+from .identity_map import IdentityMap
+from .pool import ConnectionManager
@@ -0,0 +1,35 @@
+import threading
+from contextlib import contextmanager
+from typing import Callable, List, Optional
+
+_local = threading.local()
+
+
+@contextmanager
+def deferred():
+    """
+    Holds back `after_commit` callbacks registered on this thread until the block exits cleanly, drops them when it
+    raises. Enter it outside the transaction, `with deferred(), database.atomic():`, so they run after the commit.
+    """
+    outer: Optional[List[Callable[[], None]]] = getattr(_local, "callbacks", None)
+    callbacks: List[Callable[[], None]] = []
+    _local.callbacks = callbacks
+    try:
+        yield
+    finally:
+        _local.callbacks = outer
+
+    for callback in callbacks:
+        if outer is not None:
+            outer.append(callback)
+        else:
+            callback()
+
+
+def after_commit(callback: Callable[..., None], *args):
+    """Runs `callback` once the enclosing `deferred` block succeeds, right away when there is none."""
+    callbacks = getattr(_local, "callbacks", None)
+    if callbacks is None:
+        callback(*args)
+    else:
+        callbacks.append(lambda: callback(*args))
@@ -0,0 +1,125 @@
+import asyncio
+import contextvars
+import functools
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, TypeVar
+
+import peewee
+
+T = TypeVar("T")
+
+
+class ExecutorStats:
+    __slots__ = ("submitted", "completed", "failed", "queued", "running", "total_wait", "max_wait",
+                 "total_run", "max_run", "_lock")
+
+    def __init__(self):
+        self.submitted = 0
+        self.completed = 0
+        self.failed = 0
+        self.queued = 0
+        self.running = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+        self.total_run = 0.0
+        self.max_run = 0.0
+        self._lock = threading.Lock()
+
+    def on_submit(self):
+        with self._lock:
+            self.submitted += 1
+            self.queued += 1
+
+    def on_start(self, wait: float):
+        with self._lock:
+            self.queued -= 1
+            self.running += 1
+            self.total_wait += wait
+            self.max_wait = max(self.max_wait, wait)
+
+    def on_finish(self, run: float, failed: bool):
+        with self._lock:
+            self.running -= 1
+            self.completed += 1
+            if failed:
+                self.failed += 1
+            self.total_run += run
+            self.max_run = max(self.max_run, run)
+
+    @property
+    def average_wait(self) -> float:
+        return self.total_wait / self.completed if self.completed else 0.0
+
+    @property
+    def average_run(self) -> float:
+        return self.total_run / self.completed if self.completed else 0.0
+
+    def reset(self):
+        with self._lock:
+            self.submitted = self.queued + self.running
+            self.completed = 0
+            self.failed = 0
+            self.total_wait = 0.0
+            self.max_wait = 0.0
+            self.total_run = 0.0
+            self.max_run = 0.0
+
+    def to_dict(self) -> dict:
+        return {
+            "queued": self.queued,
+            "running": self.running,
+            "submitted": self.submitted,
+            "completed": self.completed,
+            "failed": self.failed,
+            "avg_wait_ms": round(self.average_wait * 1000, 2),
+            "max_wait_ms": round(self.max_wait * 1000, 2),
+            "avg_run_ms": round(self.average_run * 1000, 2),
+            "max_run_ms": round(self.max_run * 1000, 2),
+        }
+
+
+class DatabaseExecutor:
+    """Runs blocking peewee work on a bounded thread pool so the event loop keeps serving gateway events."""
+
+    def __init__(self, database: peewee.Database, max_workers: int = 4, connections: 'ConnectionManager' = None):
+        self.database = database
+        self.connections = connections
+        self.max_workers = max_workers
+        self.stats = ExecutorStats()
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="db")
+        self._closed = False
+
+    def _job(self, submitted_at: float, func: Callable[..., T], args, kwargs) -> T:
+        started_at = time.perf_counter()
+        self.stats.on_start(started_at - submitted_at)
+        failed = False
+        try:
+            scope = self.connections.scope() if self.connections else self.database.connection_context()
+            with scope:
+                return func(*args, **kwargs)
+        except BaseException:
+            failed = True
+            raise
+        finally:
+            self.stats.on_finish(time.perf_counter() - started_at, failed)
+
+    async def run(self, func: Callable[..., T], *args, **kwargs) -> T:
+        if self._closed:
+            raise RuntimeError("Database executor has been shut down.")
+        self.stats.on_submit()
+        # the caller's context goes along, so per command instrumentation sees queries run on the pool.
+        context = contextvars.copy_context()
+        job = functools.partial(context.run, self._job, time.perf_counter(), func, args, kwargs)
+        return await asyncio.get_running_loop().run_in_executor(self._pool, job)
+
+    async def fetch(self, query: peewee.Query) -> list:
+        return await self.run(list, query)
+
+    async def first(self, query: peewee.Query):
+        return await self.run(query.first)
+
+    def shutdown(self, wait: bool = True):
+        self._closed = True
+        self._pool.shutdown(wait=wait)
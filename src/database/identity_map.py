@@ -0,0 +1,151 @@
+import asyncio
+import logging
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, Hashable, Iterable, List, Optional, Set, Tuple
+
+import peewee
+
+logger = logging.getLogger(__name__)
+
+
+class IdentityMap:
+    """
+    Keeps one live instance per key so every command mutates the same object.
+    Changes registered through `mark_dirty` are written behind in coalesced bulk updates.
+    """
+
+    def __init__(self,
+                 loader: Callable[[Hashable], peewee.Model],
+                 max_size: int = 2000,
+                 idle_timeout: float = 30 * 60,
+                 flush_interval: float = 5.0):
+        self._loader = loader
+        self.max_size = max_size
+        self.idle_timeout = idle_timeout
+        self.flush_interval = flush_interval
+        self._entries: OrderedDict = OrderedDict()
+        self._dirty: Dict[Tuple[type, int], Tuple[peewee.Model, Set[str]]] = {}
+        self._lock = threading.RLock()
+        self._task: Optional[asyncio.Task] = None
+        self.flushes = 0
+        self.rows_flushed = 0
+        # called with (instance, *fields) on every mark_dirty, for in-memory views that follow the live instances.
+        self.listeners: List[Callable[..., None]] = []
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, key):
+        return key in self._entries
+
+    def get(self, key: Hashable) -> peewee.Model:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                entry[1] = time.monotonic()
+                self._entries.move_to_end(key)
+                return entry[0]
+
+        instance = self._loader(key)
+        with self._lock:
+            # another thread may have loaded it meanwhile, the first one wins.
+            entry = self._entries.setdefault(key, [instance, time.monotonic()])
+            self._entries.move_to_end(key)
+            self._evict()
+            return entry[0]
+
+    def add(self, key: Hashable, instance: peewee.Model) -> peewee.Model:
+        """Seeds `key` with an instance loaded elsewhere, e.g. through a join. An already mapped instance wins."""
+        with self._lock:
+            entry = self._entries.setdefault(key, [instance, time.monotonic()])
+            entry[1] = time.monotonic()
+            self._entries.move_to_end(key)
+            self._evict()
+            return entry[0]
+
+    def mark_dirty(self, instance: peewee.Model, *fields: str):
+        names = set(fields) or {x.name for x in instance.dirty_fields}
+        if not names:
+            return
+        with self._lock:
+            _, existing = self._dirty.setdefault((instance.__class__, instance.get_id()), (instance, set()))
+            existing.update(names)
+        for listener in self.listeners:
+            listener(instance, *names)
+
+    @property
+    def dirty_count(self) -> int:
+        return len(self._dirty)
+
+    def _evict(self):
+        now = time.monotonic()
+        # the most recently used entry is never evicted, it's the one a caller is about to use.
+        for key in list(self._entries.keys())[:-1]:
+            if len(self._entries) <= self.max_size and now - self._entries[key][1] < self.idle_timeout:
+                break
+            instance = self._entries[key][0]
+            if (instance.__class__, instance.get_id()) in self._dirty:
+                continue
+            del self._entries[key]
+
+    def evict_idle(self):
+        with self._lock:
+            self._evict()
+
+    def discard(self, key: Hashable):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def flush(self) -> int:
+        """Writes every pending change synchronously, one UPDATE per model and field set."""
+        with self._lock:
+            pending = self._dirty
+            self._dirty = {}
+
+        if not pending:
+            return 0
+
+        groups: Dict[Tuple[type, frozenset], list] = {}
+        for (cls, _), (instance, fields) in pending.items():
+            groups.setdefault((cls, frozenset(fields)), []).append(instance)
+
+        try:
+            for (cls, fields), instances in groups.items():
+                with cls._meta.database.atomic():
+                    cls.bulk_update(instances, fields=[getattr(cls, x) for x in sorted(fields)])
+                for instance in instances:
+                    instance._dirty.difference_update(fields)
+        except Exception:
+            with self._lock:
+                for key, (instance, fields) in pending.items():
+                    _, existing = self._dirty.setdefault(key, (instance, set()))
+                    existing.update(fields)
+            raise
+
+        self.flushes += 1
+        self.rows_flushed += len(pending)
+        return len(pending)
+
+    async def _run(self, executor):
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            try:
+                await executor.run(self.flush)
+            except Exception:
+                logger.exception("Identity map flush failed, %d changes stay pending", self.dirty_count)
+            self.evict_idle()
+
+    def start(self, executor):
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(self._run(executor))
+
+    def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    def values(self) -> Iterable[peewee.Model]:
+        with self._lock:
+            return [x[0] for x in self._entries.values()]
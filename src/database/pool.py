@@ -0,0 +1,143 @@
+import asyncio
+import functools
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, List
+
+import peewee
+from playhouse.pool import PooledDatabase
+
+logger = logging.getLogger(__name__)
+
+
+class ConnectionManager:
+    """
+    Single connection lifecycle for prefix commands, app command interactions and background tasks.
+
+    Peewee keeps connection state per thread, so every coroutine on the event loop shares one connection.
+    Scopes are reference counted per thread: a connection is checked out of the pool on the first query,
+    the last scope to finish hands it back, no matter how the scopes interleave.
+    """
+
+    def __init__(self, databases: List[peewee.Database]):
+        self.databases = databases
+        self._local = threading.local()
+        self._task = None
+        self.last_health_check: Dict[str, dict] = {}
+
+    @property
+    def _depth(self) -> int:
+        return getattr(self._local, "depth", 0)
+
+    @_depth.setter
+    def _depth(self, value: int):
+        self._local.depth = value
+
+    def acquire(self):
+        # connections are opened lazily by peewee's autoconnect on the first query.
+        self._depth += 1
+
+    def release(self):
+        if self._depth <= 0:
+            return
+        self._depth -= 1
+        if self._depth == 0:
+            for database in self.databases:
+                if database.is_closed():
+                    continue
+                if database.in_transaction():
+                    # closing would roll it back under whoever opened it, the next scope to end hands it back.
+                    logger.warning("Kept the connection to %s open, a transaction is still in progress",
+                                   self._name(database))
+                    continue
+                database.close()
+
+    @contextmanager
+    def scope(self):
+        self.acquire()
+        try:
+            yield self
+        finally:
+            self.release()
+
+    def __enter__(self):
+        self.acquire()
+        return self
+
+    def __exit__(self, *_):
+        self.release()
+
+    def wrap(self, coro_func):
+        """Wraps a coroutine function (task loops, interaction handlers) in a connection scope."""
+        if getattr(coro_func, "__connection_scoped__", False):
+            return coro_func
+
+        @functools.wraps(coro_func)
+        async def wrapper(*args, **kwargs):
+            with self.scope():
+                return await coro_func(*args, **kwargs)
+
+        wrapper.__connection_scoped__ = True
+        return wrapper
+
+    @staticmethod
+    def _name(database: peewee.Database) -> str:
+        return str(database.database)
+
+    def pool_stats(self) -> Dict[str, dict]:
+        stats = {}
+        for database in self.databases:
+            if not isinstance(database, PooledDatabase):
+                stats[self._name(database)] = {"pooled": False, "closed": database.is_closed()}
+                continue
+            stats[self._name(database)] = {
+                "pooled": True,
+                "max": database._max_connections,
+                "in_use": len(database._in_use),
+                "idle": len(database._connections),
+            }
+        return stats
+
+    def health_check(self) -> Dict[str, dict]:
+        """Round-trips `SELECT 1` on every database, stale pooled connections are replaced on checkout."""
+        results = {}
+        for database in self.databases:
+            start = time.perf_counter()
+            try:
+                with self.scope():
+                    database.execute_sql("SELECT 1").fetchone()
+            except peewee.PeeweeException as e:
+                results[self._name(database)] = {"healthy": False, "error": str(e)}
+            else:
+                results[self._name(database)] = {
+                    "healthy": True,
+                    "latency_ms": round((time.perf_counter() - start) * 1000, 2)
+                }
+        self.last_health_check = results
+        return results
+
+    async def _run(self, executor, interval: float):
+        while True:
+            await asyncio.sleep(interval)
+            results = await executor.run(self.health_check)
+            unhealthy = [name for name, result in results.items() if not result["healthy"]]
+            if unhealthy:
+                logger.warning("Unhealthy databases: %s", ", ".join(unhealthy))
+
+    def start(self, executor, interval: float = 5 * 60):
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(self._run(executor, interval))
+
+    def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    def close_all(self):
+        for database in self.databases:
+            if isinstance(database, PooledDatabase):
+                database.close_all()
+            elif not database.is_closed():
+                database.close()
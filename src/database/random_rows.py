@@ -0,0 +1,111 @@
+import random
+from typing import List
+
+import peewee
+
+
+class RandomSelectMixin:
+    """
+    `rand()` for model selects without `ORDER BY RAND()`, which sorts every candidate row on every call.
+
+    With a limit, random primary keys are drawn between the MIN and MAX of the filtered query and the ones that
+    exist are looked up in batches, a uniform sample that costs a few index lookups. Sparse key ranges fall back
+    to sorting the remaining candidates randomly, once. Without a limit every row is returned anyway, those are
+    shuffled client side. Grouped and distinct queries keep sorting randomly in the database.
+    """
+
+    _random = False
+    _rng = None
+    sample_rounds = 3
+    max_batch = 2000
+
+    def rand(self, rng: random.Random = None):
+        clone = self.clone()
+        clone._random = True
+        clone._rng = rng
+        return clone
+
+    def _plain(self):
+        clone = self.clone()
+        clone._random = False
+        clone._cursor_wrapper = None
+        return clone
+
+    def _candidates(self):
+        clone = self._plain()
+        clone._limit = None
+        clone._offset = None
+        clone._order_by = None
+        return clone
+
+    def _random_sql(self):
+        if isinstance(self.model._meta.database, peewee.SqliteDatabase):
+            return peewee.fn.Random()
+        return peewee.fn.Rand()
+
+    def _sample_ids(self, database, n: int, rng) -> List:
+        pk = self.model._meta.primary_key
+        candidates = self._candidates()
+        # two queries, databases only answer a lone MIN or MAX straight from the index.
+        low = candidates.columns(peewee.fn.MIN(pk)).scalar(database)
+        high = candidates.columns(peewee.fn.MAX(pk)).scalar(database)
+        if low is None:
+            return []
+
+        found = []
+        if not isinstance(low, int):
+            rounds = 0
+        elif high - low + 1 <= n * 4:
+            ids = [x for x, in candidates.columns(pk).tuples().execute(database)]
+            return rng.sample(ids, min(n, len(ids)))
+        else:
+            rounds = self.sample_rounds
+
+        batch = n * 4
+        for _ in range(rounds):
+            drawn = [rng.randint(low, high) for _ in range(min(batch, self.max_batch))]
+            existing = {x for x, in candidates.columns(pk).where(pk.in_(drawn)).tuples().execute(database)}
+            for id in drawn:
+                if id in existing and id not in found:
+                    found.append(id)
+                    if len(found) == n:
+                        return found
+            # few hits means a sparse range (a selective filter), draw more next time.
+            batch *= 8
+
+        # sparse ids, a selective filter. sort the candidates that are still missing randomly instead, one query.
+        rest = candidates.columns(pk).order_by(self._random_sql()).limit(n - len(found))
+        if found:
+            rest = rest.where(pk.not_in(found))
+        found.extend(x for x, in rest.tuples().execute(database))
+        return found
+
+    def _execute(self, database):
+        if not self._random or self._cursor_wrapper is not None:
+            return super()._execute(database)
+
+        pk = self.model._meta.primary_key
+        if self._group_by or self._having or self._distinct or not pk or isinstance(pk, peewee.CompositeKey):
+            query = self._plain().order_by(self._random_sql())
+            self._cursor_wrapper = query._execute(database)
+            return self._cursor_wrapper
+
+        rng = self._rng or random
+        if self._limit is None:
+            query = self._plain()
+            wrapper = query._execute(database)
+            wrapper.fill_cache()
+            rng.shuffle(wrapper.row_cache)
+        else:
+            ids = self._sample_ids(database, self._limit, rng)
+            query = self._candidates().where(pk.in_(ids))
+            wrapper = query._execute(database)
+            wrapper.fill_cache()
+            position = {x: i for i, x in enumerate(ids)}
+            if wrapper.row_cache and isinstance(wrapper.row_cache[0], peewee.Model):
+                wrapper.row_cache.sort(key=lambda x: position.get(x.get_id(), 0))
+            elif wrapper.row_cache and isinstance(wrapper.row_cache[0], dict) and pk.name in wrapper.row_cache[0]:
+                wrapper.row_cache.sort(key=lambda x: position.get(x[pk.name], 0))
+
+        self._cursor_wrapper = wrapper
+        return wrapper
@@ -0,0 +1,354 @@
+import asyncio
+import contextvars
+import random
+import threading
+import unittest
+
+import peewee
+
+from src.database import ConnectionManager, DatabaseExecutor, IdentityMap
+from src.database.random_rows import RandomSelectMixin
+
+_value = contextvars.ContextVar("value", default=None)
+
+
+class CountingDatabase(peewee.SqliteDatabase):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.statements = []
+
+    def execute_sql(self, sql, params=None, *args, **kwargs):
+        self.statements.append(sql)
+        return super().execute_sql(sql, params, *args, **kwargs)
+
+
+_database = CountingDatabase(":memory:")
+
+
+class Account(peewee.Model):
+    user_id = peewee.IntegerField(unique=True)
+    gold = peewee.IntegerField(default=0)
+    name = peewee.CharField(default="")
+
+    class Meta:
+        database = _database
+        only_save_dirty = True
+
+
+class RandomSelect(RandomSelectMixin, peewee.ModelSelect):
+    pass
+
+
+class Row(peewee.Model):
+    value = peewee.IntegerField()
+
+    class Meta:
+        database = _database
+
+    @classmethod
+    def select(cls, *fields):
+        is_default = not fields
+        if not fields:
+            fields = cls._meta.sorted_fields
+        return RandomSelect(cls, fields, is_default=is_default)
+
+
+class DatabaseExecutorTest(unittest.TestCase):
+    def setUp(self):
+        self.database = peewee.SqliteDatabase(":memory:")
+        self.connections = ConnectionManager([self.database])
+        self.executor = DatabaseExecutor(self.database, max_workers=2, connections=self.connections)
+        self.addCleanup(self.executor.shutdown)
+
+    def run_async(self, coro):
+        return asyncio.run(coro)
+
+    def test_runs_off_the_calling_thread(self):
+        async def main():
+            return await self.executor.run(threading.current_thread)
+
+        thread = self.run_async(main())
+        self.assertIsNot(thread, threading.current_thread())
+        self.assertTrue(thread.name.startswith("db"))
+
+    def test_context_goes_along(self):
+        async def main():
+            _value.set("invocation")
+            return await self.executor.run(_value.get)
+
+        self.assertEqual(self.run_async(main()), "invocation")
+        self.assertIsNone(_value.get())
+
+    def test_context_changes_stay_on_the_job(self):
+        def change():
+            _value.set("changed")
+
+        async def main():
+            _value.set("caller")
+            await self.executor.run(change)
+            return _value.get()
+
+        self.assertEqual(self.run_async(main()), "caller")
+
+    def test_connection_released_after_job(self):
+        executor = DatabaseExecutor(self.database, max_workers=1, connections=self.connections)
+        self.addCleanup(executor.shutdown)
+
+        def query():
+            self.database.execute_sql("SELECT 1").fetchone()
+            return self.database.is_closed()
+
+        async def main():
+            # a single worker, so the second job sees the connection state the first one left behind.
+            return await executor.run(query), await executor.run(self.database.is_closed)
+
+        self.assertEqual(self.run_async(main()), (False, True))
+
+    def test_stats(self):
+        def fail():
+            raise ValueError()
+
+        async def main():
+            await self.executor.run(int, "1")
+            with self.assertRaises(ValueError):
+                await self.executor.run(fail)
+
+        self.run_async(main())
+        stats = self.executor.stats.to_dict()
+        self.assertEqual((stats["submitted"], stats["completed"], stats["failed"]), (2, 2, 1))
+        self.assertEqual((stats["queued"], stats["running"]), (0, 0))
+
+    def test_shutdown(self):
+        self.executor.shutdown()
+
+        async def main():
+            await self.executor.run(int, "1")
+
+        with self.assertRaises(RuntimeError):
+            self.run_async(main())
+
+
+class ConnectionManagerTest(unittest.TestCase):
+    def setUp(self):
+        self.database = peewee.SqliteDatabase(":memory:")
+        self.connections = ConnectionManager([self.database])
+
+    def query(self):
+        self.database.execute_sql("SELECT 1").fetchone()
+
+    def test_outermost_scope_closes(self):
+        with self.connections.scope():
+            with self.connections.scope():
+                self.query()
+            self.assertFalse(self.database.is_closed())
+        self.assertTrue(self.database.is_closed())
+
+    def test_release_without_scope(self):
+        self.connections.release()
+        with self.connections.scope():
+            self.query()
+        self.assertTrue(self.database.is_closed())
+
+    def test_open_transaction_is_not_closed(self):
+        self.database.connect()
+        self.database.execute_sql("CREATE TABLE t (x INTEGER)")
+        transaction = self.database.atomic()
+        transaction.__enter__()
+        with self.assertLogs("src.database.pool", level="WARNING"):
+            with self.connections.scope():
+                self.database.execute_sql("INSERT INTO t VALUES (1)")
+        self.assertFalse(self.database.is_closed())
+        transaction.__exit__(None, None, None)
+
+        self.assertEqual(self.database.execute_sql("SELECT COUNT(*) FROM t").fetchone()[0], 1)
+        with self.connections.scope():
+            pass
+        self.assertTrue(self.database.is_closed())
+
+
+class IdentityMapTest(unittest.TestCase):
+    def setUp(self):
+        _database.connect()
+        _database.create_tables([Account])
+        for user_id in range(1, 6):
+            Account.create(user_id=user_id, gold=100)
+        self.loaded = []
+        self.addCleanup(_database.close)
+
+    def load(self, user_id: int) -> Account:
+        self.loaded.append(user_id)
+        return Account.get(Account.user_id == user_id)
+
+    def updates(self) -> int:
+        return sum(1 for x in _database.statements if x.startswith("UPDATE"))
+
+    def test_one_instance_per_key(self):
+        humans = IdentityMap(self.load)
+        self.assertIs(humans.get(1), humans.get(1))
+        self.assertEqual(self.loaded, [1])
+        seeded = Account.get(Account.user_id == 2)
+        self.assertIs(humans.add(2, seeded), seeded)
+        # the mapped instance wins over one loaded elsewhere.
+        self.assertIs(humans.add(2, Account.get(Account.user_id == 2)), seeded)
+
+    def test_evicts_least_recently_used(self):
+        humans = IdentityMap(self.load, max_size=2)
+        humans.get(1)
+        humans.get(2)
+        humans.get(1)
+        humans.get(3)
+        self.assertEqual(len(humans), 2)
+        self.assertIn(1, humans)
+        self.assertNotIn(2, humans)
+
+    def test_evicts_idle(self):
+        humans = IdentityMap(self.load, idle_timeout=0)
+        humans.get(1)
+        humans.get(2)
+        # the entry that was just used is kept.
+        self.assertEqual(list(humans.values()), [humans.get(2)])
+
+    def test_dirty_entries_are_not_evicted(self):
+        humans = IdentityMap(self.load, max_size=1)
+        account = humans.get(1)
+        account.gold += 5
+        humans.mark_dirty(account, "gold")
+        humans.get(2)
+        humans.get(3)
+        self.assertIn(1, humans)
+        humans.flush()
+        humans.get(4)
+        self.assertNotIn(1, humans)
+
+    def test_flush_coalesces_into_bulk_updates(self):
+        humans = IdentityMap(self.load)
+        for user_id in (1, 2, 3):
+            account = humans.get(user_id)
+            account.gold += user_id
+            humans.mark_dirty(account, "gold")
+        account = humans.get(1)
+        account.gold += 10
+        humans.mark_dirty(account, "gold")
+        account = humans.get(4)
+        account.name = "renamed"
+        humans.mark_dirty(account)
+
+        _database.statements.clear()
+        self.assertEqual(humans.flush(), 4)
+        # one UPDATE per field set, not per row.
+        self.assertEqual(self.updates(), 2)
+        self.assertEqual(humans.dirty_count, 0)
+        self.assertFalse(humans.get(1).dirty_fields)
+        rows = dict(Account.select(Account.user_id, Account.gold).tuples())
+        self.assertEqual(rows, {1: 111, 2: 102, 3: 103, 4: 100, 5: 100})
+        self.assertEqual(Account.get(Account.user_id == 4).name, "renamed")
+        self.assertEqual(humans.flush(), 0)
+
+    def test_failed_flush_keeps_changes(self):
+        humans = IdentityMap(self.load)
+        account = humans.get(1)
+        account.gold += 50
+        humans.mark_dirty(account, "gold")
+
+        _database.drop_tables([Account])
+        with self.assertRaises(peewee.OperationalError):
+            humans.flush()
+        self.assertEqual(humans.dirty_count, 1)
+
+        # changes made after the failure are merged into the pending ones.
+        account.name = "renamed"
+        humans.mark_dirty(account, "name")
+        _database.create_tables([Account])
+        Account.create(user_id=1, gold=100)
+        self.assertEqual(humans.flush(), 1)
+        row = Account.get(Account.user_id == 1)
+        self.assertEqual((row.gold, row.name), (150, "renamed"))
+
+    def test_failed_background_flush_is_logged(self):
+        class Executor:
+            async def run(self, func):
+                raise peewee.OperationalError("database is gone")
+
+        humans = IdentityMap(self.load, flush_interval=0)
+        account = humans.get(1)
+        account.gold += 1
+        humans.mark_dirty(account, "gold")
+
+        async def main():
+            humans.start(Executor())
+            await asyncio.sleep(0.01)
+            humans.stop()
+
+        with self.assertLogs("src.database.identity_map", level="ERROR"):
+            asyncio.run(main())
+        self.assertEqual(humans.dirty_count, 1)
+
+    def test_listeners(self):
+        humans = IdentityMap(self.load)
+        calls = []
+        humans.listeners.append(lambda instance, *fields: calls.append((instance.user_id, fields)))
+        account = humans.get(1)
+        account.gold += 1
+        humans.mark_dirty(account, "gold")
+        humans.flush()
+        # nothing changed, nothing to tell.
+        humans.mark_dirty(account)
+        self.assertEqual(calls, [(1, ("gold",))])
+
+
+class RandomSelectTest(unittest.TestCase):
+    def setUp(self):
+        _database.connect()
+        _database.create_tables([Row])
+        self.addCleanup(_database.close)
+
+    def create(self, ids, value: int = 0):
+        Row.insert_many([{"id": x, "value": value} for x in ids]).execute()
+
+    def random_sorts(self) -> int:
+        return sum(1 for x in _database.statements if "RANDOM()" in x.upper())
+
+    def sample(self, query, n: int):
+        _database.statements.clear()
+        ids = [x.id for x in query.rand(random.Random(0)).limit(n)]
+        self.assertEqual(len(ids), len(set(ids)))
+        return ids
+
+    def test_dense_ids(self):
+        self.create(range(1, 1001))
+        ids = self.sample(Row.select(), 10)
+        self.assertEqual(len(ids), 10)
+        self.assertEqual(self.random_sorts(), 0)
+
+    def test_limit_over_the_row_count(self):
+        self.create([1, 5, 9])
+        self.assertEqual(sorted(self.sample(Row.select(), 10)), [1, 5, 9])
+
+    def test_gapped_ids(self):
+        self.create(range(1, 11))
+        self.create([10 ** 6])
+        ids = self.sample(Row.select(), 20)
+        self.assertEqual(sorted(ids), [*range(1, 11), 10 ** 6])
+        self.assertEqual(self.random_sorts(), 1)
+
+    def test_filtered_sparse_ids(self):
+        self.create(range(1, 5001))
+        Row.update(value=1).where(Row.id.in_(list(range(10, 5001, 1000)))).execute()
+        ids = self.sample(Row.select().where(Row.value == 1), 3)
+        self.assertEqual(len(ids), 3)
+        self.assertTrue(set(ids) <= set(range(10, 5001, 1000)))
+        self.assertEqual(self.random_sorts(), 1)
+
+    def test_no_match(self):
+        self.create(range(1, 11))
+        self.assertEqual(self.sample(Row.select().where(Row.value == 1), 3), [])
+
+    def test_without_limit(self):
+        self.create(range(1, 51))
+        rows = list(Row.select().rand(random.Random(0)))
+        self.assertEqual(sorted(x.id for x in rows), list(range(1, 51)))
+        self.assertNotEqual([x.id for x in rows], list(range(1, 51)))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,19 +1,30 @@
 import asyncio
 import datetime
+import hashlib
+import json
 import os
+import traceback
+from typing import Optional
 
 import discord
 import peewee
 import praw
 from dateutil.relativedelta import relativedelta
+from discord import app_commands
 from discord.ext import commands
 
 from src.classes import Mode, Config
+from src.database import DatabaseExecutor, IdentityMap, ConnectionManager
 from src.disc.errors.base import SendableException
 from src.disc.helpers.embed import Embed
 from src.disc.helpers.general import Translator
+from src.disc.helpers.instrumentation import CommandMetrics
 from src.disc.helpers.known_guilds import KnownGuild
+from src.disc.helpers.ratelimit import RateLimiter, refund
+from src.disc.helpers.startup import ExtensionLoader, StartupReport
 from src.disc.helpers.waiters.base import Cancelled
+from src.disc.helpers.watchdog import LoopWatchdog
+from src.utils.country import countries
 from src.wrappers.hue_bridge import HueBridgeCall
 from src.wrappers.openweathermap import OpenWeatherMapApi
 
@@ -34,11 +45,66 @@ class classproperty(property):
         return classmethod(self.fget).__get__(None, owner)()
 
 
+class LocusCommandTree(app_commands.CommandTree):
+    async def _call(self, interaction: discord.Interaction):
+        with self.client.connections.scope():
+            invocation = self.client.metrics.start("/")
+            try:
+                await super()._call(interaction)
+            finally:
+                name = None
+                if interaction.command is not None:
+                    name = "/" + interaction.command.qualified_name
+                    if interaction.type == discord.InteractionType.autocomplete:
+                        name += " (autocomplete)"
+                self.client.metrics.finish(invocation, name)
+
+    async def interaction_check(self, interaction: discord.Interaction) -> bool:
+        if interaction.type != discord.InteractionType.application_command:
+            return True
+        retry_after = self.client.get_retry_after(interaction.user.id)
+        if retry_after:
+            await interaction.response.send_message(embed=self.client.get_cooldown_embed(retry_after),
+                                                    ephemeral=True)
+            return False
+        return True
+
+    async def on_error(self, interaction: discord.Interaction, error: app_commands.AppCommandError):
+        if isinstance(error, app_commands.CheckFailure):
+            refund(interaction)
+        if isinstance(error, app_commands.CommandOnCooldown):
+            embed = self.client.get_cooldown_embed(error.retry_after)
+            if interaction.response.is_done():
+                await interaction.followup.send(embed=embed, ephemeral=True)
+            else:
+                await interaction.response.send_message(embed=embed, ephemeral=True)
+            return
+        await super().on_error(interaction, error)
+
+    def payload_hash(self, guild: discord.abc.Snowflake = None) -> str:
+        """Stable hash of what `sync` would upload, commands are sorted since cogs load in any order."""
+        payload = [x.to_dict(self) for x in self.get_commands(guild=guild)]
+        payload.sort(key=lambda x: (x.get("type", 1), x["name"]))
+        return hashlib.sha256(json.dumps(payload, sort_keys=True, default=str).encode()).hexdigest()
+
+    @staticmethod
+    def load_hashes(path: str) -> dict:
+        try:
+            with open(path) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    @staticmethod
+    def save_hashes(path: str, hashes: dict):
+        with open(path, "w") as f:
+            json.dump(hashes, f, indent=2, sort_keys=True)
+
+
 class Locus(commands.Bot):
     _instance: 'Locus' = None
 
-    cooldowns = {}
-    cooldowned_users = []
+    cooldowned_users = set()
     owner = None
 
     sendables = (
@@ -73,13 +139,22 @@ class Locus(commands.Bot):
             return "."
 
     def __init__(self, config: Config):
-        super().__init__(intents=discord.Intents.all(), command_prefix=self.__get_prefix(config))
+        self.connections = config.settings.connections or ConnectionManager([config.settings.base_database])
+        super().__init__(intents=discord.Intents.all(), command_prefix=self.__get_prefix(config),
+                         tree_cls=LocusCommandTree)
 
         HueBridgeCall.set_ip("192.168.178.10")
         self.__class__._instance = self
         self.config = config
         self.config.bot = self
-        self._human_cache = {}
+        self.humans = IdentityMap(self._load_human)
+        self.executor = config.settings.executor or DatabaseExecutor(config.settings.base_database,
+                                                                     connections=self.connections)
+        self.startup = StartupReport()
+        self.leaderboards_task: Optional[asyncio.Task] = None
+        self.metrics = CommandMetrics()
+        self.metrics.install(self.connections.databases, self.http)
+        self.watchdog = LoopWatchdog()
         self.heroku = False
         self.restarting = False
         self.production = config.mode == Mode.production
@@ -97,6 +172,8 @@ class Locus(commands.Bot):
             check_for_async=False
         )
 
+        self.cooldown_limiter = RateLimiter(1, 60)
+        self.check_once(self.check_rate_limits)
         self.before_invoke(self.before_any_command)
         self.after_invoke(self.after_any_command)
 
@@ -121,30 +198,29 @@ class Locus(commands.Bot):
         await self.load_extension("src.disc.cogs." + name)
 
     async def load_all_cogs(self):
-        cogs = [
-            "profile",
-            "conversions.cog",
-            "management",
-            "reddit",
-            "reminders.cog",
-            "games",
-            "admin",
-            "misc",
-            "prank",
-            "pigeon.cog",
-            "custom.c3po.cog",
-            "custom.crossroad.cog",
-            "custom.pub.cog",
-            "custom.shared.cog",
-            "birthdayreminders.cog",
-        ]
-
-        for cog in cogs:
-            await self.load_cog(cog)
-
-        await self.load_extension("src.disc.commands.pigeon.commands")
-        await self.load_extension("src.disc.commands.pet.commands")
-        # await self.load_extension("src.disc.commands.calamity.commands")
+        cogs = "src.disc.cogs."
+        # extension -> extensions that have to be loaded before it.
+        extensions = {
+            cogs + "profile": (),
+            cogs + "conversions.cog": (),
+            cogs + "management": (),
+            cogs + "reddit": (),
+            cogs + "reminders.cog": (),
+            cogs + "games": (),
+            cogs + "admin": (),
+            cogs + "misc": (),
+            cogs + "prank": (),
+            cogs + "pigeon.cog": (cogs + "conversions.cog",),
+            cogs + "custom.shared.cog": (),
+            cogs + "custom.c3po.cog": (cogs + "custom.shared.cog",),
+            cogs + "custom.crossroad.cog": (cogs + "custom.shared.cog",),
+            cogs + "custom.pub.cog": (cogs + "custom.shared.cog",),
+            cogs + "birthdayreminders.cog": (),
+            "src.disc.commands.pigeon.commands": (cogs + "pigeon.cog",),
+            "src.disc.commands.pet.commands": (),
+            # "src.disc.commands.calamity.commands": (),
+        }
+        await ExtensionLoader(self, self.startup).load(extensions)
 
     @staticmethod
     def get_id(obj):
@@ -189,31 +265,59 @@ class Locus(commands.Bot):
 
         return wrapper
 
+    @staticmethod
+    def _load_human(user_id):
+        from src.models import Human
+        human, _ = Human.get_or_create(user_id=user_id)
+        return human
+
     def get_human(self, ctx=None, user=None):
         """Cached human, with updated gold."""
-        from src.models import Human
         user = user or ctx.author
-        user_id = self.get_id(user)
-        human = self._human_cache.get(user_id)
-        if human is None:
-            human, _ = Human.get_or_create(user_id=user_id)
-            self._human_cache[user_id] = human
-        else:
-            return human
-        return self._human_cache[user_id]
+        return self.humans.get(self.get_id(user))
+
+    def flush_humans(self) -> int:
+        """Writes pending human changes right away, for commands that read their own writes back from the db."""
+        return self.humans.flush()
+
+    async def run_db(self, func, *args, **kwargs):
+        """Runs blocking ORM work on the database executor instead of the event loop."""
+        return await self.executor.run(func, *args, **kwargs)
+
+    async def fetch_human(self, ctx=None, user=None):
+        return await self.run_db(self.get_human, ctx, user=user)
 
     @staticmethod
     def translate(key, locale="en_US"):
         return Translator.translate(key, locale)
 
-    async def before_any_command(self, ctx):
-        ctx.db = self.config.settings.base_database.connection_context()
-        ctx.db.__enter__()
+    def get_retry_after(self, user_id: int) -> float:
+        """Seconds a user the owner put on cooldown has to wait before using any command, 0 when they can go ahead."""
+        if user_id in self.cooldowned_users:
+            return self.cooldown_limiter.hit(user_id)
+        return 0.0
+
+    def check_rate_limits(self, ctx) -> bool:
+        # a global check, so it runs before the before_invoke hooks and any database work.
+        retry_after = self.get_retry_after(ctx.author.id)
+        if retry_after:
+            raise commands.errors.CommandOnCooldown(self.cooldown_limiter.cooldown, retry_after,
+                                                    commands.BucketType.user)
+        return True
+
+    def get_cooldown_embed(self, retry_after: float) -> discord.Embed:
+        embed = Embed.error(f"You are on cooldown. Try again in {seconds_readable(retry_after)}")
+        embed.set_footer(text=self.translate("available_again_at"))
+        embed.timestamp = datetime.datetime.utcnow() + datetime.timedelta(seconds=retry_after)
+        return embed
 
+    async def before_any_command(self, ctx):
         ctx.translate = lambda x: Translator.translate(x, "en_US")
 
         ctx.get_id = self.get_id
         ctx.get_human = lambda user=None: self.get_human(ctx, user=user)
+        ctx.fetch_human = lambda user=None: self.fetch_human(ctx, user=user)
+        ctx.run_db = self.run_db
 
         ctx.success = self.success(ctx)
         ctx.error = self.error(ctx)
@@ -222,18 +326,13 @@ class Locus(commands.Bot):
 
         ctx.guild_color = self.get_dominant_color()
 
-        timeout = 60
-        if ctx.author.id in self.cooldowned_users:
-            if ctx.author.id not in self.cooldowns:
-                self.cooldowns[ctx.author.id] = datetime.datetime.utcnow()
-            else:
-                difference_in_seconds = (datetime.datetime.utcnow() - self.cooldowns[ctx.author.id]).seconds
-                if difference_in_seconds != 0 and difference_in_seconds < timeout:
-                    raise commands.errors.CommandOnCooldown(None, retry_after=(timeout - difference_in_seconds))
-                else:
-                    self.cooldowns[ctx.author.id] = datetime.datetime.utcnow()
+        # entered last, after_invoke hooks don't run when a before_invoke hook raises.
+        ctx.db = self.connections.scope()
+        ctx.db.__enter__()
+        ctx.invocation = self.metrics.start(ctx.command.qualified_name)
 
     async def after_any_command(self, ctx):
+        self.metrics.finish(ctx.invocation)
         ctx.db.__exit__(None, None, None)
 
     async def on_command_error(self, ctx, error):
@@ -242,44 +341,125 @@ class Locus(commands.Bot):
         else:
             exception = error
 
+        if isinstance(exception, commands.errors.CheckFailure):
+            refund(ctx)
         if isinstance(exception, commands.errors.MissingPermissions):
             await self.owner.send(
                 f"```\nCommand '{ctx.command}' in '{ctx.author}' in {ctx.guild.id if ctx.guild else ''} Error: '{exception}'```")
         elif isinstance(exception, commands.errors.CommandOnCooldown):
-            embed = Embed.error(f"You are on cooldown. Try again in {seconds_readable(exception.retry_after)}")
-            embed.set_footer(text=self.translate("available_again_at"))
-            embed.timestamp = datetime.datetime.utcnow() + datetime.timedelta(seconds=exception.retry_after)
-            asyncio.gather(ctx.send(embed=embed))
+            asyncio.gather(ctx.send(embed=self.get_cooldown_embed(exception.retry_after)))
         elif isinstance(exception, self.sendables):
             asyncio.gather(ctx.send(embed=Embed.error(str(exception))))
         elif not isinstance(exception, self.ignorables):
             await self.owner.send(f"```\nCommand '{ctx.command}' Error: '{exception}'```")
             raise error
 
-    async def _sync_to_guild(self, guild_id: int):
-        self.tree.copy_global_to(guild=discord.Object(id=guild_id))
-        await self.tree.sync(guild=discord.Object(id=guild_id))
+    async def _sync_to_guild(self, hashes: dict, guild_id: int = None, force: bool = False) -> bool:
+        guild = discord.Object(id=guild_id) if guild_id is not None else None
+        key = f"{self.application_id}:{guild_id or 'global'}"
+        digest = self.tree.payload_hash(guild)
+        if not force and hashes.get(key) == digest:
+            return False
+
+        with self.startup.measure(f"tree {guild_id or 'global'}", "sync"):
+            await self.tree.sync(guild=guild)
+        hashes[key] = digest
+        return True
+
+    async def sync_tree(self, force: bool = False) -> list:
+        """Syncs the guilds whose command tree changed since the last sync, or every guild when forced."""
+        guild_ids = [1163169122868269187]
+        if not self.production:
+            guild_ids += [761624318291476482, 1013158959315701930]
+        for guild_id in guild_ids:
+            self.tree.copy_global_to(guild=discord.Object(id=guild_id))
+        if self.production:
+            guild_ids.append(None)
+
+        path = f"{self.config.path}/tmp/command_tree.json"
+        hashes = self.tree.load_hashes(path)
+        results = await asyncio.gather(*[self._sync_to_guild(hashes, x, force=force) for x in guild_ids],
+                                       return_exceptions=True)
+        self.tree.save_hashes(path, hashes)
+
+        for result in results:
+            if isinstance(result, BaseException):
+                raise result
+        return [x or "global" for x, synced in zip(guild_ids, results) if synced]
 
     def init_sqlite_db(self):
         if not isinstance(self.config.settings.base_database, peewee.SqliteDatabase):
             raise Exception('Wtf')
         from src.resources import process_scenarios
-        process_scenarios()
+        from src.disc.commands.pigeon.catalog import scenario_catalog
+        report = process_scenarios()
+        print(report.format())
+        if report.changed:
+            scenario_catalog.reload()
 
     async def setup_hook(self):
-        import src.disc.commands
-        await self.load_all_cogs()
-
-        await self._sync_to_guild(1163169122868269187)
-        if self.production:
-            await self.tree.sync()
-        else:
-            await self._sync_to_guild(761624318291476482)
-            await self._sync_to_guild(1013158959315701930)
+        with self.startup.phase("import"):
+            import src.disc.commands
+        with self.startup.phase("cogs"):
+            await self.load_all_cogs()
+        with self.startup.phase("sync"):
+            synced = await self.sync_tree()
+        print(f"Synced command tree for: {', '.join(map(str, synced)) or 'nothing, unchanged'}")
 
         if self.config.create_test:
             self.init_sqlite_db()
 
+        from src.models import leaderboards
+        self.humans.listeners.append(leaderboards.on_human_changed)
+        # scoreboards are served from memory, built once here and kept current by the save hooks.
+        self.leaderboards_task = asyncio.create_task(self._rebuild_leaderboards())
+
+        self.humans.start(self.executor)
+        self.connections.start(self.executor)
+        # builds the shared country registry off the loop, every CountryField read after that is a dict lookup.
+        self.loop.run_in_executor(None, countries.load)
+        self.metrics.start_writer(f"{self.config.path}/tmp/command_stats.json")
+        self.watchdog.start(f"{self.config.path}/tmp/loop_lag.json")
+
+        self.startup.track_ready_listeners(self)
+        asyncio.create_task(self._report_startup())
+
+    def _build_leaderboards(self) -> dict:
+        from src.models import leaderboards
+        # the gold board is read from the table, pending gold has to be in it first.
+        self.flush_humans()
+        return leaderboards.rebuild_all()
+
+    async def _rebuild_leaderboards(self):
+        try:
+            sizes = await self.executor.run(self._build_leaderboards)
+        except Exception:
+            print("Could not build the leaderboards, scoreboards stay empty until the next rebuild:")
+            traceback.print_exc()
+            return
+        print(f"Leaderboards built: {', '.join(f'{k}={v}' for k, v in sizes.items())}")
+
+    async def _report_startup(self):
+        with self.startup.phase("connect"):
+            await self.wait_until_ready()
+        with self.startup.phase("on_ready"):
+            await self.startup.wait_for_ready_listeners()
+        print(self.startup.format())
+        try:
+            self.startup.save(f"{self.config.path}/tmp/startup.jsonl")
+        except OSError as e:
+            print(f"Could not save the startup report: {e}")
+
+    async def close(self):
+        await super().close()
+        self.humans.stop()
+        self.connections.stop()
+        self.metrics.stop()
+        self.watchdog.stop()
+        await self.executor.run(self.humans.flush)
+        self.executor.shutdown(wait=True)
+        self.connections.close_all()
+
     def log(self, message: str):
         if self.owner is not None:
             asyncio.gather(self.owner.send(message))
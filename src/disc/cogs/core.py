@@ -17,6 +17,7 @@ class BaseCog(commands.Cog):
             check = check()
 
         if check:
+            task.coro = Locus.instance.connections.wrap(task.coro)
             task.add_exception_type(peewee.OperationalError)
             task.add_exception_type(peewee.InterfaceError)
             try:
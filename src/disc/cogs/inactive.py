@@ -7,7 +7,7 @@ from src.config import config
 from src.disc.cogs.core import BaseCog
 from src.disc.helpers.known_guilds import KnownGuild
 from src.disc.helpers.waiters import BoolWaiter
-from src.models import Earthling, database
+from src.models import Earthling
 
 
 class Inactive(BaseCog):
@@ -22,7 +22,7 @@ class Inactive(BaseCog):
         if member.bot:
             return
 
-        with database.connection_context():
+        with self.bot.connections.scope():
             now = datetime.datetime.utcnow()
             query = Earthling.update(last_active=now)
             query = query.where(Earthling.user_id == member.id)
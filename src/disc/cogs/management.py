@@ -1,5 +1,6 @@
 from discord.ext import commands
 
+from src.config import config
 from src.disc.cogs.core import BaseCog
 from src.disc.errors.base import SendableException
 from src.disc.helpers.general import Translator
@@ -21,11 +22,99 @@ class Management(BaseCog):
     @commands.command(aliases=["daizy"])
     async def cooldown(self, ctx, user: discord.User):
         if user.id in ctx.bot.cooldowned_users:
-            ctx.bot.cooldowned_users.remove(user.id)
+            ctx.bot.cooldowned_users.discard(user.id)
         else:
-            ctx.bot.cooldowned_users.append(user.id)
+            ctx.bot.cooldowned_users.add(user.id)
+        ctx.bot.cooldown_limiter.reset(user.id)
         await ctx.send("OK")
 
+    @commands.is_owner()
+    @commands.command(name="dbstats")
+    async def db_stats(self, ctx, reset: bool = False):
+        executor = ctx.bot.executor
+        lines = [f"workers: {executor.max_workers}"]
+        for key, value in executor.stats.to_dict().items():
+            lines.append(f"{key}: {value}")
+        for name, stats in ctx.bot.connections.pool_stats().items():
+            lines.append(f"{name}: " + ", ".join(f"{key}={value}" for key, value in stats.items()))
+        for name, result in ctx.bot.connections.last_health_check.items():
+            lines.append(f"{name} health: " + ", ".join(f"{key}={value}" for key, value in result.items()))
+        if reset:
+            executor.stats.reset()
+        await ctx.send("```\n{}```".format("\n".join(lines)))
+
+    @commands.is_owner()
+    @commands.command(name="cachestats")
+    async def cache_stats(self, ctx, clear: str = None):
+        if clear is not None:
+            config.cache.invalidate(None if clear == "all" else clear)
+
+        lines = []
+        for name, stats in config.cache.stats().items():
+            values = ", ".join(f"{key}={value}" for key, value in stats.items())
+            lines.append(f"{name}: {values}")
+        await ctx.send("```\n{}```".format("\n".join(lines) or "empty"))
+
+    @commands.is_owner()
+    @commands.command(name="cmdstats")
+    async def command_stats(self, ctx, reset: bool = False):
+        lines = [f"{'command':<28}{'n':>6}{'p50':>8}{'p95':>8}{'p99':>8}{'db95':>8}{'http95':>8}{'q95':>5}{'qmax':>5}{'sv95':>5}"]
+        for name, data in ctx.bot.metrics.top():
+            lines.append(f"{name[:27]:<28}{data['count']:>6}{data['wall_p50']:>8}{data['wall_p95']:>8}"
+                         f"{data['wall_p99']:>8}{data['db_p95']:>8}{data['http_p95']:>8}"
+                         f"{int(data['queries_p95']):>5}{int(data['queries_max']):>5}{int(data['saved_p95']):>5}")
+        if reset:
+            ctx.bot.metrics.reset()
+        await ctx.send("```\n{}```".format("\n".join(lines)))
+
+    @commands.is_owner()
+    @commands.command(name="lagstats")
+    async def lag_stats(self, ctx, reset: bool = False):
+        text = ctx.bot.watchdog.format()
+        if reset:
+            ctx.bot.watchdog.reset()
+        await ctx.send("```\n{}```".format(text[:1990]))
+
+    @commands.is_owner()
+    @commands.command(name="startup")
+    async def startup_report(self, ctx):
+        await ctx.send("```\n{}```".format(ctx.bot.startup.format()))
+
+    @commands.is_owner()
+    @commands.command(name="resync")
+    async def resync_tree(self, ctx):
+        synced = await ctx.bot.sync_tree(force=True)
+        await ctx.success("Synced: " + ", ".join(map(str, synced)))
+
+    @commands.is_owner()
+    @commands.command(name="scenarios")
+    async def reload_scenarios(self, ctx, from_yaml: bool = False):
+        from src.disc.commands.pigeon.catalog import scenario_catalog
+        lines = []
+        if from_yaml:
+            from src.resources import process_scenarios
+            report = await ctx.bot.executor.run(process_scenarios)
+            lines.append(report.format())
+        catalog = await ctx.bot.executor.run(scenario_catalog.reload)
+        scenarios = sum(len(x.scenarios) for x in catalog.actions.values())
+        lines.append(f"{len(catalog.planets)} planets, {len(catalog.locations)} locations, "
+                     f"{len(catalog.actions)} actions, {scenarios} scenarios loaded.")
+        await ctx.send("```\n{}```".format("\n".join(lines)))
+
+    @commands.is_owner()
+    @commands.command(name="reconcile")
+    async def reconcile_activities(self, ctx):
+        from src.models.activity_state import activity_state
+        counts = await ctx.bot.executor.run(activity_state.reconcile)
+        await ctx.send(", ".join(f"{key}: {value}" for key, value in counts.items()))
+
+    @commands.is_owner()
+    @commands.command(name="rebuildstats")
+    async def rebuild_pigeon_stats(self, ctx):
+        from src.models import pigeon_stats
+        count = await ctx.bot.executor.run(pigeon_stats.rebuild)
+        await ctx.send(f"Rebuilt stats for {count} pigeons.")
+
     @commands.is_owner()
     @commands.group()
     async def translation(self, ctx):
@@ -1,18 +1,27 @@
 import random
+import traceback
+from collections import Counter
+from typing import Dict, List, NamedTuple, Optional, Tuple
 
-from discord.ext import commands, tasks
+from discord.ext import commands
 
 from src.config import config
 from src.constants import BR, GOLD_EMOJI
+from src.database import deferred
 from src.disc.cogs.core import BaseCog
 from src.disc.errors.base import SendableException
 from src.disc.helpers.converters import EnumConverter
 from src.disc.helpers.paginating import Paginator
 from src.disc.helpers.pretty import Row, Table, limit_str
+from src.disc.helpers.scheduler import ActivityScheduler
 from src.disc.helpers.waiters import *
-from src.models import (Date, Earthling, Exploration, Fight, Human,
+from src.models import (Date, Exploration, Fight,
                         HumanItem, Item, LanguageMastery, Mail, Pigeon,
-                        PigeonRelationship, Reminder, SystemMessage, database)
+                        PigeonRelationship, Reminder, database)
+from src.models import leaderboards, pigeon_stats
+from src.models.activity_state import activity_state
+from src.models.inbox import inbox
+from src.models.relationships import relationships
 from src.utils.country import Country
 from src.utils.enums import Gender
 from .exploration_retrieval import ExplorationRetrieval, MailRetrieval
@@ -110,6 +119,8 @@ class PigeonCog(BaseCog, name="Pigeon"):
     def __init__(self, bot):
         super().__init__(bot)
         self.message_counts = {}
+        self.activities = ActivityScheduler(self.resolve_activities)
+        self.reconciled = False
 
     def get_base_embed(self, guild) -> discord.Embed:
         embed = discord.Embed(color=self.bot.get_dominant_color(guild))
@@ -137,8 +148,14 @@ class PigeonCog(BaseCog, name="Pigeon"):
 
     @commands.Cog.listener()
     async def on_ready(self):
-        self.start_task(self.date_ticker, check=self.bot.production)
-        self.start_task(self.fight_ticker, check=self.bot.production)
+        if not self.reconciled:
+            self.reconciled = True
+            print(f"Reconciled pigeon activities: {await self.bot.executor.run(activity_state.reconcile)}")
+            if await self.bot.executor.run(pigeon_stats.is_empty):
+                print(f"Built stats for {await self.bot.executor.run(pigeon_stats.rebuild)} pigeons")
+        if self.bot.production and not self.activities.running:
+            self.activities.load(await self.bot.executor.run(self.load_activities))
+            self.activities.start()
         await asyncio.sleep(60 * 60)
         # self.start_task(self.stats_ticker, check = self.bot.production)
 
@@ -155,31 +172,9 @@ class PigeonCog(BaseCog, name="Pigeon"):
                 raise SendableException(ctx.translate(f"{name}_pigeon_jailed"))
 
             if pigeon.status == Pigeon.Status.idle:
-                query = f"""
-                SELECT
-                legacy_exploration.id as exploration_id, mail.id as mail_id, fight.id as fight_id, date.id as date_id
-                FROM
-                pigeon
-                LEFT JOIN legacy_exploration
-                    ON (legacy_exploration.pigeon_id = pigeon.id AND legacy_exploration.finished = 0)
-                LEFT JOIN mail
-                    ON (mail.sender_id = pigeon.id AND mail.finished = 0)
-                LEFT JOIN fight
-                    ON ((fight.pigeon1_id = pigeon.id OR fight.pigeon2_id = pigeon.id) AND fight.finished = 0)
-                LEFT JOIN date
-                    ON ((date.pigeon1_id = pigeon.id OR date.pigeon2_id = pigeon.id) AND date.finished = 0)
-                WHERE pigeon.id = {pigeon.id}
-                """
-
-                cursor = database.execute_sql(query)
-                for row in cursor:
-                    classes = [Exploration, Mail, Fight, Date]
-                    i = 0
-                    for id in row:
-                        if id is not None:
-                            cls = classes[i]
-                            cls.update(finished=True).where(cls.id == id).execute()
-                        i += 1
+                stale = activity_state.finish_stale(pigeon.id)
+                if stale is not None:
+                    self.activities.cancel(stale)
 
         if command_name not in self.subcommands_no_require_available:
             pigeon_raise_if_unavailable(ctx, pigeon, name=name)
@@ -193,10 +188,11 @@ class PigeonCog(BaseCog, name="Pigeon"):
     @commands.group()
     async def pigeon(self, ctx):
         ctx.human = ctx.get_human()
-        for message in list(ctx.human.system_messages.where(SystemMessage.read == False)):
+        messages = inbox.unread_messages(ctx.human.id)
+        if messages:
+            inbox.mark_read(ctx.human.id, messages=messages)
+        for message in messages:
             await ctx.send(embed=message.embed)
-            message.read = True
-            message.save()
 
         self.pigeon_check(ctx, human=ctx.human)
 
@@ -332,12 +328,13 @@ class PigeonCog(BaseCog, name="Pigeon"):
             for pigeon in challenge.pigeons:
                 human = ctx.get_human(user=pigeon.human.user_id)
                 human.gold -= challenge.bet
-                human.save()
+                self.bot.humans.mark_dirty(human, "gold")
 
         challenge.accepted = True
         challenge.start_date = datetime.datetime.utcnow()
         challenge.end_date = challenge.start_date + datetime.timedelta(minutes=5)
         challenge.save()
+        self.activities.schedule(challenge)
 
         embed = self.get_base_embed(ctx.guild)
 
@@ -365,11 +362,13 @@ class PigeonCog(BaseCog, name="Pigeon"):
             raise SendableException(ctx.translate("already_accepted"))
 
         challenge.accepted = False
-        challenge.save()
-
-        for pigeon in challenge.pigeons:
-            pigeon.status = Pigeon.Status.idle
-            pigeon.save()
+        # finished in the same save, so the pointer cleanup and the rejection stat commit together.
+        challenge.finished = True
+        with deferred(), database.atomic():
+            challenge.save()
+            for pigeon in challenge.pigeons:
+                pigeon.status = Pigeon.Status.idle
+                pigeon.save()
 
         embed = self.get_base_embed(ctx.guild)
         embed.description = f"{ctx.author.mention} has rejected the {challenge.type.lower()}!"
@@ -381,24 +380,19 @@ class PigeonCog(BaseCog, name="Pigeon"):
     async def pigeon_relationships(self, ctx):
         """View your pigeons relationships."""
 
-        query = """
-SELECT
-pigeon_relationship.score,
-(CASE WHEN p1.id={pigeon_id} THEN p2.name ELSE p1.name END) as other_name
-FROM pigeon_relationship
-INNER JOIN pigeon p1 ON pigeon1_id = p1.id
-INNER JOIN pigeon p2 ON pigeon2_id = p2.id
-WHERE pigeon1_id = {pigeon_id} OR pigeon2_id = {pigeon_id}
-ORDER BY score DESC;
-        """
+        adjacency = relationships.top(ctx.pigeon.id)
+        names = {}
+        if adjacency:
+            query = Pigeon.select(Pigeon.id, Pigeon.name).where(Pigeon.id.in_([x for x, _ in adjacency]))
+            names = dict(query.tuples())
 
         table = Table(padding=0)
         table.add_row(Row(["name", "score", "title"], header=True))
 
-        cursor = database.execute_sql(query.format(pigeon_id=ctx.pigeon.id))
-
-        for score, other_name in cursor:
-            values = [limit_str(other_name, 10), score, PigeonRelationship._get_title(score)]
+        for other_id, score in adjacency:
+            if other_id not in names:
+                continue
+            values = [limit_str(names[other_id], 10), score, PigeonRelationship._get_title(score)]
             table.add_row(Row(values))
 
         await table.to_paginator(ctx, 15).wait()
@@ -531,7 +525,7 @@ ORDER BY score DESC;
         sender.status = Pigeon.Status.mailing
 
         mail.save()
-        human.save()
+        self.bot.humans.mark_dirty(human, "gold")
         sender.save()
 
         remind_emoji = "❗"
@@ -557,11 +551,24 @@ ORDER BY score DESC;
     async def inbox(self, ctx):
         """Check your inbox."""
         human = ctx.get_human()
-        unread_mail = human.inbox.where(Mail.read == False).where(Mail.finished == True)
+        unread_mail = inbox.unread_mail(human.id)
         if len(unread_mail) == 0:
             return await ctx.send(ctx.translate("no_unread_mail"))
 
-        for mail in list(unread_mail):
+        gold = sum(x.gold for x in unread_mail if x.gold > 0)
+        items = Counter(x.item_id for x in unread_mail if x.item_id is not None)
+        with database.atomic():
+            inbox.mark_read(human.id, mail=unread_mail)
+            for item_id, amount in items.items():
+                human_item, _ = HumanItem.get_or_create(item=item_id, human=human)
+                human_item.amount += amount
+                human_item.save()
+        # credited after the commit, a rolled back read must not pay out twice.
+        if gold:
+            human.gold += gold
+            self.bot.humans.mark_dirty(human, "gold")
+
+        for mail in unread_mail:
             embed = self.get_base_embed(ctx.guild)
             embed.set_author(
                 name=f"You've got mail from {mail.sender.human.user}!",
@@ -582,16 +589,6 @@ ORDER BY score DESC;
 
             await ctx.send(embed=embed)
 
-            mail.read = True
-            mail.save()
-            if mail.gold > 0:
-                human.gold += mail.gold
-                human.save()
-            if mail.item is not None:
-                human_item, _ = HumanItem.get_or_create(item=mail.item, human=mail.recipient)
-                human_item.amount += 1
-                human_item.save()
-
     @pigeon.command(name="stats")
     async def pigeon_stats(self, ctx, member: discord.Member = None):
         """Check the stats of your pigeon."""
@@ -603,72 +600,28 @@ ORDER BY score DESC;
         pigeon = ctx.pigeon
         embed = self.get_base_embed(ctx.guild)
 
-        query = f"""
-            SELECT COUNT(DISTINCT destination) as unique_countries_visited, COUNT(*) as total_countries_visited
-            FROM legacy_exploration
-            WHERE pigeon_id = {pigeon.id}
-            AND finished = 1;
-        """
-
-        cursor = database.execute_sql(query)
-        unique_countries_visited, total_countries_visited = cursor.fetchone()
+        stats = pigeon_stats.get(pigeon.id)
 
         lines = []
-        lines.append(f"Total explorations: {total_countries_visited}")
-        lines.append(f"Unique countries visited: {unique_countries_visited}")
+        lines.append(f"Total explorations: {stats.explorations}")
+        lines.append(f"Unique countries visited: {stats.countries_visited}")
 
         embed.add_field(name=f"Explorations {Pigeon.Status.exploring.value}", value="\n".join(lines), inline=False)
 
-        query = f"""
-        SELECT SUM(gold) as total_gold_sent, count(id) as mails_sent
-        FROM mail WHERE sender_id = {pigeon.id} AND finished = 1"""
-
-        cursor = database.execute_sql(query)
-        total_gold_sent, mails_sent = cursor.fetchone()
-
         lines = []
-        lines.append(f"Total mails sent: {mails_sent}")
-        lines.append(f"Total gold sent: {total_gold_sent}")
+        lines.append(f"Total mails sent: {stats.mails_sent}")
+        lines.append(f"Total gold sent: {stats.gold_sent}")
         embed.add_field(name=f"Mails {Pigeon.Status.mailing.value}", value="\n".join(lines), inline=False)
 
-        win_condition = f"(pigeon1_id={ctx.pigeon.id} AND won=1) OR (pigeon2_id={ctx.pigeon.id} AND won=0)"
-
-        query = f"""
-SELECT
-IFNULL(SUM(CASE WHEN ({win_condition}) THEN bet ELSE 0 END), 0) as gold_won,
-IFNULL(SUM(CASE WHEN ({win_condition}) THEN 0 ELSE -bet END), 0) as gold_lost,
-IFNULL(SUM(CASE WHEN ({win_condition}) THEN 1 ELSE 0 END), 0) as fights_won,
-IFNULL(SUM(CASE WHEN ({win_condition}) THEN 0 ELSE 1 END), 0) as fights_lost
-FROM fight
-WHERE finished = 1
-AND (pigeon1_id = {ctx.pigeon.id} OR pigeon2_id = {ctx.pigeon.id})
-        """
-
-        cursor = database.execute_sql(query)
-        gold_won, gold_lost, fights_won, fights_lost = cursor.fetchone()
-        profit = gold_won + gold_lost
-
         lines = []
-        lines.append(f"Total fights won : {fights_won}")
-        lines.append(f"Total fights lost: {fights_lost}")
-        lines.append(f"Profit: {profit}")
+        lines.append(f"Total fights won : {stats.fights_won}")
+        lines.append(f"Total fights lost: {stats.fights_lost}")
+        lines.append(f"Profit: {stats.profit}")
         embed.add_field(name=f"Fights {Pigeon.Status.fighting.value}", value="\n".join(lines), inline=False)
 
-        query = f"""
-            SELECT
-            IFNULL(SUM(CASE WHEN (accepted=1) THEN 1 ELSE 0 END), 0) as total_dates,
-            IFNULL(SUM(CASE WHEN (pigeon2_id={ctx.pigeon.id} AND accepted=0) THEN 1 ELSE 0 END), 0) as total_rejections
-            FROM date
-            WHERE finished=1
-            AND (pigeon1_id = {ctx.pigeon.id}  OR pigeon2_id = {ctx.pigeon.id} )
-        """
-
-        cursor = database.execute_sql(query)
-        total_dates, rejections = cursor.fetchone()
-
         lines = []
-        lines.append(f"Total dates: {total_dates}")
-        lines.append(f"Rejections: {rejections}")
+        lines.append(f"Total dates: {stats.dates}")
+        lines.append(f"Rejections: {stats.date_rejections}")
         embed.add_field(name=f"Dates {Pigeon.Status.dating.value}", value="\n".join(lines), inline=False)
 
         query = f"""SELECT in_possession, items_discovered, total_items FROM
@@ -710,25 +663,21 @@ AND (pigeon1_id = {ctx.pigeon.id} OR pigeon2_id = {ctx.pigeon.id})
     @commands.guild_only()
     async def pigeon_scoreboard(self, ctx):
         """View the scoreboard."""
-        query = Pigeon.select(Pigeon.experience, Pigeon.name, Human.user_id)
-        query = query.join(Human, on=(Pigeon.human == Human.id))
-        query = query.join(Earthling, on=(Human.id == Earthling.human))
-        query = query.where(Pigeon.condition == Pigeon.Condition.active)
-        query = query.where(Earthling.guild_id == ctx.guild.id)
-        query = query.order_by(Pigeon.experience.desc())
-
-        table = Table(padding=0)
-        table.add_row(Row(["rank", "exp", "pigeon", "owner"], header=True))
-
-        i = 0
-        for pigeon in query:
-            user = pigeon.human.user
-            if user is None:
-                continue
-            values = [f"{i + 1}", str(pigeon.experience), limit_str(pigeon.name, 10), limit_str(user, 10)]
-            table.add_row(Row(values))
-            i += 1
-
+        board = leaderboards.pigeons
+        if not board.loaded:
+            await self.bot.run_db(board.rebuild)
+
+        def format_row(rank, pigeon_id, experience, data):
+            name, user_id = data
+            user = self.bot.get_user(user_id)
+            if user is not None:
+                return [rank, experience, limit_str(name, 10), limit_str(user, 10)]
+
+        table = board.to_table(ctx.guild.id, ["rank", "exp", "pigeon", "owner"], format_row, padding=0)
+        pigeon = get_active_pigeon(ctx.author)
+        rank = board.rank(ctx.guild.id, pigeon.id) if pigeon is not None else None
+        if rank is not None:
+            table.title = f"{pigeon.name} is #{rank} of {board.size(ctx.guild.id)}"
         await table.to_paginator(ctx, 15).wait()
 
     @pigeon.command(name="help")
@@ -737,130 +686,169 @@ AND (pigeon1_id = {ctx.pigeon.id} OR pigeon2_id = {ctx.pigeon.id})
         paginator = Paginator.from_embed(ctx, embed, max_fields=10)
         await paginator.wait()
 
-    @tasks.loop(seconds=30)
-    async def date_ticker(self):
-        with database.connection_context():
-            query = Date.select()
-            query = query.where(Date.finished == False)
-            query = query.where(Date.accepted == True)
-            query = query.where(Date.end_date <= datetime.datetime.utcnow())
+    def cog_unload(self):
+        self.activities.stop()
+
+    def load_activities(self) -> list:
+        activities = []
+        for model in (Date, Fight):
+            query = model.select(model.id, model.end_date)
+            query = query.where(model.finished == False)
+            query = query.where(model.accepted == True)
+            activities.extend(query)
+        return activities
+
+    async def resolve_activities(self, due: Dict[type, List[int]]) -> Dict[type, List[int]]:
+        messages, failed = await self.bot.executor.run(self._resolve_activities, due)
+        for message in messages:
+            guild = self.bot.get_guild(message.guild_id)
+            channel = self.get_pigeon_channel(guild) if guild is not None else None
+            if channel is not None:
+                asyncio.gather(channel.send(content=message.content, embed=self.activity_embed(guild, message)))
+        return failed
+
+    def activity_embed(self, guild, message: 'ActivityMessage') -> discord.Embed:
+        embed = self.get_base_embed(guild)
+        embed.description = message.description
+        if message.footer is not None:
+            embed.set_footer(text=message.footer)
+        for symbol, name, user_id, value in message.fields:
+            embed.add_field(name=f"{symbol} {name} ({self.bot.get_user(user_id)})", value=value)
+        return embed
+
+    def _resolve_activities(self, due: Dict[type, List[int]]) -> Tuple[List['ActivityMessage'], Dict[type, List[int]]]:
+        """
+        Finishes every due fight and date, each in its own transaction, on the database thread. Returns the
+        messages to send and the ids that failed, those are rolled back and left for the scheduler to retry.
+        """
+        messages = []
+        failed: Dict[type, List[int]] = {}
+        for model, resolve in ((Date, self.resolve_date), (Fight, self.resolve_fight)):
+            ids = due.get(model)
+            if not ids:
+                continue
+            query = model.select()
+            query = query.where(model.id.in_(ids))
+            query = query.where(model.finished == False)
+            query = query.where(model.accepted == True)
+            for activity in query:
+                activity_messages = []
+                try:
+                    # gold and in-memory caches are only touched once this activity's transaction commits.
+                    with deferred(), database.atomic():
+                        resolve(activity, activity_messages)
+                except Exception:
+                    traceback.print_exc()
+                    failed.setdefault(model, []).append(activity.id)
+                    continue
+                messages.extend(activity_messages)
+        return messages, failed
+
+    def resolve_date(self, date: Date, messages: list):
+        score = 0
+        lines = []
+        for pigeon in (date.pigeon1, date.pigeon2):
+            other = date.pigeon1 if pigeon == date.pigeon2 else date.pigeon2
+
+            if pigeon.cleanliness >= 60:
+                lines.append(f"{pigeon.name} smells like fresh fries, delicious (+10)")
+                score += 10
+            elif pigeon.cleanliness >= 40:
+                lines.append(f"{pigeon.name} has a slight body odor, but it's tolerable (+0)")
+            elif pigeon.cleanliness >= 20:
+                lines.append(f"{pigeon.name} has a clear body odor. (-10)")
+                score -= 10
+            else:
+                lines.append(f"{pigeon.name} is caked in feces, absolutely disgusting! (-20)")
+                score -= 20
+
+            if pigeon.food >= 60:
+                lines.append(
+                    f"{pigeon.name} ellegantly and majestically enjoys {pigeon.gender.get_posessive_pronoun()} fry. (+10)")
+                score += 10
+            elif pigeon.food >= 30:
+                lines.append(
+                    f"{pigeon.name} is clearly a bit hungry but still manages to (barely) not embarrass {pigeon.gender.get_pronoun(object=True)}self (+0)")
+            else:
+                lines.append(
+                    f"{pigeon.name} is starving. As soon as {pigeon.gender.get_pronoun()} sees a fry {pigeon.gender.get_pronoun()} starts to drool, runs at it like a wild animal and devours it in one go. How unappealing. (-10)")
+                score -= 10
+
+            if pigeon.health <= 30:
+                lines.append(
+                    f"{pigeon.name} is covered in blood. {pigeon.gender.get_pronoun()} tries to make it work but accidentally drips some blood on {other.name}s fry . Not a good sauce. (-10)")
+                score -= 10
+
+            if pigeon.happiness >= 60:
+                lines.append(f"{pigeon.name} smiled in confidence the entire date. (+10)")
+                score += 10
+            elif pigeon.happiness >= 30:
+                lines.append(
+                    f"{pigeon.name} was clearly not in his best spirits. Slightly bringing his date down as well. (-5)")
+                score -= 5
+            else:
+                lines.append(
+                    f"{pigeon.name} is miserable. From the start, {pigeon.gender.get_pronoun()} starts asking what the point of this date even is, what the point of anything is, and why {pigeon.gender.get_pronoun()} should even bother eating at all. (-10)")
+                score -= 10
+
+        lines = "\n- " + ("\n\n- ".join(lines))
+        messages.append(ActivityMessage(date.guild_id, None, f"{lines}\n\nScore: **{score}**",
+                                        footer=f"{score // 10} relations"))
 
-            for date in query:
-                guild = date.guild
-                channel = self.get_pigeon_channel(guild)
+        for pigeon in date.pigeons:
+            pigeon.status = Pigeon.Status.idle
+            pigeon.save()
 
-                embed = self.get_base_embed(guild)
+        date.score = score
 
-                score = 0
-                lines = []
-                for pigeon in (date.pigeon1, date.pigeon2):
-                    other = date.pigeon1 if pigeon == date.pigeon2 else date.pigeon2
-
-                    if pigeon.cleanliness >= 60:
-                        lines.append(f"{pigeon.name} smells like fresh fries, delicious (+10)")
-                        score += 10
-                    elif pigeon.cleanliness >= 40:
-                        lines.append(f"{pigeon.name} has a slight body odor, but it's tolerable (+0)")
-                    elif pigeon.cleanliness >= 20:
-                        lines.append(f"{pigeon.name} has a clear body odor. (-10)")
-                        score -= 10
-                    else:
-                        lines.append(f"{pigeon.name} is caked in feces, absolutely disgusting! (-20)")
-                        score -= 20
-
-                    if pigeon.food >= 60:
-                        lines.append(
-                            f"{pigeon.name} ellegantly and majestically enjoys {pigeon.gender.get_posessive_pronoun()} fry. (+10)")
-                        score += 10
-                    elif pigeon.food >= 30:
-                        lines.append(
-                            f"{pigeon.name} is clearly a bit hungry but still manages to (barely) not embarrass {pigeon.gender.get_pronoun(object=True)}self (+0)")
-                    else:
-                        lines.append(
-                            f"{pigeon.name} is starving. As soon as {pigeon.gender.get_pronoun()} sees a fry {pigeon.gender.get_pronoun()} starts to drool, runs at it like a wild animal and devours it in one go. How unappealing. (-10)")
-                        score -= 10
-
-                    if pigeon.health <= 30:
-                        lines.append(
-                            f"{pigeon.name} is covered in blood. {pigeon.gender.get_pronoun()} tries to make it work but accidentally drips some blood on {other.name}s fry . Not a good sauce. (-10)")
-                        score -= 10
-
-                    if pigeon.happiness >= 60:
-                        lines.append(f"{pigeon.name} smiled in confidence the entire date. (+10)")
-                        score += 10
-                    elif pigeon.happiness >= 30:
-                        lines.append(
-                            f"{pigeon.name} was clearly not in his best spirits. Slightly bringing his date down as well. (-5)")
-                        score -= 5
-                    else:
-                        lines.append(
-                            f"{pigeon.name} is miserable. From the start, {pigeon.gender.get_pronoun()} starts asking what the point of this date even is, what the point of anything is, and why {pigeon.gender.get_pronoun()} should even bother eating at all. (-10)")
-                        score -= 10
-
-                lines = "\n- " + ("\n\n- ".join(lines))
-                embed.description = f"{lines}\n\nScore: **{score}**"
-                embed.set_footer(text=f"{score // 10} relations")
-                asyncio.gather(channel.send(embed=embed))
-
-                for pigeon in date.pigeons:
-                    pigeon.status = Pigeon.Status.idle
-                    pigeon.save()
-
-                date.score = score
-
-                relationship = PigeonRelationship.get_or_create_for(date.pigeon1, date.pigeon2)
-                relationship.score += date.score // 10
-                relationship.save()
-
-                date.finished = True
-                date.save()
-
-    @tasks.loop(seconds=30)
-    async def fight_ticker(self):
-        with database.connection_context():
-            query = Fight.select()
-            query = query.where(Fight.finished == False)
-            query = query.where(Fight.accepted == True)
-            query = query.where(Fight.end_date <= datetime.datetime.utcnow())
-            for fight in query:
-                won = random.randint(0, 1) == 0
-                guild = fight.guild
-                channel = self.get_pigeon_channel(guild)
-
-                if won:
-                    winner = fight.challenger
-                    loser = fight.challengee
-                else:
-                    winner = fight.challengee
-                    loser = fight.challenger
-
-                embed = self.get_base_embed(guild)
-                embed.description = f"`{winner.name}` creeps into `{loser.name}`’s room. `{winner.name}`’s jaw unhinges and swallows `{loser.name}` whole."
-
-                winner_data = {"experience": 30, "health": -10}
-                loser_data = {"experience": 5, "health": -25}
-
-                embed.add_field(
-                    name=f"💩 {loser.name} ({loser.human.user})",
-                    value=get_winnings_value(**loser_data, gold=-fight.bet)
-                )
-                embed.add_field(
-                    name=f"🏆 {winner.name} ({winner.human.user})",
-                    value=get_winnings_value(**winner_data, gold=fight.bet)
-                )
+        relationships.add_score(date.pigeon1_id, date.pigeon2_id, date.score // 10)
 
-                asyncio.gather(channel.send(content=f"{winner.human.mention} | {loser.human.mention}", embed=embed))
+        date.finished = True
+        date.save()
 
-                winner.status = Pigeon.Status.idle
-                loser.status = Pigeon.Status.idle
+    def resolve_fight(self, fight: Fight, messages: list):
+        won = random.randint(0, 1) == 0
+
+        if won:
+            winner = fight.challenger
+            loser = fight.challengee
+        else:
+            winner = fight.challengee
+            loser = fight.challenger
+
+        winner_data = {"experience": 30, "health": -10}
+        loser_data = {"experience": 5, "health": -25}
+
+        messages.append(ActivityMessage(
+            fight.guild_id,
+            f"{winner.human.mention} | {loser.human.mention}",
+            f"`{winner.name}` creeps into `{loser.name}`’s room. `{winner.name}`’s jaw unhinges and swallows `{loser.name}` whole.",
+            fields=(
+                ("💩", loser.name, loser.human.user_id, get_winnings_value(**loser_data, gold=-fight.bet)),
+                ("🏆", winner.name, winner.human.user_id, get_winnings_value(**winner_data, gold=fight.bet)),
+            )
+        ))
+
+        winner.status = Pigeon.Status.idle
+        loser.status = Pigeon.Status.idle
+
+        winner_data["gold"] = fight.bet * 2
+        winner.update_stats(winner_data)
+        loser.update_stats(loser_data)
+
+        fight.won = won
+        fight.finished = True
+        fight.save()
 
-                winner_data["gold"] = fight.bet * 2
-                winner.update_stats(winner_data)
-                loser.update_stats(loser_data)
 
-                fight.won = won
-                fight.finished = True
-                fight.save()
+class ActivityMessage(NamedTuple):
+    """What a resolved date or fight posts, plain data so it can be put together on the database thread."""
+    guild_id: int
+    content: Optional[str]
+    description: str
+    footer: Optional[str] = None
+    # (symbol, pigeon name, user id, value)
+    fields: Tuple[Tuple[str, str, int, str], ...] = ()
 
 
 def get_winnings_value(**kwargs):
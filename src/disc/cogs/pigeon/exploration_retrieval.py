@@ -5,7 +5,8 @@ import discord
 
 from src.config import config
 from src.disc.cogs.conversions.cog import ConversionCog
-from src.models import Item, Pigeon, PigeonRelationship
+from src.models import Item, Pigeon
+from src.models.relationships import relationships
 
 
 def percentage_chance(chance):
@@ -120,12 +121,10 @@ class ExplorationRetrieval(ActivityRetrieval):
             bonus_messages[
                 self.Bonus.hundredth] = f"Since this is your **{self.exploration.pigeon.explorations.count()}th** exploration, you get a bonus!"
         if self.Bonus.wing_damage in self.bonuses:
-            query = PigeonRelationship.select_for(pigeon)
-            relationship = query.first()
+            enemy_id = relationships.worst_enemy(pigeon.id)
             attacker_name = "a random pigeon"
-            if relationship is not None:
-                other = relationship.pigeon1 if relationship.pigeon1 != pigeon else relationship.pigeon2
-                attacker_name = f"`{other.name}`"
+            if enemy_id is not None:
+                attacker_name = f"`{Pigeon.get_by_id(enemy_id).name}`"
             bonus_messages[
                 self.Bonus.wing_damage] = f"During the flight, {pigeon.name} got attacked by {attacker_name}."
 
@@ -10,7 +10,7 @@ from src.disc.cogs.core import BaseCog
 from src.disc.errors.base import SendableException
 from src.disc.helpers.general import RedditHelper
 from src.disc.helpers.waiters import StrWaiter, BoolWaiter, Skipped
-from src.models import Prankster, NicknamePrank, HumanItem, Item, EmojiPrank, RolePrank, database
+from src.models import Prankster, NicknamePrank, HumanItem, Item, EmojiPrank, RolePrank, leaderboards
 from src.wrappers.zalgo import Zalgo
 
 pranks_in_progress = []
@@ -137,27 +137,19 @@ class Prank(BaseCog):
 
     @prank.command(name="scoreboard")
     async def prank_scoreboard(self, ctx):
+        board = leaderboards.nickname_pranks
+        if not board.loaded:
+            await self.bot.run_db(board.rebuild)
 
-        query = """SELECT
-prankster.user_id, COUNT(nickname_prank.id) as people_nick_pranked
-FROM
-prankster
-INNER JOIN nickname_prank ON prankster.id = nickname_prank.pranked_by_id
-WHERE prankster.guild_id = {guild_id}
-GROUP BY user_id
-ORDER BY people_nick_pranked DESC"""
-
-        table = pretty.Table()
-        table.add_row(pretty.Row(("Prankster", "Pranks (nick)"), header=True))
-
-        cursor = database.execute_sql(query.format(guild_id=ctx.guild.id))
-        for user_id, people_nick_pranked in cursor:
+        def format_row(rank, user_id, people_nick_pranked, _):
             member = ctx.guild.get_member(user_id)
-            if member is None:
-                continue
-
-            table.add_row(pretty.Row((str(member), people_nick_pranked)))
+            if member is not None:
+                return [str(member), people_nick_pranked]
 
+        table = board.to_table(ctx.guild.id, ["Prankster", "Pranks (nick)"], format_row)
+        rank = board.rank(ctx.guild.id, ctx.author.id)
+        if rank is not None:
+            table.title = f"You are #{rank} of {board.size(ctx.guild.id)}"
         await table.to_paginator(ctx, 15).wait()
 
     @prank.command(name="stats")
@@ -249,11 +241,13 @@ ORDER BY people_nick_pranked DESC"""
         else:
             prank.purchase_type = prank.PurchaseType.gold
             ctx.human.gold -= ctx.cost
-            ctx.human.save()
+            ctx.bot.humans.mark_dirty(ctx.human, "gold")
 
         prank.save()
         ctx.victim.save()
         ctx.prankster.save()
+        if isinstance(prank, NicknamePrank):
+            leaderboards.nickname_pranks.increment(ctx.prankster.guild_id, ctx.prankster.user_id)
 
         await prank.apply()
 
@@ -364,33 +358,32 @@ ORDER BY people_nick_pranked DESC"""
                 human = ctx.get_human(user=prank.pranked_by.user_id)
                 if prank.purchase_type == NicknamePrank.PurchaseType.gold:
                     human.gold += prank.cost
-                    human.save()
+                    ctx.bot.humans.mark_dirty(human, "gold")
                 elif prank.purchase_type == NicknamePrank.PurchaseType.item:
                     human.add_item(Item.get(code=prank.item_code), 1)
             await ctx.success(ctx.translate("prank_reverted"))
 
     @tasks.loop(minutes=1)
     async def prank_poller(self):
-        with database.connection_context():
-            pranks = [NicknamePrank, RolePrank, EmojiPrank]
-
-            for cls in pranks:
-                query = cls.select()
-                query = query.where(cls.finished == False)
-                if cls != NicknamePrank:
-                    query = query.where(cls.end_date <= datetime.datetime.utcnow())
-                for prank in query:
-                    if cls != NicknamePrank or prank.end_date_passed:
-                        prank.finished = True
-                        prank.victim.pranked = False
-                        prank.victim.prank_type = None
-                        prank.save()
-                        prank.victim.save()
-                        if prank.victim.member:
-                            asyncio.gather(prank.revert())
-                    else:
-                        if prank.should_reapply:
-                            asyncio.gather(prank.apply())
+        pranks = [NicknamePrank, RolePrank, EmojiPrank]
+
+        for cls in pranks:
+            query = cls.select()
+            query = query.where(cls.finished == False)
+            if cls != NicknamePrank:
+                query = query.where(cls.end_date <= datetime.datetime.utcnow())
+            for prank in query:
+                if cls != NicknamePrank or prank.end_date_passed:
+                    prank.finished = True
+                    prank.victim.pranked = False
+                    prank.victim.prank_type = None
+                    prank.save()
+                    prank.victim.save()
+                    if prank.victim.member:
+                        asyncio.gather(prank.revert())
+                else:
+                    if prank.should_reapply:
+                        asyncio.gather(prank.apply())
 
 
 async def setup(bot):
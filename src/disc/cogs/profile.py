@@ -7,7 +7,8 @@ from src.disc.cogs.core import BaseCog
 from src.disc.errors.base import SendableException
 from src.disc.helpers.converters import EnumConverter
 from src.disc.helpers.waiters import *
-from src.models import Human, Earthling, HumanItem, Pigeon, Mail, ItemCategory, Item, database
+from src.models import Human, Earthling, HumanItem, Pigeon, ItemCategory, Item, database, leaderboards
+from src.models.inbox import inbox
 from src.utils.zodiac import ZodiacSign
 
 
@@ -40,7 +41,7 @@ class ItemCategoryIdWaiter(StrWaiter):
 
 
 def is_tester(member):
-    with database.connection_context():
+    with config.bot.connections.scope():
         human = config.bot.get_human(user=member)
         return human.tester
 
@@ -82,7 +83,7 @@ class Profile(BaseCog):
 
             asyncio.gather(ctx.send(text))
             human.gold -= cost
-            human.save()
+            ctx.bot.humans.mark_dirty(human, "gold")
 
     @commands.command()
     @commands.guild_only()
@@ -116,23 +117,19 @@ class Profile(BaseCog):
     @commands.command()
     @commands.guild_only()
     async def scoreboard(self, ctx):
-        query = Human.select(Human.user_id, Human.gold)
-        query = query.join(Earthling, on=(Human.id == Earthling.human))
-        query = query.where(Earthling.guild_id == ctx.guild.id)
-        query = query.order_by(Human.gold.desc())
-        # query = query.limit(10)
-
-        table = pretty.Table()
-        table.add_row(pretty.Row(["rank", "gold", "member"], header=True))
-
-        i = 0
-        for human in query:
-            user = human.user
-            if user is None:
-                continue
-            values = [f"{i + 1}", str(human.gold), str(user)]
-            table.add_row(pretty.Row(values))
-            i += 1
+        board = leaderboards.gold
+        if not board.loaded:
+            await self.bot.run_db(board.rebuild)
+
+        def format_row(rank, user_id, gold, _):
+            user = self.bot.get_user(user_id)
+            if user is not None:
+                return [rank, gold, user]
+
+        table = board.to_table(ctx.guild.id, ["rank", "gold", "member"], format_row)
+        rank = board.rank(ctx.guild.id, ctx.author.id)
+        if rank is not None:
+            table.title = f"You are #{rank} of {board.size(ctx.guild.id)}"
         await table.to_paginator(ctx, 15).wait()
 
     @commands.group(aliases=["balance", "wallet", "gold"])
@@ -152,9 +149,9 @@ class Profile(BaseCog):
             embed.set_thumbnail(url=human.country.flag())
 
         footer = []
-        unread_mail = human.inbox.where(Mail.read == False).where(Mail.finished == True)
-        if len(unread_mail) > 0:
-            footer.append(f"You have {unread_mail.count()} unread mail! use '{ctx.prefix}inbox' to view")
+        unread_mail = inbox.unread_mail_count(human.id)
+        if unread_mail > 0:
+            footer.append(f"You have {unread_mail} unread mail! use '{ctx.prefix}inbox' to view")
 
         if len(footer) > 0:
             embed.set_footer(text="\n".join(footer))
@@ -548,25 +545,23 @@ class Profile(BaseCog):
 
     @tasks.loop(hours=24)
     async def earthling_purger(self):
-        with database.connection_context():
-            to_purge = []
-            earthlings = list(Earthling.select().order_by(Earthling.guild_id))
-            for earthling in earthlings:
-                if earthling.guild is None or earthling.member is None or earthling.member.bot:
-                    to_purge.append(earthling)
-
-            if len(to_purge) < (len(earthlings) // 2):
-                for earthling in to_purge:
-                    role = earthling.personal_role
-                    if role is not None:
-                        await role.delete()
-                    earthling.delete_instance()
-
-        with database.connection_context():
-            for guild in self.bot.guilds:
-                for member in guild.members:
-                    if not member.bot:
-                        earthling = Earthling.get_or_create_for_member(member)
+        to_purge = []
+        earthlings = list(Earthling.select().order_by(Earthling.guild_id))
+        for earthling in earthlings:
+            if earthling.guild is None or earthling.member is None or earthling.member.bot:
+                to_purge.append(earthling)
+
+        if len(to_purge) < (len(earthlings) // 2):
+            for earthling in to_purge:
+                role = earthling.personal_role
+                if role is not None:
+                    await role.delete()
+                earthling.delete_instance()
+
+        for guild in self.bot.guilds:
+            for member in guild.members:
+                if not member.bot:
+                    earthling = Earthling.get_or_create_for_member(member)
 
 
 async def setup(bot):
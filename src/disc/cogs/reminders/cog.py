@@ -13,7 +13,8 @@ class RemindersCog(BaseCog, name="Reminder"):
 
     @tasks.loop(seconds = 60)
     async def loop(self):
-        for reminder in Reminder.select().where(Reminder.sent == False).where(Reminder.due_date < datetime.datetime.utcnow()):
+        query = Reminder.select().where(Reminder.sent == False).where(Reminder.due_date < datetime.datetime.utcnow())
+        for reminder in await self.bot.executor.fetch(query):
             sendable = reminder.channel
             embed = discord.Embed(color=ColorHelper.get_dominant_color(), description=reminder.message)
             await sendable.send(f"<@{reminder.user_id}>", embed=embed)
@@ -1,11 +1,15 @@
+import random
 from typing import List
 
 import discord
 import peewee
-from discord.app_commands import CommandInvokeError
+from discord.app_commands import CommandInvokeError, CommandOnCooldown
 from discord.ext import commands
 
+from src.config import config
+from src.disc.commands.base.unit_of_work import UnitOfWork
 from src.disc.commands.base.validation import Validation
+from src.disc.helpers.ratelimit import refund
 from src.models import Human, Pigeon
 
 
@@ -37,15 +41,17 @@ class BaseGroupCog(commands.GroupCog):
     def check(self,
               user_id: int,
               other: bool = False,
-              validations: List[Validation] = None
+              validations: List[Validation] = None,
+              unit_of_work: UnitOfWork = None
               ) -> CheckResult:
         validations = validations or []
+        unit_of_work = unit_of_work or UnitOfWork()
         targets = TargetCollection()
         errors = []
         for validation in validations:
             type = validation.get_target_type()
             if type not in targets:
-                targets[type] = validation.find_target(user_id)
+                targets[type] = unit_of_work.find_target(validation, user_id)
             if not validation.validate(targets[type]):
                 errors.append(validation.get_message(other=other))
                 return CheckResult(targets, errors)
@@ -58,6 +64,7 @@ class BaseGroupCog(commands.GroupCog):
             check = check()
 
         if check:
+            task.coro = config.bot.connections.wrap(task.coro)
             task.add_exception_type(peewee.OperationalError)
             task.add_exception_type(peewee.InterfaceError)
             try:
@@ -65,8 +72,11 @@ class BaseGroupCog(commands.GroupCog):
             except RuntimeError:
                 pass
 
-    def probability(self, interaction: discord.Interaction):
-        return interaction.command.extras['probabilities'].choice()
+    async def run_db(self, func, *args, **kwargs):
+        return await self.bot.executor.run(func, *args, **kwargs)
+
+    def probability(self, interaction: discord.Interaction, rng: random.Random = None):
+        return interaction.command.extras['probabilities'].choice(rng)
 
     async def validate(self,
                        interaction: discord.Interaction,
@@ -75,7 +85,9 @@ class BaseGroupCog(commands.GroupCog):
                        validations: List[Validation] = None
                        ) -> TargetCollection:
         validations = validations or interaction.command.extras.get('validations')
-        result = self.check(user_id=user_id or interaction.user.id, other=other, validations=validations)
+        # shared by every validate call of this interaction, so each user is only resolved once.
+        result = await self.run_db(self.check, user_id=user_id or interaction.user.id, other=other,
+                                   validations=validations, unit_of_work=UnitOfWork.of(interaction))
         if result.errors:
             await interaction.response.send_message(result.errors[0])
             raise ValidationFailed()
@@ -83,5 +95,8 @@ class BaseGroupCog(commands.GroupCog):
 
     async def cog_app_command_error(self, interation, error):
         original = error.original if isinstance(error, CommandInvokeError) else error
-        if not isinstance(original, ValidationFailed):
+        if isinstance(original, ValidationFailed):
+            refund(interation)
+        # cooldowns are answered by the command tree.
+        if not isinstance(original, (ValidationFailed, CommandOnCooldown)):
             raise error
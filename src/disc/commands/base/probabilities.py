@@ -1,7 +1,8 @@
 import random
 from abc import ABC
-from typing import TypeVar, Generic, List
+from typing import TypeVar, Generic, List, Optional
 
+from src.utils.sampling import WeightedTable, weighted_table
 
 T = TypeVar("T")
 
@@ -12,13 +13,21 @@ class Probability(ABC):
 
 
 class Probabilities(Generic[T]):
-    __slots__ = ('items',)
+    __slots__ = ('items', '_table')
 
     def __init__(self, items: List[T]):
         self.items = items
+        self._table: Optional[WeightedTable] = None
 
-    def __weights(self):
-        return [x.probability for x in self.items]
+    @property
+    def table(self) -> WeightedTable:
+        """Compiled on the first draw, the items of a command don't change after that."""
+        if self._table is None:
+            self._table = weighted_table(self.items, [x.probability for x in self.items])
+        return self._table
 
-    def choice(self) -> T:
-        return random.choices(self.items, weights=self.__weights())[0]
+    def choice(self, rng: random.Random = None) -> T:
+        return self.table.draw(rng)
+
+    def choices(self, k: int, rng: random.Random = None) -> List[T]:
+        return self.table.draw_many(k, rng)
@@ -0,0 +1,84 @@
+import logging
+import types
+import unittest
+
+from src.config import config
+from src.database import IdentityMap
+from src.disc.commands.base.unit_of_work import UnitOfWork
+from src.models import Human, Pigeon
+from src.models.testing import ModelTestCase
+
+
+class UnitOfWorkTest(ModelTestCase):
+    def setUp(self):
+        super().setUp()
+        self.addCleanup(setattr, config, "tree", config.tree)
+        self.addCleanup(setattr, config, "bot", None)
+        self.humans = IdentityMap(self.load_human)
+        config.bot = types.SimpleNamespace(humans=self.humans, tree=config.tree)
+
+        self.human = self.create_human(1)
+        self.pigeon = self.create_pigeon(self.human)
+        self.create_pigeon(self.human, name="Gone", condition=Pigeon.Condition.dead)
+        self.create_human(2)
+
+    @staticmethod
+    def load_human(user_id: int) -> Human:
+        human, _ = Human.get_or_create(user_id=user_id)
+        return human
+
+    def count_queries(self, func, *args):
+        """The statements `func` issues, from peewee's query log."""
+        with self.assertLogs("peewee", level="DEBUG") as logs:
+            result = func(*args)
+            # assertLogs fails when nothing was logged.
+            logging.getLogger("peewee").debug("done")
+        return result, len(logs.records) - 1
+
+    def test_human_and_pigeon_in_one_query(self):
+        unit_of_work = UnitOfWork()
+        human, queries = self.count_queries(unit_of_work.human, 1)
+        self.assertEqual(queries, 1)
+        self.assertIs(human, self.humans.get(1))
+
+        pigeon, queries = self.count_queries(unit_of_work.pigeon, 1)
+        self.assertEqual((pigeon.id, queries), (self.pigeon.id, 0))
+        # the pigeon's human is the mapped instance, no query to reach it.
+        _, queries = self.count_queries(lambda: pigeon.human)
+        self.assertEqual(queries, 0)
+        self.assertIs(pigeon.human, human)
+        self.assertIs(unit_of_work.human(1), human)
+        self.assertEqual((unit_of_work.queries, unit_of_work.saved), (1, 1))
+
+    def test_mapped_human(self):
+        human = self.humans.get(1)
+        unit_of_work = UnitOfWork()
+        self.assertIs(unit_of_work.human(1), human)
+        pigeon, queries = self.count_queries(unit_of_work.pigeon, 1)
+        self.assertEqual((pigeon.id, queries), (self.pigeon.id, 1))
+        self.assertIs(pigeon.human, human)
+        unit_of_work.pigeon(1)
+        self.assertEqual((unit_of_work.queries, unit_of_work.saved), (1, 1))
+
+    def test_without_pigeon(self):
+        unit_of_work = UnitOfWork()
+        self.assertIsNone(unit_of_work.pigeon(2))
+        self.assertIsNone(unit_of_work.pigeon(2))
+        # the join already told there is none, both lookups are answered without a query.
+        self.assertEqual((unit_of_work.queries, unit_of_work.saved), (1, 2))
+
+    def test_new_human(self):
+        unit_of_work = UnitOfWork()
+        human = unit_of_work.human(3)
+        self.assertIsNotNone(human.id)
+        self.assertIs(human, self.humans.get(3))
+        self.assertIsNone(unit_of_work.pigeon(3))
+
+    def test_one_per_interaction(self):
+        interaction = types.SimpleNamespace(extras={})
+        self.assertIs(UnitOfWork.of(interaction), UnitOfWork.of(interaction))
+        self.assertIsNot(UnitOfWork.of(interaction), UnitOfWork.of(types.SimpleNamespace(extras={})))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,129 @@
+import random
+import threading
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+from src.models.human import Item
+from src.models.pigeon import ExplorationPlanet, ExplorationPlanetLocation, ExplorationAction, \
+    ExplorationActionScenario
+from src.utils.sampling import AliasTable
+from src.utils.stats import Winnings
+
+
+class PlanetData(NamedTuple):
+    id: int
+    name: str
+    image_url: str
+
+
+class ScenarioData(NamedTuple):
+    id: int
+    action_id: int
+    text: str
+    gold: int
+    health: int
+    happiness: int
+    experience: int
+    cleanliness: int
+    food: int
+    item_id: Optional[int]
+
+    def to_winnings(self) -> Winnings:
+        # the item is looked up when it is handed out, the snapshot doesn't keep model instances around.
+        item = Item.get_or_none(Item.id == self.item_id) if self.item_id is not None else None
+        return Winnings.of(self.gold, self.health, self.happiness, self.experience, self.cleanliness, self.food,
+                           item)
+
+
+class ActionData(NamedTuple):
+    id: int
+    name: str
+    symbol: str
+    location_id: int
+    scenarios: Tuple[ScenarioData, ...]
+    picker: Optional[AliasTable]
+
+    def pick_scenario(self, rng: random.Random = None) -> Optional[ScenarioData]:
+        if self.picker is not None:
+            return self.picker.draw(rng)
+
+
+class LocationData(NamedTuple):
+    id: int
+    name: str
+    image_url: Optional[str]
+    active: bool
+    planet: PlanetData
+    actions: Tuple[ActionData, ...]
+
+
+class Catalog(NamedTuple):
+    planets: Dict[int, PlanetData]
+    locations: Dict[int, LocationData]
+    actions: Dict[int, ActionData]
+    active_locations: Tuple[LocationData, ...]
+
+
+def build_catalog() -> Catalog:
+    """Reads the whole exploration graph, four queries in total."""
+    planets = {x.id: PlanetData(x.id, x.name, x.image_url) for x in ExplorationPlanet.select()}
+
+    scenarios: Dict[int, List[ScenarioData]] = {}
+    for x in ExplorationActionScenario.select().order_by(ExplorationActionScenario.id):
+        scenarios.setdefault(x.action_id, []).append(ScenarioData(
+            x.id, x.action_id, x.text, x.gold, x.health, x.happiness, x.experience, x.cleanliness, x.food,
+            x.item_id
+        ))
+
+    actions: Dict[int, ActionData] = {}
+    by_location: Dict[int, List[ActionData]] = {}
+    for x in ExplorationAction.select().order_by(ExplorationAction.id):
+        options = tuple(scenarios.get(x.id, ()))
+        # every scenario is equally likely for now, the table is where weights would go.
+        picker = AliasTable(options, [1] * len(options)) if options else None
+        action = ActionData(x.id, x.name, x.symbol, x.location_id, options, picker)
+        actions[x.id] = action
+        by_location.setdefault(x.location_id, []).append(action)
+
+    locations: Dict[int, LocationData] = {}
+    for x in ExplorationPlanetLocation.select().order_by(ExplorationPlanetLocation.id):
+        locations[x.id] = LocationData(x.id, x.name, x.image_url, x.active, planets[x.planet_id],
+                                       tuple(by_location.get(x.id, ())))
+
+    return Catalog(planets, locations, actions, tuple(x for x in locations.values() if x.active))
+
+
+class ScenarioCatalog:
+    """
+    Immutable snapshot of the space exploration planets, locations, actions and scenarios.
+    A reload builds a complete new snapshot and swaps it in with a single assignment,
+    readers either see the old graph or the new one, never a mix.
+    """
+
+    def __init__(self):
+        self._catalog: Optional[Catalog] = None
+        self._lock = threading.Lock()
+
+    @property
+    def catalog(self) -> Catalog:
+        if self._catalog is None:
+            with self._lock:
+                if self._catalog is None:
+                    self._catalog = build_catalog()
+        return self._catalog
+
+    def reload(self) -> Catalog:
+        with self._lock:
+            self._catalog = build_catalog()
+            return self._catalog
+
+    def active_locations(self) -> Tuple[LocationData, ...]:
+        return self.catalog.active_locations
+
+    def get_location(self, location_id: int) -> Optional[LocationData]:
+        return self.catalog.locations.get(location_id)
+
+    def get_action(self, action_id: int) -> Optional[ActionData]:
+        return self.catalog.actions.get(action_id)
+
+
+scenario_catalog = ScenarioCatalog()
@@ -1,7 +1,6 @@
 import datetime
 import enum
 import random
-import re
 from typing import Callable, List, Union, Any
 
 import discord
@@ -16,11 +15,15 @@ from src.disc.commands.base.probabilities import Probabilities, Probability
 from src.disc.commands.base.validation import has_gold
 from src.utils.country import Country
 from .validation import *
+from src.disc.commands.pigeon.catalog import LocationData, scenario_catalog
 from src.disc.commands.pigeon.helpers import PigeonHelper
+from src.disc.commands.pigeon.placeholders import CustomPlaceholder, format_placeholders, pigeon_placeholders
 from src.disc.commands.pigeon.ui import SpaceActionView
 from src.disc.helpers.pretty import prettify_dict
+from src.disc.helpers.ratelimit import rate_limit
 from src.models import Pigeon, Reminder
-from src.models.pigeon import ExplorationPlanetLocation, SpaceExploration, PigeonRelationship, Gendered, Exploration
+from src.models.pigeon import SpaceExploration, Gendered, Exploration
+from src.models.relationships import relationships
 from src.utils.stats import Winnings, HumanStat, PigeonStat
 from ..base.view import ReminderMenu
 from ...cogs.pigeon.exploration_retrieval import ExplorationRetrieval, MailRetrieval
@@ -35,62 +38,6 @@ class PigeonResources:
         return 'https://www.animatedimages.org/data/media/678/animated-pigeon-image-0045.gif'
 
 
-class CustomPlaceholder:
-    def __init__(self, placeholder: str, getter: Union[Callable[[], str], str]):
-        self.placeholder = placeholder
-        self._value = getter
-
-    def _get_value(self):
-        if callable(self._value):
-            return self._value()
-        return self._value
-
-    def get_value(self, placeholder: str) -> str:
-        value = self._get_value()
-        # Adjust capitalization based on the placeholder pattern
-        if placeholder.isupper():
-            return value.upper()
-        elif placeholder[1].isupper():
-            return value.capitalize()
-        return value
-
-
-def pigeon_placeholders(pigeon: 'Pigeon', pigeon2: Optional['Pigeon'] = None) -> List[CustomPlaceholder]:
-    pronouns = pigeon.get_pronouns()
-    placeholders = [
-        CustomPlaceholder('[name]', pigeon.name),
-        CustomPlaceholder('[they]', pronouns.subject),
-        CustomPlaceholder('[them]', pronouns.object),
-        CustomPlaceholder('[their]', pronouns.possessive_adjective),
-        CustomPlaceholder('[theirs]', pronouns.possessive_pronoun),
-        CustomPlaceholder('[themselves]', pronouns.reflexive),
-    ]
-
-    if pigeon2:
-        pronouns = pigeon2.get_pronouns()
-        placeholders.extend([
-            CustomPlaceholder('[name2]', pigeon2.name),
-            CustomPlaceholder('[they2]', pronouns.subject),
-            CustomPlaceholder('[them2]', pronouns.object),
-            CustomPlaceholder('[their2]', pronouns.possessive_adjective),
-            CustomPlaceholder('[theirs2]', pronouns.possessive_pronoun),
-            CustomPlaceholder('[themselves2]', pronouns.reflexive),
-        ])
-
-    return placeholders
-
-
-def format_placeholders(placeholders: List[CustomPlaceholder], text: str):
-    if not placeholders:
-        return text
-    for placeholder in placeholders:
-        pattern = re.compile(re.escape(placeholder.placeholder), re.IGNORECASE)
-        matches = pattern.findall(text)
-        for match in matches:
-            text = text.replace(match, placeholder.get_value(match), 1)
-    return text
-
-
 class MessageBuilder:
     def __init__(self, initial: str = None):
         self.lines = []
@@ -142,6 +89,9 @@ class Pigeon2(BaseGroupCog, name="pigeon"):
         super().__init__(bot)
         self.helper = PigeonHelper()
 
+    async def cog_load(self) -> None:
+        await self.run_db(lambda: scenario_catalog.catalog)
+
     async def __update_stat(self, interaction: discord.Interaction, stat: PigeonStat, cost: int, message: str):
         targets = await self.validate(interaction)
         winnings = Winnings(stat, HumanStat.gold(-cost))
@@ -220,7 +170,7 @@ class Pigeon2(BaseGroupCog, name="pigeon"):
         await interaction.response.send_message(embed=embed)
 
     async def space_explore(self, interaction: discord.Interaction, pigeon: Pigeon):
-        location: ExplorationPlanetLocation = random.choice(list(self.helper.get_all_locations()))
+        location: LocationData = random.choice(self.helper.get_all_locations())
         image_url = location.image_url or location.planet.image_url
         arrival_date = datetime.datetime.utcnow() + datetime.timedelta(minutes=random.randint(60, 120))
 
@@ -339,7 +289,7 @@ class Pigeon2(BaseGroupCog, name="pigeon"):
             await interaction.response.send_message(quick_message('Your pigeon is still on [their] way.', pigeon))
             return
 
-        location = self.helper.find_location(exploration.location.id)
+        location = self.helper.find_location(exploration.location_id)
 
         menu = SpaceActionView(interaction.user, list(location.actions), exploration)
         desc = [f'Your pigeon arrives at {location.planet.name} ({location.name}).',
@@ -364,7 +314,7 @@ class Pigeon2(BaseGroupCog, name="pigeon"):
     @has_pigeon()
     @guild_only()
     @has_status(Pigeon.Status.idle)
-    @commands.cooldown(1, (3600 * 1), type=commands.BucketType.user)
+    @rate_limit(1, (3600 * 1))
     @commands.max_concurrency(1, commands.BucketType.user)
     @app_commands.command(name="poop", description="Poop on another pigeon.")
     async def poop(self, interaction: discord.Interaction, member: discord.Member):
@@ -374,9 +324,7 @@ class Pigeon2(BaseGroupCog, name="pigeon"):
         pigeon2 = other_targets.get_pigeon()
 
         price = 5
-        relationship = PigeonRelationship.get_or_create_for(pigeon, pigeon2)
-        relationship.score -= price
-        relationship.save()
+        relationships.add_score(pigeon.id, pigeon2.id, -price)
 
         embed = discord.Embed()
         message = MessageBuilder()
@@ -5,7 +5,7 @@ import emoji
 from src.config import config
 from src.disc.cogs.pigeon.cog import get_active_pigeon
 from src.models import Pigeon, Human
-from src.models.pigeon import ExplorationPlanetLocation
+from src.disc.commands.pigeon.catalog import scenario_catalog, LocationData
 
 
 class PigeonHelper:
@@ -13,14 +13,11 @@ class PigeonHelper:
     def get_pigeon(self, user_id: int) -> Optional[Pigeon]:
         return get_active_pigeon(user_id)
 
-    @config.cache(category='pigeon')
-    def get_all_locations(self) -> Iterable[ExplorationPlanetLocation]:
-        return ExplorationPlanetLocation.select().where(ExplorationPlanetLocation.active == True)
+    def get_all_locations(self) -> Iterable[LocationData]:
+        return scenario_catalog.active_locations()
 
-    def find_location(self, location_id: int) -> Optional[ExplorationPlanetLocation]:
-        for location in self.get_all_locations():
-            if location.id == location_id:
-                return location
+    def find_location(self, location_id: int) -> Optional[LocationData]:
+        return scenario_catalog.get_location(location_id)
 
 
 # class HumanHelper:
@@ -0,0 +1,58 @@
+from typing import Callable, List, Optional, Union
+
+from src.models import Pigeon
+from src.utils import template
+
+
+class CustomPlaceholder:
+    def __init__(self, placeholder: str, getter: Union[Callable[[], str], str]):
+        self.placeholder = placeholder
+        self._value = getter
+
+    def _get_value(self):
+        if callable(self._value):
+            return self._value()
+        return self._value
+
+    def get_value(self, placeholder: str) -> str:
+        value = self._get_value()
+        # Adjust capitalization based on the placeholder pattern
+        if placeholder.isupper():
+            return value.upper()
+        elif placeholder[1].isupper():
+            return value.capitalize()
+        return value
+
+
+def pigeon_placeholders(pigeon: 'Pigeon', pigeon2: Optional['Pigeon'] = None) -> List[CustomPlaceholder]:
+    pronouns = pigeon.get_pronouns()
+    placeholders = [
+        CustomPlaceholder('[name]', pigeon.name),
+        CustomPlaceholder('[they]', pronouns.subject),
+        CustomPlaceholder('[them]', pronouns.object),
+        CustomPlaceholder('[their]', pronouns.possessive_adjective),
+        CustomPlaceholder('[theirs]', pronouns.possessive_pronoun),
+        CustomPlaceholder('[themselves]', pronouns.reflexive),
+    ]
+
+    if pigeon2:
+        pronouns = pigeon2.get_pronouns()
+        placeholders.extend([
+            CustomPlaceholder('[name2]', pigeon2.name),
+            CustomPlaceholder('[they2]', pronouns.subject),
+            CustomPlaceholder('[them2]', pronouns.object),
+            CustomPlaceholder('[their2]', pronouns.possessive_adjective),
+            CustomPlaceholder('[theirs2]', pronouns.possessive_pronoun),
+            CustomPlaceholder('[themselves2]', pronouns.reflexive),
+        ])
+
+    return placeholders
+
+
+def format_placeholders(placeholders: List[CustomPlaceholder], text: str):
+    if not placeholders:
+        return text
+    values = {}
+    for placeholder in placeholders:
+        values.setdefault(placeholder.placeholder.lower(), placeholder.get_value)
+    return template.render(text, values)
@@ -0,0 +1,77 @@
+import collections
+import random
+import unittest
+
+from src.disc.commands.pigeon.catalog import ScenarioCatalog
+from src.models import Item
+from src.models.pigeon import ExplorationPlanet, ExplorationPlanetLocation, ExplorationAction, \
+    ExplorationActionScenario
+from src.models.testing import ModelTestCase
+
+
+class ScenarioCatalogTest(ModelTestCase):
+    def setUp(self):
+        super().setUp()
+        self.planet = ExplorationPlanet.create(name="Mars", image_url="")
+        self.location = ExplorationPlanetLocation.create(name="Crater", planet=self.planet, active=True)
+        self.hidden = ExplorationPlanetLocation.create(name="Cave", planet=self.planet, active=False)
+        self.action = self.create_action("Dig", self.location)
+        self.empty = self.create_action("Wait", self.location)
+        self.item = Item.create(name="Rock", code="rock", description="", image_url="", chance=1)
+        for gold in (1, 2, 3):
+            ExplorationActionScenario.create(text=f"found {gold}", action=self.action, gold=gold)
+        ExplorationActionScenario.create(text="found a rock", action=self.action, item=self.item)
+        self.catalog = ScenarioCatalog()
+
+    def create_action(self, name: str, location: ExplorationPlanetLocation) -> ExplorationAction:
+        return ExplorationAction.create(name=name, symbol="⛏", location=location, planet=location.planet)
+
+    def test_graph(self):
+        locations = self.catalog.active_locations()
+        self.assertEqual([x.id for x in locations], [self.location.id])
+        location = locations[0]
+        self.assertEqual(location.planet.name, "Mars")
+        self.assertEqual([x.name for x in location.actions], ["Dig", "Wait"])
+        self.assertIsNotNone(self.catalog.get_location(self.hidden.id))
+        self.assertEqual(len(self.catalog.get_action(self.action.id).scenarios), 4)
+        self.assertIsNone(self.catalog.get_action(-1))
+
+    def test_snapshot_until_reload(self):
+        catalog = self.catalog.catalog
+        ExplorationActionScenario.create(text="found nothing", action=self.empty)
+        self.assertIs(self.catalog.catalog, catalog)
+        self.assertEqual(self.catalog.get_action(self.empty.id).scenarios, ())
+
+        self.assertIsNot(self.catalog.reload(), catalog)
+        self.assertEqual(len(self.catalog.get_action(self.empty.id).scenarios), 1)
+
+    def test_pick_scenario(self):
+        action = self.catalog.get_action(self.action.id)
+        picks = [action.pick_scenario(random.Random(0)).id for _ in range(3)]
+        self.assertEqual(len(set(picks)), 1)
+
+        rng = random.Random(1)
+        counts = collections.Counter(action.pick_scenario(rng).id for _ in range(4000))
+        self.assertEqual(set(counts), {x.id for x in action.scenarios})
+        # equally likely.
+        self.assertTrue(all(800 < x < 1200 for x in counts.values()))
+
+    def test_action_without_scenarios(self):
+        self.assertIsNone(self.catalog.get_action(self.empty.id).pick_scenario())
+
+    def test_item_resolved_when_handed_out(self):
+        scenario = self.catalog.get_action(self.action.id).scenarios[-1]
+        self.assertEqual(scenario.item_id, self.item.id)
+        self.item.name = "Moon rock"
+        self.item.save()
+
+        stats = {x.name: x for x in scenario.to_winnings()}
+        self.assertEqual(stats["item"].info.name, "Moon rock")
+        self.assertNotIn("gold", stats)
+
+        self.item.delete_instance()
+        self.assertEqual(len(scenario.to_winnings()), 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
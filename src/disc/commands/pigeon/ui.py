@@ -1,16 +1,16 @@
 import datetime
-from typing import List
+from typing import List, Optional
 
 import discord
 
+from src.disc.commands.pigeon.catalog import ActionData, ScenarioData
 from src.disc.helpers.pretty import TimeDeltaHelper
-from src.models.pigeon import ExplorationAction, ExplorationActionScenario, SpaceExploration, \
-    SpaceExplorationScenarioWinnings, Pigeon
+from src.models.pigeon import SpaceExploration, SpaceExplorationScenarioWinnings, Pigeon
 from src.utils.stats import Winnings
 
 
 class SpaceActionButton(discord.ui.Button):
-    def __init__(self, action: ExplorationAction):
+    def __init__(self, action: ActionData):
         super().__init__(
             label=action.name,
             emoji=action.symbol
@@ -19,7 +19,7 @@ class SpaceActionButton(discord.ui.Button):
 
 
 class SpaceActionView(discord.ui.View):
-    def __init__(self, user: discord.User, actions: List[ExplorationAction], exploration: SpaceExploration):
+    def __init__(self, user: discord.User, actions: List[ActionData], exploration: SpaceExploration):
         super(self.__class__, self).__init__()
         self.actions = actions
         self.user = user
@@ -28,7 +28,7 @@ class SpaceActionView(discord.ui.View):
         self.winnings = self.__load_winnings()
         for action in self.actions:
             button = SpaceActionButton(action)
-            button.disabled = action.id in self._used_action_ids
+            button.disabled = action.id in self._used_action_ids or not action.scenarios
             button.callback = self.__create_callback_for(button)
             self.add_item(button)
 
@@ -69,7 +69,13 @@ class SpaceActionView(discord.ui.View):
         self.exploration.save()
 
     async def action_callback(self, button: SpaceActionButton, interaction: discord.Interaction):
-        scenario: ExplorationActionScenario = button.action.scenarios.rand().limit(1).first()
+        scenario: Optional[ScenarioData] = button.action.pick_scenario()
+        if scenario is None:
+            # the action lost its scenarios in a reload after the view was sent.
+            button.disabled = True
+            await interaction.response.send_message("Nothing happened.", ephemeral=True)
+            await self.refresh()
+            return
         winnings = scenario.to_winnings()
 
         # todo: category support.
@@ -82,7 +88,7 @@ class SpaceActionView(discord.ui.View):
         await interaction.response.send_message(embed=embed)
 
         SpaceExplorationScenarioWinnings.create(
-            action=button.action,
+            action=button.action.id,
             exploration=self.exploration,
             **winnings.to_dict()
         )
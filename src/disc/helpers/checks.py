@@ -1,7 +1,6 @@
 from discord.ext import commands
 
 from src.config import config
-from src.models import database
 
 
 class SpecificGuildOnly(commands.errors.CheckFailure):
@@ -20,7 +19,7 @@ def specific_guild_only(guild_id):
 
 def is_tester():
     def predicate(ctx):
-        with database.connection_context():
+        with config.bot.connections.scope():
             human = config.bot.get_human(user=ctx.author)
             return human.tester
 
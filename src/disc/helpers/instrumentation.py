@@ -0,0 +1,185 @@
+import asyncio
+import contextvars
+import functools
+import json
+import math
+import threading
+import time
+from collections import deque
+from typing import Deque, Dict, List, Optional, Sequence
+
+import peewee
+
+_current: contextvars.ContextVar[Optional['Invocation']] = contextvars.ContextVar("invocation", default=None)
+
+
+class Invocation:
+    """Timings of a single command or interaction, shared with the database threads it runs work on."""
+
+    __slots__ = ("name", "started_at", "db_time", "queries", "saved", "http_time", "requests", "_lock", "_token")
+
+    def __init__(self, name: str):
+        self.name = name
+        self.started_at = time.perf_counter()
+        self.db_time = 0.0
+        self.queries = 0
+        # queries avoided by sharing already loaded rows, see `record_saved_queries`.
+        self.saved = 0
+        self.http_time = 0.0
+        self.requests = 0
+        self._lock = threading.Lock()
+        self._token = None
+
+    def add_query(self, seconds: float):
+        with self._lock:
+            self.db_time += seconds
+            self.queries += 1
+
+    def add_request(self, seconds: float):
+        with self._lock:
+            self.http_time += seconds
+            self.requests += 1
+
+    def add_saved(self, count: int):
+        with self._lock:
+            self.saved += count
+
+
+def record_saved_queries(count: int):
+    """Credits the running invocation, if any, with `count` queries that did not have to be issued."""
+    invocation = _current.get()
+    if invocation is not None and count:
+        invocation.add_saved(count)
+
+
+def _percentile(ordered: Sequence[float], percent: float) -> float:
+    if not ordered:
+        return 0.0
+    # nearest rank
+    return ordered[max(0, math.ceil(percent / 100 * len(ordered)) - 1)]
+
+
+class CommandMetrics:
+    """
+    Per command wall, database and discord http time plus query counts, issued and saved.
+    Only the last `window` invocations of each command are kept for the percentiles.
+    """
+
+    fields = ("wall", "db", "http", "queries", "saved")
+
+    def __init__(self, window: int = 1000):
+        self.window = window
+        self._samples: Dict[str, Deque[tuple]] = {}
+        self._counts: Dict[str, int] = {}
+        self._lock = threading.Lock()
+        self._task: Optional[asyncio.Task] = None
+
+    def install(self, databases: Sequence[peewee.Database], http=None):
+        """Hooks query execution on `databases` and, when given, discord's http client."""
+        for database in databases:
+            if getattr(database.execute_sql, "__instrumented__", False):
+                continue
+            database.execute_sql = self._timed_query(database.execute_sql)
+        if http is not None and not getattr(http.request, "__instrumented__", False):
+            http.request = self._timed_request(http.request)
+
+    @staticmethod
+    def _timed_query(execute_sql):
+        @functools.wraps(execute_sql)
+        def wrapper(*args, **kwargs):
+            invocation = _current.get()
+            if invocation is None:
+                return execute_sql(*args, **kwargs)
+            start = time.perf_counter()
+            try:
+                return execute_sql(*args, **kwargs)
+            finally:
+                invocation.add_query(time.perf_counter() - start)
+
+        wrapper.__instrumented__ = True
+        return wrapper
+
+    @staticmethod
+    def _timed_request(request):
+        @functools.wraps(request)
+        async def wrapper(*args, **kwargs):
+            invocation = _current.get()
+            if invocation is None:
+                return await request(*args, **kwargs)
+            start = time.perf_counter()
+            try:
+                return await request(*args, **kwargs)
+            finally:
+                invocation.add_request(time.perf_counter() - start)
+
+        wrapper.__instrumented__ = True
+        return wrapper
+
+    def start(self, name: str) -> Invocation:
+        invocation = Invocation(name)
+        invocation._token = _current.set(invocation)
+        return invocation
+
+    def finish(self, invocation: Invocation, name: str = None):
+        wall = time.perf_counter() - invocation.started_at
+        try:
+            _current.reset(invocation._token)
+        except ValueError:
+            # finished from another context than it was started in, the context dies with its task anyway.
+            pass
+
+        name = name or invocation.name
+        with self._lock:
+            samples = self._samples.get(name)
+            if samples is None:
+                samples = self._samples[name] = deque(maxlen=self.window)
+            samples.append((wall, invocation.db_time, invocation.http_time, invocation.queries, invocation.saved))
+            self._counts[name] = self._counts.get(name, 0) + 1
+
+    def summary(self, name: str) -> dict:
+        with self._lock:
+            samples = list(self._samples.get(name, ()))
+            count = self._counts.get(name, 0)
+
+        data = {"count": count}
+        for i, field in enumerate(self.fields):
+            ordered = sorted(x[i] for x in samples)
+            scale = 1 if field in ("queries", "saved") else 1000
+            for percent in (50, 95, 99):
+                data[f"{field}_p{percent}"] = round(_percentile(ordered, percent) * scale, 1)
+            data[f"{field}_max"] = round((ordered[-1] if ordered else 0) * scale, 1)
+        return data
+
+    def summaries(self) -> Dict[str, dict]:
+        with self._lock:
+            names = list(self._samples)
+        return {x: self.summary(x) for x in names}
+
+    def top(self, limit: int = 15, key: str = "wall_p95") -> List[tuple]:
+        return sorted(self.summaries().items(), key=lambda x: -x[1][key])[:limit]
+
+    def reset(self):
+        with self._lock:
+            self._samples.clear()
+            self._counts.clear()
+
+    def save(self, path: str):
+        with open(path, "w") as f:
+            json.dump({"written_at": time.time(), "commands": self.summaries()}, f, indent=2)
+
+    async def _run(self, path: str, interval: float):
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                self.save(path)
+            except OSError as e:
+                print(f"Could not write command stats: {e}")
+
+    def start_writer(self, path: str, interval: float = 5 * 60):
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(self._run(path, interval))
+
+    def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
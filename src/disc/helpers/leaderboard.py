@@ -0,0 +1,157 @@
+import bisect
+import threading
+from typing import Any, Callable, Dict, Hashable, Iterable, List, Optional, Set, Tuple
+
+from src.disc.helpers.pretty import Row, Table
+
+# (guild id, key, score, data), data is whatever rendering needs about the key, e.g. a name.
+Entry = Tuple[int, Hashable, int, Any]
+
+# rows a rendered scoreboard shows at most, 20 pages of 15.
+TABLE_LIMIT = 300
+
+
+class GuildBoard:
+    __slots__ = ("entries", "scores")
+
+    def __init__(self):
+        # (-score, key) ascending, so the highest score comes first and ties fall back to the key.
+        self.entries: List[Tuple[int, Hashable]] = []
+        self.scores: Dict[Hashable, int] = {}
+
+    def set(self, key: Hashable, score: int):
+        old = self.scores.get(key)
+        if old == score:
+            return
+        if old is not None:
+            del self.entries[bisect.bisect_left(self.entries, (-old, key))]
+        bisect.insort(self.entries, (-score, key))
+        self.scores[key] = score
+
+    def remove(self, key: Hashable):
+        old = self.scores.pop(key, None)
+        if old is not None:
+            del self.entries[bisect.bisect_left(self.entries, (-old, key))]
+
+    def rank(self, key: Hashable) -> Optional[int]:
+        score = self.scores.get(key)
+        if score is not None:
+            return bisect.bisect_left(self.entries, (-score, key)) + 1
+
+
+class Leaderboard:
+    """
+    Scores per guild, kept sorted in memory. Rank lookups are a binary search, pages are slices.
+    `rebuild` reloads everything from `loader`, in between callers keep it current through `set` / `increment`.
+    """
+
+    def __init__(self, name: str, loader: Callable[[], Iterable[Entry]]):
+        self.name = name
+        self._loader = loader
+        self._boards: Dict[int, GuildBoard] = {}
+        self._guilds: Dict[Hashable, Set[int]] = {}
+        self._data: Dict[Hashable, Any] = {}
+        self._lock = threading.RLock()
+        self.loaded = False
+
+    def rebuild(self) -> int:
+        boards: Dict[int, GuildBoard] = {}
+        guilds: Dict[Hashable, Set[int]] = {}
+        data: Dict[Hashable, Any] = {}
+        count = 0
+        for guild_id, key, score, value in self._loader():
+            board = boards.get(guild_id)
+            if board is None:
+                board = boards[guild_id] = GuildBoard()
+            board.scores[key] = score
+            guilds.setdefault(key, set()).add(guild_id)
+            data[key] = value
+            count += 1
+        for board in boards.values():
+            board.entries = sorted((-score, key) for key, score in board.scores.items())
+
+        with self._lock:
+            self._boards, self._guilds, self._data = boards, guilds, data
+            self.loaded = True
+        return count
+
+    def guilds(self, key: Hashable) -> Set[int]:
+        with self._lock:
+            return set(self._guilds.get(key, ()))
+
+    def data(self, key: Hashable) -> Any:
+        return self._data.get(key)
+
+    def set(self, key: Hashable, score: int, guild_ids: Iterable[int] = None, data: Any = None):
+        """Updates the score of `key` in every guild it is on, `guild_ids` adds it to those as well."""
+        with self._lock:
+            if not self.loaded:
+                return
+            guilds = self._guilds.setdefault(key, set())
+            if guild_ids is not None:
+                guilds.update(guild_ids)
+            for guild_id in guilds:
+                board = self._boards.get(guild_id)
+                if board is None:
+                    board = self._boards[guild_id] = GuildBoard()
+                board.set(key, score)
+            if data is not None:
+                self._data[key] = data
+
+    def increment(self, guild_id: int, key: Hashable, amount: int = 1, data: Any = None):
+        with self._lock:
+            if not self.loaded:
+                return
+            board = self._boards.get(guild_id)
+            if board is None:
+                board = self._boards[guild_id] = GuildBoard()
+            board.set(key, board.scores.get(key, 0) + amount)
+            self._guilds.setdefault(key, set()).add(guild_id)
+            if data is not None:
+                self._data[key] = data
+
+    def remove(self, key: Hashable, guild_id: int = None):
+        with self._lock:
+            guilds = self._guilds.get(key, set())
+            for id in ([guild_id] if guild_id is not None else list(guilds)):
+                board = self._boards.get(id)
+                if board is not None:
+                    board.remove(key)
+                guilds.discard(id)
+            if not guilds:
+                self._guilds.pop(key, None)
+                self._data.pop(key, None)
+
+    def rank(self, guild_id: int, key: Hashable) -> Optional[int]:
+        with self._lock:
+            board = self._boards.get(guild_id)
+            return board.rank(key) if board is not None else None
+
+    def size(self, guild_id: int) -> int:
+        board = self._boards.get(guild_id)
+        return len(board.entries) if board is not None else 0
+
+    def top(self, guild_id: int, limit: int = None, offset: int = 0) -> List[Tuple[int, Hashable, int]]:
+        """(rank, key, score) from `offset`, highest score first."""
+        with self._lock:
+            board = self._boards.get(guild_id)
+            if board is None:
+                return []
+            end = None if limit is None else offset + limit
+            entries = board.entries[offset:end]
+        return [(offset + i + 1, key, -score) for i, (score, key) in enumerate(entries)]
+
+    def to_table(self,
+                 guild_id: int,
+                 header: List[str],
+                 format_row: Callable[[int, Hashable, int, Any], Optional[List[Any]]],
+                 limit: int = TABLE_LIMIT,
+                 **kwargs) -> Table:
+        """A `Table` of the top `limit` entries, rows `format_row` returns None for are left out."""
+        table = Table(**kwargs)
+        table.add_row(Row(header, header=True))
+        for rank, key, score in self.top(guild_id, limit):
+            values = format_row(rank, key, score, self._data.get(key))
+            if values is not None:
+                table.add_row(Row(values))
+        return table
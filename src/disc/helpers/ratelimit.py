@@ -0,0 +1,138 @@
+import time
+from collections import OrderedDict
+from typing import Hashable, Union
+
+import discord
+from discord import app_commands
+from discord.ext import commands
+from discord.ext.commands import BucketType
+
+Source = Union[commands.Context, discord.Interaction]
+
+
+class RateLimiter:
+    """
+    Token buckets allowing `rate` uses per `per` seconds, bursts up to `rate`.
+
+    Buckets are kept in least recently used order. A bucket idle for `per` seconds is full again,
+    which is the same as having no bucket, so those are dropped from the front on every hit.
+    """
+
+    def __init__(self, rate: int, per: float, max_size: int = 10000):
+        self.rate = rate
+        self.per = per
+        self.max_size = max_size
+        self.cooldown = app_commands.Cooldown(rate, per)
+        self._refill = rate / per
+        self._buckets: OrderedDict = OrderedDict()
+
+    def __len__(self):
+        return len(self._buckets)
+
+    def _expire(self, now: float):
+        while self._buckets:
+            key, (_, updated_at) = next(iter(self._buckets.items()))
+            if now - updated_at < self.per and len(self._buckets) < self.max_size:
+                break
+            del self._buckets[key]
+
+    def hit(self, key: Hashable, now: float = None) -> float:
+        """Takes a token, returns 0 when allowed, otherwise the seconds until a token is available."""
+        now = time.monotonic() if now is None else now
+        self._expire(now)
+
+        bucket = self._buckets.pop(key, None)
+        if bucket is None:
+            tokens = self.rate
+        else:
+            tokens = min(self.rate, bucket[0] + (now - bucket[1]) * self._refill)
+
+        retry_after = 0.0
+        if tokens >= 1:
+            tokens -= 1
+        else:
+            retry_after = (1 - tokens) / self._refill
+        self._buckets[key] = (tokens, now)
+        return retry_after
+
+    def refund(self, key: Hashable, now: float = None):
+        """Gives back a token `hit` took, a bucket that has expired meanwhile is full already."""
+        now = time.monotonic() if now is None else now
+        bucket = self._buckets.get(key)
+        if bucket is not None:
+            tokens = bucket[0] + (now - bucket[1]) * self._refill
+            self._buckets[key] = (min(self.rate, tokens + 1), now)
+
+    def reset(self, key: Hashable = None):
+        if key is None:
+            self._buckets.clear()
+        else:
+            self._buckets.pop(key, None)
+
+
+def get_key(source: Source, per: BucketType) -> Hashable:
+    """`BucketType.get_key` for both contexts and interactions."""
+    user = source.user if isinstance(source, discord.Interaction) else source.author
+    if per is BucketType.user:
+        return user.id
+    if per is BucketType.guild:
+        return (source.guild or user).id
+    if per is BucketType.channel:
+        return source.channel.id
+    if per is BucketType.member:
+        return (source.guild and source.guild.id), user.id
+    return 0
+
+
+def check(limiter: RateLimiter, source: Source, per: BucketType = BucketType.user):
+    """Raises the fitting `CommandOnCooldown` when `source` is out of tokens."""
+    retry_after = limiter.hit(get_key(source, per))
+    if not retry_after:
+        return
+    if isinstance(source, discord.Interaction):
+        raise app_commands.CommandOnCooldown(limiter.cooldown, retry_after)
+    raise commands.CommandOnCooldown(limiter.cooldown, retry_after, per)
+
+
+def _taken(source: Source) -> list:
+    """(limiter, key) pairs `rate_limit` took a token from for this invocation."""
+    if isinstance(source, discord.Interaction):
+        return source.extras.setdefault("rate_limits", [])
+    if not hasattr(source, "rate_limits"):
+        source.rate_limits = []
+    return source.rate_limits
+
+
+def refund(source: Source):
+    """Gives the tokens of a failed invocation back, a command that failed a check or validation is free."""
+    taken = _taken(source)
+    while taken:
+        limiter, key = taken.pop()
+        limiter.refund(key)
+
+
+def rate_limit(rate: int, per: float, type: BucketType = BucketType.user):
+    """
+    Cooldown for prefix commands and app commands (including `BaseGroupCog` ones) alike.
+    Checks run before the callback, so a limited user never reaches the database. The token is handed back
+    through `refund` when another check or the command's validations fail after this one passed.
+    """
+    limiter = RateLimiter(rate, per)
+
+    def predicate(source: Source) -> bool:
+        key = get_key(source, type)
+        check(limiter, source, type)
+        _taken(source).append((limiter, key))
+        return True
+
+    def decorator(func):
+        if isinstance(func, (app_commands.Command, app_commands.ContextMenu)):
+            return app_commands.check(predicate)(func)
+        if isinstance(func, commands.Command):
+            return commands.check(predicate)(func)
+        # a plain callback, whichever command type ends up wrapping it picks up its own check.
+        func = commands.check(predicate)(func)
+        return app_commands.check(predicate)(func)
+
+    decorator.limiter = limiter
+    return decorator
@@ -0,0 +1,145 @@
+import asyncio
+import datetime
+import heapq
+import traceback
+from typing import Awaitable, Callable, Dict, Iterable, List, Optional, Tuple
+
+Key = Tuple[type, int]
+
+
+class ActivityScheduler:
+    """
+    Min-heap of activity end dates. Sleeps until the earliest one is due and hands everything due at that
+    moment to `resolve` in a single call, grouped per model. `resolve` returns the ids it could not resolve, those
+    are retried after `retry_delay` up to `max_retries` times and then dropped.
+
+    Entries are removed lazily: cancelling or rescheduling only touches `_pending`, heap entries that no longer
+    match it are skipped when they surface. `resolve` should still check `finished`, rows can be finished
+    elsewhere without the scheduler knowing.
+    """
+
+    def __init__(self,
+                 resolve: Callable[[Dict[type, List[int]]], Awaitable[Optional[Dict[type, List[int]]]]],
+                 retry_delay: float = 30.0,
+                 max_retries: int = 5):
+        self._resolve = resolve
+        self.retry_delay = retry_delay
+        self.max_retries = max_retries
+        self._heap: List[Tuple[datetime.datetime, str, int, type]] = []
+        self._pending: Dict[Key, datetime.datetime] = {}
+        self._attempts: Dict[Key, int] = {}
+        self._wakeup = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+        self.resolved = 0
+        self.given_up = 0
+
+    def __len__(self):
+        return len(self._pending)
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    @property
+    def next_due(self) -> Optional[datetime.datetime]:
+        self._discard_stale()
+        return self._heap[0][0] if self._heap else None
+
+    def schedule(self, activity):
+        """Adds or moves `activity`, an Activity row with an `end_date`."""
+        self._push(type(activity), activity.id, activity.end_date)
+
+    def cancel(self, activity):
+        self.discard(type(activity), activity.id)
+
+    def discard(self, model: type, id: int):
+        self._attempts.pop((model, id), None)
+        if self._pending.pop((model, id), None) is not None:
+            self._wakeup.set()
+
+    def load(self, activities: Iterable):
+        for activity in activities:
+            self._push(type(activity), activity.id, activity.end_date)
+
+    def _push(self, model: type, id: int, end_date: datetime.datetime):
+        if end_date is None:
+            return
+        key = (model, id)
+        self._pending[key] = end_date
+        # the model name breaks ties so entries never have to compare classes.
+        heapq.heappush(self._heap, (end_date, model.__name__, id, model))
+        if self._heap[0][0] == end_date:
+            self._wakeup.set()
+
+    def _discard_stale(self):
+        while self._heap:
+            end_date, _, id, model = self._heap[0]
+            if self._pending.get((model, id)) == end_date:
+                return
+            heapq.heappop(self._heap)
+
+    def _pop_due(self, now: datetime.datetime) -> Dict[type, List[int]]:
+        due: Dict[type, List[int]] = {}
+        while True:
+            self._discard_stale()
+            if not self._heap or self._heap[0][0] > now:
+                return due
+            _, _, id, model = heapq.heappop(self._heap)
+            del self._pending[(model, id)]
+            due.setdefault(model, []).append(id)
+
+    async def _run(self):
+        while True:
+            self._wakeup.clear()
+            next_due = self.next_due
+            if next_due is None:
+                await self._wakeup.wait()
+                continue
+
+            delay = (next_due - datetime.datetime.utcnow()).total_seconds()
+            if delay > 0:
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=delay)
+                    continue
+                except asyncio.TimeoutError:
+                    pass
+
+            due = self._pop_due(datetime.datetime.utcnow())
+            if not due:
+                continue
+            try:
+                failed = await self._resolve(due) or {}
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                traceback.print_exc()
+                failed = due
+            self._retry(due, failed)
+
+    def _retry(self, due: Dict[type, List[int]], failed: Dict[type, List[int]]):
+        retry_at = datetime.datetime.utcnow() + datetime.timedelta(seconds=self.retry_delay)
+        for model, ids in due.items():
+            failed_ids = set(failed.get(model, ()))
+            for id in ids:
+                key = (model, id)
+                if id not in failed_ids:
+                    self._attempts.pop(key, None)
+                    self.resolved += 1
+                    continue
+                attempts = self._attempts.get(key, 0) + 1
+                if attempts > self.max_retries:
+                    self._attempts.pop(key, None)
+                    self.given_up += 1
+                    print(f"Giving up on {model.__name__} {id} after {attempts} failed attempts")
+                    continue
+                self._attempts[key] = attempts
+                self._push(model, id, retry_at)
+
+    def start(self):
+        if not self.running:
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
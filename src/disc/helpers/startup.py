@@ -0,0 +1,199 @@
+import asyncio
+import datetime
+import functools
+import json
+import time
+from contextlib import contextmanager
+from typing import Dict, List, Optional, Sequence
+
+from discord.ext import commands
+
+
+class StartupReport:
+    """Wall clock timings per startup phase and per cog, so boots can be compared across releases."""
+
+    ready_timeout = 30.0
+
+    def __init__(self):
+        self.started_at = time.perf_counter()
+        self.created_at = datetime.datetime.utcnow()
+        self.phases: Dict[str, float] = {}
+        self.cogs: Dict[str, Dict[str, float]] = {}
+        self.pending_ready: Dict[str, float] = {}
+        self.total: Optional[float] = None
+        self._expected_ready = 0
+        self._ready_done = asyncio.Event()
+
+    @contextmanager
+    def phase(self, name: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.phases[name] = self.phases.get(name, 0.0) + time.perf_counter() - start
+
+    def record(self, cog: str, step: str, seconds: float):
+        steps = self.cogs.setdefault(cog, {})
+        steps[step] = steps.get(step, 0.0) + seconds
+
+    @contextmanager
+    def measure(self, cog: str, step: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(cog, step, time.perf_counter() - start)
+
+    def track_ready_listeners(self, bot: commands.Bot):
+        """
+        Swaps every cog's `on_ready` listener for a timed one. The wrapper puts the original back
+        the first time it runs, so reconnects and cog reloads afterwards are untouched.
+        """
+        for cog in list(bot.cogs.values()):
+            for name, listener in cog.get_listeners():
+                if name != "on_ready":
+                    continue
+                bot.remove_listener(listener, name)
+                bot.add_listener(self._timed_listener(bot, cog, listener), name)
+                self._expected_ready += 1
+        if self._expected_ready == 0:
+            self._ready_done.set()
+
+    def _timed_listener(self, bot: commands.Bot, cog: commands.Cog, listener):
+        # keyed by module so the timings line up with the extension's load.
+        key = type(cog).__module__
+
+        @functools.wraps(listener)
+        async def wrapper(*args, **kwargs):
+            bot.remove_listener(wrapper, "on_ready")
+            if bot.get_cog(cog.qualified_name) is not cog:
+                self._ready_finished(key, None)
+                return
+            bot.add_listener(listener, "on_ready")
+
+            start = time.perf_counter()
+            self.pending_ready[key] = start
+            try:
+                await listener(*args, **kwargs)
+            finally:
+                self._ready_finished(key, time.perf_counter() - start)
+
+        return wrapper
+
+    def _ready_finished(self, cog: str, seconds: Optional[float]):
+        self.pending_ready.pop(cog, None)
+        if seconds is not None:
+            self.record(cog, "on_ready", seconds)
+        self._expected_ready -= 1
+        if self._expected_ready <= 0:
+            self._ready_done.set()
+
+    async def wait_for_ready_listeners(self):
+        """Waits for the timed listeners, long running ones (sleeps, pollers) are reported as still running."""
+        try:
+            await asyncio.wait_for(self._ready_done.wait(), timeout=self.ready_timeout)
+        except asyncio.TimeoutError:
+            pass
+        self.total = time.perf_counter() - self.started_at
+
+    def to_dict(self) -> dict:
+        now = time.perf_counter()
+        return {
+            "created_at": self.created_at.isoformat(),
+            "total_ms": _ms(self.total if self.total is not None else now - self.started_at),
+            "phases": {k: _ms(v) for k, v in self.phases.items()},
+            "cogs": {cog: {k: _ms(v) for k, v in steps.items()} for cog, steps in self.cogs.items()},
+            "still_running": {cog: _ms(now - start) for cog, start in self.pending_ready.items()},
+        }
+
+    def format(self) -> str:
+        data = self.to_dict()
+        lines = [f"startup: {data['total_ms']}ms"]
+        for name, value in data["phases"].items():
+            lines.append(f"  {name:<10} {value:>9}ms")
+
+        steps = ("load", "on_ready", "sync")
+        lines.append(f"  {'cog':<36}" + "".join(f"{x:>10}" for x in steps))
+        ordered = sorted(data["cogs"].items(), key=lambda x: -sum(x[1].values()))
+        for cog, values in ordered:
+            columns = "".join(f"{values[x] if x in values else '-':>10}" for x in steps)
+            lines.append(f"  {cog:<36}{columns}")
+        for cog, value in data["still_running"].items():
+            lines.append(f"  {cog} on_ready still running after {value}ms")
+        return "\n".join(lines)
+
+    def save(self, path: str):
+        """Appends the report as a json line, one line per boot."""
+        with open(path, "a") as f:
+            f.write(json.dumps(self.to_dict()) + "\n")
+
+
+def _ms(seconds: float) -> float:
+    return round(seconds * 1000, 1)
+
+
+class ExtensionLoader:
+    """
+    Loads extensions concurrently, an extension only starts once everything it `requires` is loaded.
+
+    `load_extension` executes the module on the event loop, it always builds a fresh module object, so
+    there is nothing to gain from importing it elsewhere first. While one extension awaits its async
+    `setup` / `cog_load`, the next one is loaded. The "load" timing covers both.
+    """
+
+    def __init__(self, bot: commands.Bot, report: StartupReport):
+        self.bot = bot
+        self.report = report
+
+    async def _load(self, name: str, requires: Sequence[str], loaded: Dict[str, asyncio.Future]):
+        if requires:
+            await asyncio.gather(*(loaded[x] for x in requires))
+        with self.report.measure(name, "load"):
+            await self.bot.load_extension(name)
+
+    @staticmethod
+    def _check_cycles(extensions: Dict[str, Sequence[str]]):
+        visiting, done = set(), set()
+
+        def visit(name):
+            if name in done:
+                return
+            if name in visiting:
+                raise ValueError(f"Circular extension dependency on {name}")
+            visiting.add(name)
+            for x in extensions[name]:
+                visit(x)
+            visiting.discard(name)
+            done.add(name)
+
+        for name in extensions:
+            visit(name)
+
+    async def load(self, extensions: Dict[str, Sequence[str]]) -> List[str]:
+        unknown = {x for requires in extensions.values() for x in requires} - set(extensions)
+        if unknown:
+            raise ValueError(f"Unknown extension dependencies: {', '.join(sorted(unknown))}")
+        self._check_cycles(extensions)
+
+        loop = asyncio.get_running_loop()
+        loaded: Dict[str, asyncio.Future] = {x: loop.create_future() for x in extensions}
+
+        async def run(name):
+            try:
+                await self._load(name, extensions[name], loaded)
+            except BaseException as e:
+                loaded[name].set_exception(e)
+                raise
+            else:
+                loaded[name].set_result(name)
+
+        results = await asyncio.gather(*(run(x) for x in extensions), return_exceptions=True)
+
+        for future in loaded.values():
+            if future.done() and not future.cancelled():
+                future.exception()
+
+        errors = [x for x in results if isinstance(x, BaseException)]
+        if errors:
+            raise errors[0]
+        return list(extensions)
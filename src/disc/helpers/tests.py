@@ -0,0 +1,283 @@
+import asyncio
+import datetime
+import types
+import unittest
+
+from discord.ext import commands
+
+from src.disc.helpers.leaderboard import GuildBoard, Leaderboard
+from src.disc.helpers.ratelimit import RateLimiter, rate_limit, refund
+from src.disc.helpers.scheduler import ActivityScheduler
+
+
+class RateLimiterTest(unittest.TestCase):
+    def test_burst_then_refill(self):
+        limiter = RateLimiter(3, 30)
+        for _ in range(3):
+            self.assertEqual(limiter.hit(1, now=0), 0)
+        # empty, one token comes back every 10 seconds.
+        self.assertAlmostEqual(limiter.hit(1, now=0), 10)
+        self.assertAlmostEqual(limiter.hit(1, now=4), 6)
+        self.assertEqual(limiter.hit(1, now=10), 0)
+        self.assertGreater(limiter.hit(1, now=10), 0)
+
+    def test_refill_caps_at_rate(self):
+        limiter = RateLimiter(2, 10)
+        limiter.hit(1, now=0)
+        limiter.hit(1, now=0)
+        # long idle, but the bucket holds no more than `rate` tokens.
+        limiter.hit(2, now=1000)
+        for _ in range(2):
+            self.assertEqual(limiter.hit(1, now=1000), 0)
+        self.assertGreater(limiter.hit(1, now=1000), 0)
+
+    def test_keys_are_separate(self):
+        limiter = RateLimiter(1, 60)
+        self.assertEqual(limiter.hit(1, now=0), 0)
+        self.assertGreater(limiter.hit(1, now=0), 0)
+        self.assertEqual(limiter.hit(2, now=0), 0)
+
+    def test_idle_buckets_expire(self):
+        limiter = RateLimiter(1, 60)
+        for key in range(5):
+            limiter.hit(key, now=key)
+        self.assertEqual(len(limiter), 5)
+        limiter.hit(100, now=62.5)
+        # 0, 1 and 2 have been idle for a full period and are full again.
+        self.assertEqual(len(limiter), 3)
+        self.assertEqual(limiter.hit(0, now=62.5), 0)
+
+    def test_max_size(self):
+        limiter = RateLimiter(1, 60, max_size=3)
+        for key in range(10):
+            limiter.hit(key, now=0)
+        self.assertLessEqual(len(limiter), 3)
+
+    def test_refund(self):
+        limiter = RateLimiter(2, 20)
+        limiter.hit(1, now=0)
+        limiter.hit(1, now=0)
+        limiter.refund(1, now=0)
+        self.assertEqual(limiter.hit(1, now=0), 0)
+        # never more than `rate` tokens.
+        limiter.refund(1, now=100)
+        limiter.refund(1, now=100)
+        limiter.hit(1, now=100)
+        limiter.hit(1, now=100)
+        self.assertGreater(limiter.hit(1, now=100), 0)
+
+    def test_reset(self):
+        limiter = RateLimiter(1, 60)
+        limiter.hit(1, now=0)
+        limiter.reset(1)
+        self.assertEqual(limiter.hit(1, now=0), 0)
+
+
+class RateLimitTest(unittest.TestCase):
+    @staticmethod
+    def context(user_id: int = 1):
+        return types.SimpleNamespace(author=types.SimpleNamespace(id=user_id))
+
+    def setUp(self):
+        async def callback(ctx):
+            pass
+
+        self.command = rate_limit(1, 60)(commands.Command(callback))
+        self.predicate = self.command.checks[-1]
+
+    def test_limits_per_user(self):
+        self.assertTrue(self.predicate(self.context()))
+        with self.assertRaises(commands.CommandOnCooldown):
+            self.predicate(self.context())
+        self.assertTrue(self.predicate(self.context(user_id=2)))
+
+    def test_failed_invocation_is_refunded(self):
+        failed = self.context()
+        self.assertTrue(self.predicate(failed))
+        refund(failed)
+        # a second refund of the same invocation gives nothing back.
+        refund(failed)
+        self.assertTrue(self.predicate(self.context()))
+        with self.assertRaises(commands.CommandOnCooldown):
+            self.predicate(self.context())
+
+    def test_refused_invocation_takes_nothing(self):
+        self.predicate(self.context())
+        refused = self.context()
+        with self.assertRaises(commands.CommandOnCooldown):
+            self.predicate(refused)
+        refund(refused)
+        with self.assertRaises(commands.CommandOnCooldown):
+            self.predicate(self.context())
+
+
+class GuildBoardTest(unittest.TestCase):
+    def test_sorted_by_score_then_key(self):
+        board = GuildBoard()
+        for key, score in ((3, 10), (1, 30), (2, 10), (4, 20)):
+            board.set(key, score)
+        self.assertEqual(board.entries, [(-30, 1), (-20, 4), (-10, 2), (-10, 3)])
+        self.assertEqual([board.rank(x) for x in (1, 4, 2, 3)], [1, 2, 3, 4])
+        self.assertIsNone(board.rank(5))
+
+    def test_set_moves_the_entry(self):
+        board = GuildBoard()
+        for key in range(5):
+            board.set(key, key)
+        board.set(0, 100)
+        board.set(4, 4)
+        self.assertEqual(board.entries, [(-100, 0), (-4, 4), (-3, 3), (-2, 2), (-1, 1)])
+        board.remove(3)
+        board.remove(3)
+        self.assertEqual(board.entries, [(-100, 0), (-4, 4), (-2, 2), (-1, 1)])
+        self.assertEqual(board.rank(1), 4)
+
+
+class LeaderboardTest(unittest.TestCase):
+    def setUp(self):
+        self.entries = [(1, "a", 10, "A"), (1, "b", 20, "B"), (2, "a", 10, "A")]
+        self.board = Leaderboard("test", lambda: self.entries)
+
+    def test_nothing_before_rebuild(self):
+        self.board.set("a", 50, guild_ids=[1])
+        self.board.increment(1, "a")
+        self.assertEqual(self.board.top(1), [])
+        self.assertEqual(self.board.rebuild(), 3)
+        self.assertEqual(self.board.top(1), [(1, "b", 20), (2, "a", 10)])
+
+    def test_set_follows_every_guild(self):
+        self.board.rebuild()
+        self.board.set("a", 30)
+        self.assertEqual(self.board.rank(1, "a"), 1)
+        self.assertEqual(self.board.top(2), [(1, "a", 30)])
+        self.board.set("c", 5, guild_ids=[2, 3], data="C")
+        self.assertEqual(self.board.guilds("c"), {2, 3})
+        self.assertEqual(self.board.top(3), [(1, "c", 5)])
+        self.assertEqual(self.board.data("c"), "C")
+
+    def test_increment(self):
+        self.board.rebuild()
+        self.board.increment(1, "a", 15)
+        self.board.increment(3, "d")
+        self.assertEqual(self.board.top(1), [(1, "a", 25), (2, "b", 20)])
+        self.assertEqual(self.board.guilds("d"), {3})
+
+    def test_remove(self):
+        self.board.rebuild()
+        self.board.remove("a", 1)
+        self.assertEqual(self.board.top(1), [(1, "b", 20)])
+        self.assertEqual(self.board.guilds("a"), {2})
+        self.assertEqual(self.board.data("a"), "A")
+        self.board.remove("a")
+        self.assertEqual(self.board.size(2), 0)
+        self.assertIsNone(self.board.data("a"))
+
+    def test_pages(self):
+        self.entries = [(1, x, x, None) for x in range(10)]
+        self.board.rebuild()
+        self.assertEqual(self.board.top(1, limit=3, offset=3), [(4, 6, 6), (5, 5, 5), (6, 4, 4)])
+        self.assertEqual(self.board.top(1, offset=9), [(10, 0, 0)])
+        self.assertEqual(self.board.top(4), [])
+
+
+class Date(types.SimpleNamespace):
+    pass
+
+
+class Fight(types.SimpleNamespace):
+    pass
+
+
+class ActivitySchedulerTest(unittest.TestCase):
+    def setUp(self):
+        self.now = datetime.datetime(2026, 1, 1)
+        self.scheduler = ActivityScheduler(self.resolve, retry_delay=0, max_retries=2)
+        self.calls = []
+        self.failing = set()
+
+    async def resolve(self, due):
+        self.calls.append(due)
+        return {model: [x for x in ids if (model, x) in self.failing] for model, ids in due.items()}
+
+    def at(self, minutes: int) -> datetime.datetime:
+        return self.now + datetime.timedelta(minutes=minutes)
+
+    def test_due_in_order(self):
+        self.scheduler.load([Date(id=1, end_date=self.at(3)), Fight(id=1, end_date=self.at(1)),
+                             Date(id=2, end_date=self.at(2))])
+        self.assertEqual(self.scheduler.next_due, self.at(1))
+        self.assertEqual(self.scheduler._pop_due(self.at(0)), {})
+        self.assertEqual(self.scheduler._pop_due(self.at(2)), {Fight: [1], Date: [2]})
+        self.assertEqual(self.scheduler.next_due, self.at(3))
+        self.assertEqual(len(self.scheduler), 1)
+
+    def test_reschedule_and_cancel(self):
+        date = Date(id=1, end_date=self.at(1))
+        fight = Fight(id=1, end_date=self.at(2))
+        self.scheduler.load([date, fight])
+        date.end_date = self.at(5)
+        self.scheduler.schedule(date)
+        self.scheduler.cancel(fight)
+        # the old heap entries are skipped.
+        self.assertEqual(self.scheduler._pop_due(self.at(4)), {})
+        self.assertEqual(self.scheduler._pop_due(self.at(5)), {Date: [1]})
+
+    def test_retry_then_give_up(self):
+        due = {Date: [1, 2]}
+        self.scheduler._retry(due, {Date: [2]})
+        self.assertEqual((self.scheduler.resolved, len(self.scheduler)), (1, 1))
+        self.assertIsNotNone(self.scheduler._pending.get((Date, 2)))
+
+        for _ in range(2):
+            self.assertEqual(self.scheduler._pop_due(datetime.datetime.max), {Date: [2]})
+            self.scheduler._retry({Date: [2]}, {Date: [2]})
+        self.assertEqual(self.scheduler.given_up, 1)
+        self.assertEqual(len(self.scheduler), 0)
+        self.assertEqual(self.scheduler._attempts, {})
+
+    def test_retry_waits(self):
+        self.scheduler.retry_delay = 60
+        self.scheduler._retry({Date: [1]}, {Date: [1]})
+        self.assertGreater(self.scheduler.next_due, datetime.datetime.utcnow() + datetime.timedelta(seconds=30))
+
+    def test_run(self):
+        self.failing.add((Date, 1))
+
+        async def main():
+            self.scheduler.start()
+            self.scheduler.load([Date(id=1, end_date=self.at(0)), Fight(id=1, end_date=self.at(0))])
+            for _ in range(100):
+                await asyncio.sleep(0)
+                if self.scheduler.given_up:
+                    break
+            self.scheduler.stop()
+
+        asyncio.run(main())
+        self.assertEqual(self.calls[0], {Date: [1], Fight: [1]})
+        # the first try and two retries.
+        self.assertEqual(self.calls[1:], [{Date: [1]}, {Date: [1]}])
+        self.assertEqual((self.scheduler.resolved, self.scheduler.given_up), (1, 1))
+
+    def test_failing_resolve_is_retried(self):
+        async def resolve(due):
+            self.calls.append(due)
+            if len(self.calls) == 1:
+                raise RuntimeError()
+
+        self.scheduler = ActivityScheduler(resolve, retry_delay=0)
+
+        async def main():
+            self.scheduler.start()
+            self.scheduler.load([Date(id=1, end_date=self.at(0))])
+            for _ in range(100):
+                await asyncio.sleep(0)
+                if self.scheduler.resolved:
+                    break
+            self.scheduler.stop()
+
+        asyncio.run(main())
+        self.assertEqual(self.calls, [{Date: [1]}, {Date: [1]}])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -7,7 +7,7 @@ import pytz
 
 from src.disc.helpers.embed import Embed
 from src.disc.helpers.files import FileHelper
-from src.utils.country import Country, CountryNotFound
+from src.utils.country import CountryNotFound, countries
 
 
 class ConversionFailed(Exception): pass
@@ -318,7 +318,7 @@ class CountryWaiter(StrWaiter):
 
     def convert(self, argument):
         try:
-            country = Country(argument.upper())
+            country = countries.find(argument)
         except CountryNotFound:
             raise ConversionFailed("Country not found.")
 
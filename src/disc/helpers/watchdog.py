@@ -0,0 +1,180 @@
+import asyncio
+import json
+import os
+import sys
+import threading
+import time
+import traceback
+from typing import Dict, List, Optional, Tuple
+
+_source_root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+class Stall:
+    __slots__ = ("cog", "command", "location", "count", "total", "max", "stack")
+
+    def __init__(self, cog: str, command: str, location: str):
+        self.cog = cog
+        self.command = command
+        self.location = location
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.stack: List[str] = []
+
+    def to_dict(self) -> dict:
+        return {
+            "cog": self.cog,
+            "command": self.command,
+            "location": self.location,
+            "count": self.count,
+            "total_ms": round(self.total * 1000, 1),
+            "max_ms": round(self.max * 1000, 1),
+            "stack": self.stack,
+        }
+
+
+def attribute(stack: traceback.StackSummary) -> Tuple[str, str, str]:
+    """
+    (cog, command, location) for a captured stack. The location is the innermost frame in our own source,
+    the blocking call site. The outermost frame inside a cog or command module is the handler that got there.
+    """
+    ours = [x for x in stack if x.filename.startswith(_source_root)]
+    if not ours:
+        return "-", "-", f"{stack[-1].filename}:{stack[-1].lineno}" if stack else "-"
+
+    innermost = ours[-1]
+    location = f"{os.path.relpath(innermost.filename, _source_root)}:{innermost.lineno} {innermost.name}"
+
+    cog, command = "-", "-"
+    for frame in ours:
+        parts = os.path.relpath(frame.filename, _source_root).replace("\\", "/").split("/")
+        if parts[:2] == ["disc", "cogs"] or parts[:2] == ["disc", "commands"]:
+            cog = parts[2].replace(".py", "")
+            command = frame.name
+            break
+    return cog, command, location
+
+
+class LoopWatchdog:
+    """
+    Measures event loop lag with a heartbeat coroutine. A watchdog thread notices when the heartbeat stops,
+    takes the stack of the loop thread while it is still blocked and attributes the stall to a cog and command.
+    Idle cost is one sleep per `interval` on the loop and one check per `poll` on the thread.
+    """
+
+    def __init__(self, threshold: float = 0.5, interval: float = 0.25, poll: float = 0.1,
+                 max_stalls: int = 200):
+        self.threshold = threshold
+        self.interval = interval
+        self.poll = poll
+        self.max_stalls = max_stalls
+        self.stalls: Dict[Tuple[str, str, str], Stall] = {}
+        self.samples = 0
+        self.total_lag = 0.0
+        self.max_lag = 0.0
+        self._beat = time.monotonic()
+        self._captured: Optional[Tuple[Tuple[str, str, str], List[str]]] = None
+        self._lock = threading.Lock()
+        self._stopped = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._tasks: List[asyncio.Task] = []
+        self._loop_thread_id: Optional[int] = None
+
+    async def _heartbeat(self):
+        while True:
+            expected = time.monotonic() + self.interval
+            await asyncio.sleep(self.interval)
+            now = time.monotonic()
+            lag = max(0.0, now - expected)
+            self._beat = now
+            self.samples += 1
+            self.total_lag += lag
+            self.max_lag = max(self.max_lag, lag)
+
+            with self._lock:
+                captured, self._captured = self._captured, None
+            if captured is not None:
+                self._record(*captured, lag)
+
+    def _record(self, key: Tuple[str, str, str], stack: List[str], lag: float):
+        stall = self.stalls.get(key)
+        if stall is None:
+            if len(self.stalls) >= self.max_stalls:
+                return
+            stall = self.stalls[key] = Stall(*key)
+        stall.count += 1
+        stall.total += lag
+        stall.max = max(stall.max, lag)
+        stall.stack = stack
+
+    def _watch(self):
+        while not self._stopped.wait(self.poll):
+            blocked = time.monotonic() - self._beat - self.interval
+            if blocked < self.threshold or self._captured is not None:
+                continue
+            frame = sys._current_frames().get(self._loop_thread_id)
+            if frame is None:
+                continue
+            stack = traceback.extract_stack(frame)
+            del frame
+            with self._lock:
+                # the heartbeat may have come back while the stack was being taken.
+                if time.monotonic() - self._beat - self.interval >= self.threshold:
+                    self._captured = (attribute(stack), stack.format()[-12:])
+
+    def summary(self, limit: int = 10) -> List[Stall]:
+        return sorted(self.stalls.values(), key=lambda x: -x.total)[:limit]
+
+    def to_dict(self) -> dict:
+        return {
+            "written_at": time.time(),
+            "threshold_ms": self.threshold * 1000,
+            "samples": self.samples,
+            "avg_lag_ms": round(self.total_lag / self.samples * 1000, 2) if self.samples else 0.0,
+            "max_lag_ms": round(self.max_lag * 1000, 1),
+            "stalls": [x.to_dict() for x in self.summary(limit=self.max_stalls)],
+        }
+
+    def format(self, limit: int = 10) -> str:
+        data = self.to_dict()
+        lines = [f"lag avg {data['avg_lag_ms']}ms, max {data['max_lag_ms']}ms over {self.samples} beats"]
+        for stall in self.summary(limit):
+            lines.append(f"{stall.total * 1000:>8.0f}ms {stall.count:>4}x max {stall.max * 1000:>6.0f}ms "
+                         f"{stall.cog}/{stall.command} @ {stall.location}")
+        return "\n".join(lines)
+
+    def reset(self):
+        self.stalls.clear()
+        self.samples = 0
+        self.total_lag = 0.0
+        self.max_lag = 0.0
+
+    async def _report(self, path: str, interval: float):
+        while True:
+            await asyncio.sleep(interval)
+            if self.stalls:
+                print(self.format(limit=5))
+            try:
+                with open(path, "w") as f:
+                    json.dump(self.to_dict(), f, indent=2)
+            except OSError as e:
+                print(f"Could not write loop lag report: {e}")
+
+    def start(self, path: str, summary_interval: float = 15 * 60):
+        if self._thread is not None:
+            return
+        loop = asyncio.get_running_loop()
+        self._loop_thread_id = threading.get_ident()
+        self._beat = time.monotonic()
+        self._stopped.clear()
+        self._tasks = [loop.create_task(self._heartbeat()), loop.create_task(self._report(path, summary_interval))]
+        self._thread = threading.Thread(target=self._watch, name="loop-watchdog", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stopped.set()
+        for task in self._tasks:
+            task.cancel()
+        self._tasks = []
+        self._thread = None
@@ -1,5 +1,4 @@
 from src.config import config
-from src.models import database
 
 
 class BaseGame:
@@ -54,13 +53,13 @@ class DiscordIdentity(BaseIdentity):
         return self.member.name
 
     def add_points(self, points):
-        with database.connection_context():
+        with config.bot.connections.scope():
             human = config.bot.get_human(user=self.member)
             human.gold += points
-            human.save()
+            config.bot.humans.mark_dirty(human, "gold")
 
     def remove_points(self, points):
-        with database.connection_context():
+        with config.bot.connections.scope():
             human = config.bot.get_human(user=self.member)
             human.gold -= points
-            human.save()
+            config.bot.humans.mark_dirty(human, "gold")
@@ -1,6 +1,8 @@
 import random
 from enum import Enum
 
+from src.utils.sampling import weighted_table
+
 
 class Game:
     bet = 5
@@ -25,13 +27,16 @@ class Game:
             return self.value[1]
 
     values = list(Reel)
+    weights = (17, 15, 15, 10, 5)
+    # weights = (30, 25, 20, 10, 5)
+    table = weighted_table(values, weights)
 
-    def __init__(self, ui):
+    def __init__(self, ui, rng: random.Random = None):
         self.ui = ui
+        self.rng = rng
 
     async def start(self):
-        reel = random.choices(self.values, weights=(17, 15, 15, 10, 5), k=3)
-        # reel = random.choices(self.values, weights = (30, 25, 20, 10, 5), k = 3)
+        reel = self.table.draw_many(3, self.rng)
         first, second, third = reel
 
         cherry_count = len([x for x in reel if x == self.Reel.cherry])
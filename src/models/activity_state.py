@@ -0,0 +1,156 @@
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple, Type
+
+import peewee
+
+from src.database.deferred import after_commit
+from . import pigeon_stats
+from .inbox import inbox
+from .pigeon import Activity, Challenge, Date, Exploration, Fight, Mail, Pigeon, PigeonActivity
+
+Pointer = Optional[Tuple[str, int]]
+
+
+class ActivityState:
+    """
+    Current activity pointer per pigeon: the `PigeonActivity` table with an in-process cache in front of it.
+
+    `Activity.save` keeps the table in sync inside the same transaction as the activity row. The cache follows
+    once that commits when it runs in a `deferred` block, otherwise straight away.
+    """
+
+    def __init__(self, max_size: int = 10000):
+        self.max_size = max_size
+        self._cache: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+        self.models: Dict[str, Type[Activity]] = {x.__name__: x for x in (Exploration, Mail, Fight, Date)}
+
+    def _store(self, pigeon_id: int, pointer: Pointer):
+        with self._lock:
+            self._cache[pigeon_id] = pointer
+            self._cache.move_to_end(pigeon_id)
+            while len(self._cache) > self.max_size:
+                self._cache.popitem(last=False)
+
+    def get(self, pigeon_id: int) -> Pointer:
+        """(activity type, activity id) the pigeon is busy with, a primary key read on a cache miss."""
+        with self._lock:
+            if pigeon_id in self._cache:
+                self._cache.move_to_end(pigeon_id)
+                return self._cache[pigeon_id]
+        row = PigeonActivity.get_or_none(PigeonActivity.pigeon == pigeon_id)
+        pointer = (row.type, row.activity_id) if row is not None else None
+        self._store(pigeon_id, pointer)
+        return pointer
+
+    def current(self, pigeon_id: int, model: Type[Activity] = None) -> Optional[Activity]:
+        pointer = self.get(pigeon_id)
+        if pointer is None:
+            return None
+        type, activity_id = pointer
+        if model is not None and model.__name__ != type:
+            return None
+        model = self.models[type]
+        return model.get_or_none((model.id == activity_id) & (model.finished == False))
+
+    def sync(self, activity: Activity):
+        """Points the activity's pigeons at it while it is current, removes those pointers once it is not."""
+        pigeon_ids = [x for x in activity.pigeon_ids if x is not None]
+        if not pigeon_ids:
+            return
+        type = activity.__class__.__name__
+        if activity.is_current:
+            rows = [{"pigeon": x, "type": type, "activity_id": activity.id} for x in pigeon_ids]
+            PigeonActivity.insert_many(rows).on_conflict_replace().execute()
+            for pigeon_id in pigeon_ids:
+                after_commit(self._store, pigeon_id, (type, activity.id))
+        else:
+            self.clear(activity)
+
+    def clear(self, activity: Activity):
+        pigeon_ids = [x for x in activity.pigeon_ids if x is not None]
+        type = activity.__class__.__name__
+        PigeonActivity.delete().where(
+            PigeonActivity.pigeon.in_(pigeon_ids),
+            PigeonActivity.type == type,
+            PigeonActivity.activity_id == activity.id
+        ).execute()
+        after_commit(self._clear_cached, pigeon_ids, (type, activity.id))
+
+    def _clear_cached(self, pigeon_ids: List[int], pointer: Pointer):
+        with self._lock:
+            for pigeon_id in pigeon_ids:
+                if self._cache.get(pigeon_id) == pointer:
+                    self._cache[pigeon_id] = None
+
+    def finish_stale(self, pigeon_id: int) -> Optional[Activity]:
+        """
+        For an idle pigeon: whatever it still points at is left over, finish it and return it.
+        Usually a cache hit with nothing to do.
+        """
+        if self.get(pigeon_id) is None:
+            return None
+        activity = self.current(pigeon_id)
+        if activity is None:
+            PigeonActivity.delete().where(PigeonActivity.pigeon == pigeon_id).execute()
+            self._store(pigeon_id, None)
+            return None
+        activity.finished = True
+        activity.save()
+        return activity
+
+    def reconcile(self) -> Dict[str, int]:
+        """
+        Rebuilds the pointers from the activity tables. Unfinished activities of idle pigeons and declined
+        challenges get finished, which is the cleanup `pigeon_check` used to do on every command.
+        """
+        counts = {"finished": 0, "added": 0, "updated": 0, "removed": 0}
+        database = PigeonActivity._meta.database
+        with database.atomic():
+            activities = []
+            for model in self.models.values():
+                activities.extend(model.select().where(model.finished == False))
+
+            pigeon_ids = {x for activity in activities for x in activity.pigeon_ids}
+            idle = set()
+            if pigeon_ids:
+                query = Pigeon.select(Pigeon.id).where(Pigeon.id.in_(pigeon_ids), Pigeon.status == Pigeon.Status.idle)
+                idle = {x for x, in query.tuples()}
+
+            desired: Dict[int, Tuple[str, int]] = {}
+            stale: Dict[Type[Activity], list] = {}
+            for activity in activities:
+                declined = isinstance(activity, Challenge) and activity.accepted is False
+                if declined or any(x in idle for x in activity.pigeon_ids):
+                    stale.setdefault(type(activity), []).append(activity.id)
+                    pigeon_stats.apply(activity.stat_changes())
+                    continue
+                for pigeon_id in activity.pigeon_ids:
+                    desired[pigeon_id] = (type(activity).__name__, activity.id)
+
+            for model, ids in stale.items():
+                counts["finished"] += model.update(finished=True).where(model.id.in_(ids)).execute()
+            if Mail in stale:
+                # finished mail lands in the inbox without passing through `Mail.save`.
+                inbox.clear()
+
+            existing = {x.pigeon_id: (x.type, x.activity_id) for x in PigeonActivity.select()}
+            removed = [x for x in existing if x not in desired]
+            changed = [x for x, pointer in desired.items() if existing.get(x) != pointer]
+            if removed:
+                PigeonActivity.delete().where(PigeonActivity.pigeon.in_(removed)).execute()
+            if changed:
+                rows = [{"pigeon": x, "type": desired[x][0], "activity_id": desired[x][1]} for x in changed]
+                for batch in peewee.chunked(rows, 100):
+                    PigeonActivity.insert_many(batch).on_conflict_replace().execute()
+            counts["removed"] = len(removed)
+            counts["added"] = len([x for x in changed if x not in existing])
+            counts["updated"] = len(changed) - counts["added"]
+
+        with self._lock:
+            self._cache.clear()
+        return counts
+
+
+activity_state = ActivityState()
@@ -1,16 +1,17 @@
 import json
+import random
 import typing
 from enum import Enum
 
-import emoji
 import peewee
-import pycountry
 from discord.ext import commands
 
 from src.config import config
+from src.database.random_rows import RandomSelectMixin
 from src.disc.helpers.pretty import prettify_value
 from src.disc.helpers.waiters import *
-from src.utils.country import Country
+from src.utils import codecs
+from src.utils.country import countries
 
 
 class OnSkipAction(Enum):
@@ -20,13 +21,9 @@ class OnSkipAction(Enum):
     exception = 4
 
 
-class BaseModelSelect(peewee.ModelSelect):
-    def rand(self) -> 'BaseModelSelect':
-        if isinstance(self.model._meta.database, peewee.SqliteDatabase):
-            rand = peewee.fn.Random()
-        else:
-            rand = peewee.fn.Rand()
-        return self.order_by(rand)
+class BaseModelSelect(RandomSelectMixin, peewee.ModelSelect):
+    def rand(self, rng: random.Random = None) -> 'BaseModelSelect':
+        return super().rand(rng)
 
     def where(self, *expressions) -> 'BaseModelSelect':
         return super().where(*expressions)
@@ -121,7 +118,7 @@ class UninitialisedModel(peewee.Model):
 
     @classmethod
     def get_random(cls):
-        return cls.select().order_by(peewee.fn.Rand()).limit(1).first()
+        return cls.select().rand().first()
 
     @property
     def bot(self) -> commands.Bot:
@@ -223,17 +220,17 @@ class LanguageField(peewee.TextField):
 
     def python_value(self, value):
         if value is not None:
-            return pycountry.languages.get(alpha_2=value)
+            return codecs.languages.decode(value)
 
 
 class CountryField(peewee.TextField):
     def db_value(self, value):
         if value is not None:
-            return value.iso()["alpha2"]
+            return value.alpha_2
 
     def python_value(self, value):
         if value is not None:
-            return Country.from_alpha_2(value)
+            return countries.get(value)
 
 
 class TimeDeltaField(peewee.TextField):
@@ -276,11 +273,11 @@ class UnicodeField(peewee.CharField):
 class EmojiField(peewee.TextField):
     def db_value(self, value):
         if value is not None:
-            return emoji.demojize(value)
+            return codecs.demojize(value)
 
     def python_value(self, value):
         if value is not None:
-            return emoji.emojize(value)
+            return codecs.emojize(value)
 
 
 class PercentageField(peewee.IntegerField):
@@ -1,13 +1,17 @@
 import datetime
+import random
+import threading
+import time
 from enum import Enum
-from typing import List
+from typing import Dict, List, Optional
 
 import discord
 import peewee
-import pycountry
 from dateutil.relativedelta import relativedelta
 
 from src.config import config
+from src.utils import codecs
+from src.utils.sampling import AliasTable
 from src.utils.timezone import Timezone
 from src.utils.zodiac import ZodiacSign
 from .base import BaseModel, EnumField, CountryField
@@ -27,7 +31,7 @@ class CurrenciesField(peewee.TextField):
 
     def python_value(self, value):
         if value:
-            return set(pycountry.currencies.get(alpha_3=x) for x in value.split(";"))
+            return codecs.currencies.decode_many(value)
         else:
             return set()
 
@@ -48,6 +52,12 @@ class Human(BaseModel):
             (('user_id',), True),
         )
 
+    def save(self, *args, **kwargs):
+        from .leaderboards import on_human_changed
+        result = super().save(*args, **kwargs)
+        on_human_changed(self)
+        return result
+
     @property
     def all_currencies(self):
         currencies = set()
@@ -65,9 +75,8 @@ class Human(BaseModel):
 
     @property
     def pigeon(self):
-        for pigeon in self.pigeons:
-            if pigeon.condition == pigeon.Condition.active:
-                return pigeon
+        model = self.pigeons.model
+        return self.pigeons.where(model.condition == model.Condition.active).first()
 
     @property
     def current_time(self):
@@ -293,32 +302,58 @@ class Item(BaseModel):
     category = peewee.ForeignKeyField(ItemCategory, null=True)
     chance = peewee.IntegerField(null=False)
 
+    # filter key -> (built at, alias table), rebuilt when items change or after `sampler_ttl` seconds.
+    _samplers: Dict[Optional[int], tuple] = {}
+    _samplers_lock = threading.Lock()
+    sampler_ttl = 10 * 60
+
     @classmethod
-    def get_random(cls):
-        if isinstance(cls._meta.database, peewee.SqliteDatabase):
-            return cls.select().rand().get_or_none()
-        query = """
-            SELECT results.* FROM (
-            SELECT {table_name}.*, @running_total AS previous_total, @running_total := @running_total + {chance_column_name} AS running_total, until.rand
-            FROM (
-                SELECT round(rand() * init.max) AS rand FROM (
-                SELECT sum({chance_column_name}) - 1 AS max FROM {table_name} {where}
-                ) AS init
-            ) AS until,
-            (SELECT * FROM {table_name} {where}) AS {table_name},
-            ( SELECT @running_total := 0.00 ) AS vars
-            ) AS results
-            WHERE results.rand >= results.previous_total AND results.rand < results.running_total;
-        """
-
-        query = query.format(
-            table_name=cls._meta.table_name,
-            where="WHERE (category_id != 1 OR category_id IS NULL) AND explorable = 1",
-            chance_column_name="chance"
-        )
+    def _sampler_query(cls, category_id: int = None):
+        query = cls.select().where(cls.explorable == True)
+        if category_id is not None:
+            return query.where(cls.category == category_id)
+        return query.where((cls.category != 1) | (cls.category.is_null()))
+
+    @classmethod
+    def get_sampler(cls, category_id: int = None) -> Optional[AliasTable]:
+        """Weighted (by `chance`) alias table over the explorable items, optionally of a single category."""
+        entry = cls._samplers.get(category_id)
+        if entry is not None and time.monotonic() - entry[0] < cls.sampler_ttl:
+            return entry[1]
+
+        with cls._samplers_lock:
+            entry = cls._samplers.get(category_id)
+            if entry is not None and time.monotonic() - entry[0] < cls.sampler_ttl:
+                return entry[1]
+            items = list(cls._sampler_query(category_id))
+            try:
+                table = AliasTable(items, [x.chance for x in items])
+            except ValueError:
+                table = None
+            cls._samplers[category_id] = (time.monotonic(), table)
+            return table
+
+    @classmethod
+    def invalidate_samplers(cls):
+        # waits for a build in progress, otherwise it would store a table of the items from before the change.
+        with cls._samplers_lock:
+            cls._samplers.clear()
 
-        for item in cls.raw(query):
-            return item
+    @classmethod
+    def get_random(cls, category_id: int = None, rng: random.Random = None) -> Optional['Item']:
+        table = cls.get_sampler(category_id)
+        if table is not None:
+            return table.draw(rng)
+
+    def save(self, *args, **kwargs):
+        result = super().save(*args, **kwargs)
+        self.invalidate_samplers()
+        return result
+
+    def delete_instance(self, *args, **kwargs):
+        result = super().delete_instance(*args, **kwargs)
+        self.invalidate_samplers()
+        return result
 
     @classmethod
     def by_category_id(cls):
@@ -0,0 +1,98 @@
+import threading
+from collections import OrderedDict
+from typing import List, Tuple
+
+import peewee
+
+from .human import Human, Item
+from .pigeon import Mail, Pigeon, SystemMessage
+
+# (unread system messages, unread mail)
+Counts = Tuple[int, int]
+
+
+class Inbox:
+    """
+    Unread system messages and mail per human. The unread counts are cached, so checking a human with nothing
+    new costs no queries at all. Saving a `SystemMessage` or `Mail` drops the recipient's counts, bulk updates
+    that bypass `save` should call `invalidate` / `clear`.
+    """
+
+    def __init__(self, max_size: int = 10000):
+        self.max_size = max_size
+        self._cache: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _store(self, human_id: int, counts: Counts):
+        with self._lock:
+            self._cache[human_id] = counts
+            self._cache.move_to_end(human_id)
+            while len(self._cache) > self.max_size:
+                self._cache.popitem(last=False)
+
+    @staticmethod
+    def _unread_mail(human_id: int):
+        return Mail.select().where(Mail.recipient == human_id, Mail.read == False, Mail.finished == True)
+
+    def counts(self, human_id: int) -> Counts:
+        with self._lock:
+            if human_id in self._cache:
+                self._cache.move_to_end(human_id)
+                return self._cache[human_id]
+        messages = SystemMessage.select(peewee.fn.COUNT(SystemMessage.id))
+        messages = messages.where(SystemMessage.human == human_id, SystemMessage.read == False)
+        mail = self._unread_mail(human_id).select(peewee.fn.COUNT(Mail.id))
+        # both counts in one round trip.
+        counts = peewee.Select(columns=[messages, mail]).bind(Mail._meta.database).tuples()[0]
+        counts = (counts[0] or 0, counts[1] or 0)
+        self._store(human_id, counts)
+        return counts
+
+    def unread_mail_count(self, human_id: int) -> int:
+        return self.counts(human_id)[1]
+
+    def unread_messages(self, human_id: int) -> List[SystemMessage]:
+        if not self.counts(human_id)[0]:
+            return []
+        query = SystemMessage.select().where(SystemMessage.human == human_id, SystemMessage.read == False)
+        return list(query.order_by(SystemMessage.id))
+
+    def unread_mail(self, human_id: int) -> List[Mail]:
+        """Unread mail with its sender pigeon, the sender's human and the item joined in, oldest first."""
+        if not self.unread_mail_count(human_id):
+            return []
+        sender_human = Human.alias()
+        query = (self._unread_mail(human_id)
+                 .select(Mail, Pigeon, sender_human, Item)
+                 .join(Pigeon, on=(Mail.sender == Pigeon.id))
+                 .join(sender_human, on=(Pigeon.human == sender_human.id))
+                 .switch(Mail)
+                 .join(Item, peewee.JOIN.LEFT_OUTER, on=(Mail.item == Item.id))
+                 .order_by(Mail.id))
+        return list(query)
+
+    def mark_read(self, human_id: int, messages: List[SystemMessage] = (), mail: List[Mail] = ()):
+        """One UPDATE per kind, call it in the transaction that hands out whatever the mail contained."""
+        for model, rows in ((SystemMessage, messages), (Mail, mail)):
+            ids = [x.id for x in rows]
+            for batch in peewee.chunked(ids, 100):
+                model.update(read=True).where(model.id.in_(batch)).execute()
+            for row in rows:
+                row.read = True
+                row._dirty.discard("read")
+
+        with self._lock:
+            counts = self._cache.get(human_id)
+            if counts is not None:
+                self._cache[human_id] = (max(0, counts[0] - len(messages)), max(0, counts[1] - len(mail)))
+
+    def invalidate(self, human_id: int):
+        with self._lock:
+            self._cache.pop(human_id, None)
+
+    def clear(self):
+        with self._lock:
+            self._cache.clear()
+
+
+inbox = Inbox()
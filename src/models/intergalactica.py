@@ -6,6 +6,7 @@ import discord
 import peewee
 
 from src.config import config
+from src.database.deferred import after_commit
 from src.disc.helpers.known_guilds import KnownGuild
 from .base import BaseModel, EnumField, EmojiField
 from .helpers import create
@@ -20,6 +21,11 @@ class Reminder(BaseModel):
     message = peewee.TextField(null=False)
     sent = peewee.BooleanField(null=False, default=True)
 
+    class Meta:
+        indexes = (
+            (('sent', 'due_date'), False),
+        )
+
     @classmethod
     def dm(cls, user_id: int, message: str, due_date: datetime.datetime):
         Reminder.create(
@@ -66,6 +72,20 @@ class Earthling(BaseModel):
     def personal_role(self, value):
         self.personal_role_id = value.id
 
+    def save(self, *args, **kwargs):
+        from .leaderboards import on_earthling_added
+        created = self.get_id() is None or kwargs.get("force_insert", False)
+        result = super().save(*args, **kwargs)
+        if created:
+            after_commit(on_earthling_added, self)
+        return result
+
+    def delete_instance(self, *args, **kwargs):
+        from .leaderboards import on_earthling_removed
+        result = super().delete_instance(*args, **kwargs)
+        after_commit(on_earthling_removed, self)
+        return result
+
     @classmethod
     def get_or_create_for_member(cls, member):
         return cls.get_or_create(
@@ -0,0 +1,96 @@
+from typing import Iterable
+
+import peewee
+
+from src.disc.helpers.leaderboard import Entry, Leaderboard
+from .human import Human
+from .intergalactica import Earthling
+from .pigeon import Pigeon
+from .prank import NicknamePrank, Prankster
+
+
+def _gold() -> Iterable[Entry]:
+    query = Human.select(Earthling.guild_id, Human.user_id, Human.gold)
+    query = query.join(Earthling, on=(Human.id == Earthling.human))
+    for guild_id, user_id, gold in query.tuples():
+        yield guild_id, user_id, gold, None
+
+
+def _pigeons() -> Iterable[Entry]:
+    query = Pigeon.select(Earthling.guild_id, Pigeon.id, Pigeon.experience, Pigeon.name, Human.user_id)
+    query = query.join(Human, on=(Pigeon.human == Human.id))
+    query = query.join(Earthling, on=(Human.id == Earthling.human))
+    query = query.where(Pigeon.condition == Pigeon.Condition.active)
+    for guild_id, pigeon_id, experience, name, user_id in query.tuples():
+        yield guild_id, pigeon_id, experience, (name, user_id)
+
+
+def _nickname_pranks() -> Iterable[Entry]:
+    query = Prankster.select(Prankster.guild_id, Prankster.user_id, peewee.fn.COUNT(NicknamePrank.id))
+    query = query.join(NicknamePrank, on=(Prankster.id == NicknamePrank.pranked_by))
+    query = query.group_by(Prankster.guild_id, Prankster.user_id)
+    for guild_id, user_id, count in query.tuples():
+        yield guild_id, user_id, count, None
+
+
+# keyed by user id.
+gold = Leaderboard("gold", _gold)
+# keyed by pigeon id, data is (pigeon name, owner user id).
+pigeons = Leaderboard("pigeons", _pigeons)
+# keyed by user id.
+nickname_pranks = Leaderboard("nickname_pranks", _nickname_pranks)
+
+all_leaderboards = (gold, pigeons, nickname_pranks)
+
+
+def rebuild_all() -> dict:
+    return {x.name: x.rebuild() for x in all_leaderboards}
+
+
+def on_human_changed(human: Human, *fields: str):
+    if not fields or "gold" in fields:
+        gold.set(human.user_id, human.gold)
+
+
+def _active_pigeon(human_id: int):
+    query = Pigeon.select(Pigeon.id, Pigeon.experience, Pigeon.name)
+    return query.where(Pigeon.human == human_id, Pigeon.condition == Pigeon.Condition.active).first()
+
+
+def _gold_of(human: Human) -> int:
+    """Gold as the bot's identity map has it, changes it still has to write are not in the table yet."""
+    bot = human.bot
+    if bot is not None and human.user_id in bot.humans:
+        return bot.humans.get(human.user_id).gold
+    return human.gold
+
+
+def on_earthling_added(earthling: Earthling):
+    """A member joined the boards of a guild, with their gold and their pigeon."""
+    if not gold.loaded:
+        return
+    human = earthling.human
+    gold.set(human.user_id, _gold_of(human), guild_ids=[earthling.guild_id])
+    pigeon = _active_pigeon(human.id)
+    if pigeon is not None:
+        pigeons.set(pigeon.id, pigeon.experience, guild_ids=[earthling.guild_id], data=(pigeon.name, human.user_id))
+
+
+def on_earthling_removed(earthling: Earthling):
+    gold.remove(earthling.user_id, earthling.guild_id)
+    nickname_pranks.remove(earthling.user_id, earthling.guild_id)
+    pigeon = _active_pigeon(earthling.global_human_id)
+    if pigeon is not None:
+        pigeons.remove(pigeon.id, earthling.guild_id)
+
+
+def on_pigeon_changed(pigeon: Pigeon):
+    if pigeon.condition != Pigeon.Condition.active:
+        pigeons.remove(pigeon.id)
+        return
+    data = pigeons.data(pigeon.id)
+    if data is not None:
+        pigeons.set(pigeon.id, pigeon.experience, data=(pigeon.name, data[1]))
+    elif pigeons.loaded:
+        user_id = pigeon.human.user_id
+        pigeons.set(pigeon.id, pigeon.experience, guild_ids=gold.guilds(user_id), data=(pigeon.name, user_id))
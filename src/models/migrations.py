@@ -0,0 +1,170 @@
+import datetime
+import hashlib
+from typing import Callable, Dict, List, Sequence, Tuple, Type
+
+import peewee
+from playhouse.migrate import SchemaMigrator, make_index_name, migrate as run_operations
+
+
+class SchemaVersion(peewee.Model):
+    version = peewee.IntegerField(null=False)
+    fingerprint = peewee.CharField(max_length=64, null=False)
+    applied_at = peewee.DateTimeField(null=False, default=lambda: datetime.datetime.utcnow())
+
+    class Meta:
+        table_name = "schema_version"
+
+
+class Migration:
+    __slots__ = ("version", "name", "apply", "before_create")
+
+    def __init__(self,
+                 version: int,
+                 name: str,
+                 apply: Callable[[peewee.Database, SchemaMigrator], None],
+                 before_create: bool = False):
+        self.version = version
+        self.name = name
+        self.apply = apply
+        self.before_create = before_create
+
+
+migrations: List[Migration] = []
+
+
+def migration(version: int, name: str, before_create: bool = False):
+    """
+    Registers an idempotent migration, they run in version order when the schema fingerprint changes.
+    `before_create` ones run before `create_tables`, for data the new indexes would otherwise reject.
+    """
+
+    def wrapper(func):
+        migrations.append(Migration(version, name, func, before_create))
+        migrations.sort(key=lambda x: x.version)
+        return func
+
+    return wrapper
+
+
+def fingerprint(database: peewee.Database, models: Sequence[Type[peewee.Model]]) -> str:
+    """Hash of the DDL `create_tables` would emit, computed without touching the database."""
+    digest = hashlib.sha256()
+    for model in sorted(models, key=lambda x: x._meta.table_name):
+        context = database.get_sql_context()
+        digest.update(context.sql(model._schema._create_table(safe=True)).query()[0].encode())
+        for index in model._schema._create_indexes(safe=True):
+            digest.update(database.get_sql_context().sql(index).query()[0].encode())
+    for item in migrations:
+        digest.update(f"{item.version}:{item.name}".encode())
+    return digest.hexdigest()
+
+
+def add_index_if_missing(database: peewee.Database,
+                         migrator: SchemaMigrator,
+                         model: Type[peewee.Model],
+                         fields: Sequence[str],
+                         unique: bool = False):
+    table = model._meta.table_name
+    if not database.table_exists(table):
+        return
+    columns = [model._meta.fields[x].column_name for x in fields]
+    name = make_index_name(table, columns)
+    if name in {x.name for x in database.get_indexes(table)}:
+        return
+    run_operations(migrator.add_index(table, columns, unique))
+
+
+def _current(database: peewee.Database):
+    try:
+        return SchemaVersion.select().order_by(SchemaVersion.id.desc()).first()
+    except (peewee.OperationalError, peewee.ProgrammingError):
+        if database.in_transaction():
+            database.rollback()
+        return None
+
+
+def migrate(database: peewee.Database,
+            models: Sequence[Type[peewee.Model]],
+            drop: Sequence[Type[peewee.Model]] = ()) -> bool:
+    """
+    Brings the schema up to date. When the stored fingerprint matches no DDL is issued at all.
+    `drop` tables are recreated empty, only when the fingerprint changed. Returns whether anything had to be applied.
+    """
+    with SchemaVersion.bind_ctx(database):
+        current = _current(database)
+        latest = migrations[-1].version if migrations else 0
+        expected = fingerprint(database, [*models, *drop])
+        if current is not None and current.fingerprint == expected and current.version >= latest:
+            return False
+
+        if drop:
+            database.drop_tables(drop)
+            database.create_tables(drop)
+
+        migrator = SchemaMigrator.from_database(database)
+        version = current.version if current is not None else 0
+        pending = [x for x in migrations if x.version > version]
+        for item in pending:
+            if item.before_create:
+                print(f"Applying migration {item.version}: {item.name}")
+                item.apply(database, migrator)
+
+        database.create_tables([SchemaVersion, *models])
+        for item in pending:
+            if not item.before_create:
+                print(f"Applying migration {item.version}: {item.name}")
+                item.apply(database, migrator)
+        if pending:
+            version = pending[-1].version
+
+        SchemaVersion.create(version=version, fingerprint=expected)
+        return True
+
+
+@migration(1, "Index hot activity tables")
+def index_hot_tables(database: peewee.Database, migrator: SchemaMigrator):
+    from .intergalactica import Reminder
+    from .pigeon import Pigeon, Fight, Date, Mail, SystemMessage
+
+    add_index_if_missing(database, migrator, Pigeon, ("human", "condition"))
+    add_index_if_missing(database, migrator, Fight, ("finished", "accepted", "end_date"))
+    add_index_if_missing(database, migrator, Date, ("finished", "accepted", "end_date"))
+    add_index_if_missing(database, migrator, Mail, ("recipient", "read", "finished"))
+    add_index_if_missing(database, migrator, SystemMessage, ("human", "read"))
+    add_index_if_missing(database, migrator, Reminder, ("sent", "due_date"))
+
+
+@migration(2, "Merge duplicate pigeon relationships", before_create=True)
+def merge_pigeon_relationships(database: peewee.Database, migrator: SchemaMigrator):
+    from .pigeon import PigeonRelationship
+
+    if not database.table_exists(PigeonRelationship._meta.table_name):
+        return
+
+    # canonical pair -> [id of the row that is kept, summed score, whether that row has to be rewritten]
+    kept: Dict[Tuple[int, int], list] = {}
+    duplicates = []
+    query = PigeonRelationship.select(PigeonRelationship.id, PigeonRelationship.pigeon1,
+                                      PigeonRelationship.pigeon2, PigeonRelationship.score)
+    for id, pigeon1, pigeon2, score in query.order_by(PigeonRelationship.id).tuples():
+        pair = PigeonRelationship.pair(pigeon1, pigeon2)
+        if pair in kept:
+            kept[pair][1] += score
+            kept[pair][2] = True
+            duplicates.append(id)
+        else:
+            kept[pair] = [id, score, pair != (pigeon1, pigeon2)]
+
+    with database.atomic():
+        for batch in peewee.chunked(duplicates, 100):
+            PigeonRelationship.delete().where(PigeonRelationship.id.in_(batch)).execute()
+        for (pigeon1, pigeon2), (id, score, changed) in kept.items():
+            if changed:
+                (PigeonRelationship
+                 .update(pigeon1=pigeon1, pigeon2=pigeon2, score=score)
+                 .where(PigeonRelationship.id == id)
+                 .execute())
+    if duplicates:
+        print(f"Merged {len(duplicates)} duplicate pigeon relationships")
+
+    add_index_if_missing(database, migrator, PigeonRelationship, ("pigeon1", "pigeon2"), unique=True)
@@ -2,12 +2,13 @@ import datetime
 import math
 import random
 from enum import Enum
-from typing import Iterable, List
+from typing import Dict, Iterable, List, Tuple
 
 import discord
 import peewee
 from dateutil.relativedelta import relativedelta
 
+from src.database.deferred import after_commit
 from src.utils.enums import Gender, Pronouns
 from .base import BaseModel, EnumField, EmojiField, PercentageField, CountryField, LanguageField, \
     LongTextField, BaseModelSelect
@@ -31,6 +32,38 @@ class Activity(BaseModel):
     def duration_in_minutes(self):
         return int((self.end_date - self.start_date).total_seconds() / 60.0)
 
+    @property
+    def pigeon_ids(self) -> List[int]:
+        """The pigeons this activity keeps busy."""
+        return []
+
+    @property
+    def is_current(self) -> bool:
+        return not self.finished
+
+    def stat_changes(self) -> Dict[int, Dict[str, int]]:
+        """pigeon id -> `PigeonStats` increments for finishing this activity."""
+        return {}
+
+    def _was_finished(self) -> bool:
+        if self.id is None:
+            return False
+        if 'finished' not in self._dirty:
+            return self.finished
+        model = type(self)
+        return model.select(model.finished).where(model.id == self.id).scalar()
+
+    def save(self, *args, **kwargs):
+        from .activity_state import activity_state
+        from . import pigeon_stats
+        with self._meta.database.atomic():
+            changes = self.stat_changes() if self.finished and not self._was_finished() else None
+            result = super().save(*args, **kwargs)
+            activity_state.sync(self)
+            if changes:
+                pigeon_stats.apply(changes)
+        return result
+
 
 @create()
 class TravelActivity(Activity):
@@ -122,6 +155,17 @@ class Pigeon(BaseModel, Gendered):
     pooped_on_count = peewee.IntegerField(null=False, default=0)
     poop_victim_count = peewee.IntegerField(null=False, default=0)
 
+    class Meta:
+        indexes = (
+            (('human', 'condition'), False),
+        )
+
+    def save(self, *args, **kwargs):
+        from .leaderboards import on_pigeon_changed
+        result = super().save(*args, **kwargs)
+        after_commit(on_pigeon_changed, self)
+        return result
+
     def get_gender(self) -> Gender:
         return self.gender
 
@@ -171,9 +215,10 @@ class Pigeon(BaseModel, Gendered):
 
     def update_stats(self, data, increment=True, save=True):
         human = self.bot.get_human(user=self.human.user_id)
+        gold = 0
         for key, value in data.items():
             if key == "gold":
-                human.gold += value
+                gold += value
             else:
                 if increment:
                     setattr(self, key, (getattr(self, key) + value))
@@ -187,26 +232,28 @@ class Pigeon(BaseModel, Gendered):
         try:
             if save:
                 self.save()
-                human.save()
         except ValueError:
             pass
+        if "gold" in data:
+            # the human is the shared identity map instance, it only changes once the pigeon's changes are committed.
+            after_commit(self._add_gold, human, gold, save)
+
+    def _add_gold(self, human: Human, gold: int, save: bool):
+        human.gold += gold
+        if save:
+            self.bot.humans.mark_dirty(human, "gold")
 
     @property
     def current_activity(self):
-        if self.status == self.Status.exploring:
-            return self.explorations.where(Exploration.finished == False).first()
-        if self.status == self.Status.mailing:
-            return self.outbox.where(Mail.finished == False).first()
-        if self.status == self.Status.fighting:
-            query = Fight.select()
-            query = query.where(Fight.finished == False)
-            query = query.where((Fight.pigeon1 == self) | (Fight.pigeon2 == self))
-            return query.first()
-        if self.status == self.Status.dating:
-            query = Date.select()
-            query = query.where(Date.finished == False)
-            query = query.where((Date.pigeon1 == self) | (Date.pigeon2 == self))
-            return query.first()
+        from .activity_state import activity_state
+        model = {
+            self.Status.exploring: Exploration,
+            self.Status.mailing: Mail,
+            self.Status.fighting: Fight,
+            self.Status.dating: Date,
+        }.get(self.status)
+        if model is not None:
+            return activity_state.current(self.id, model)
 
     @property
     def fights(self):
@@ -226,10 +273,16 @@ class Pigeon(BaseModel, Gendered):
 
 @create()
 class PigeonRelationship(BaseModel):
+    """One row per pair of pigeons, stored as a canonical pair: `pigeon1` is always the lower id."""
     pigeon1 = peewee.ForeignKeyField(Pigeon, null=False, on_delete="CASCADE")
     pigeon2 = peewee.ForeignKeyField(Pigeon, null=False, on_delete="CASCADE")
     score = peewee.IntegerField(null=False, default=0)
 
+    class Meta:
+        indexes = (
+            (('pigeon1', 'pigeon2'), True),
+        )
+
     @staticmethod
     def _get_title(score):
         if score < -20:
@@ -251,33 +304,23 @@ class PigeonRelationship(BaseModel):
     def title(self):
         return self._get_title(self.score)
 
-    @classmethod
-    def select_for(cls, pigeon, active=True):
-        query = cls.select()
-        if active:
-            p1 = Pigeon.alias("p1")
-            p2 = Pigeon.alias("p2")
-            query = query.join(p1, on=cls.pigeon1)
-            query = query.switch(cls)
-            query = query.join(p2, on=cls.pigeon2)
-        query = query.where((cls.pigeon1 == pigeon) | (cls.pigeon2 == pigeon))
-        query = query.where(cls.score < -15)
-        if active:
-            query = query.where(p1.condition == Pigeon.Condition.active)
-            query = query.where(p2.condition == Pigeon.Condition.active)
-        query = query.order_by(cls.score.asc())
-        return query
+    @staticmethod
+    def pair(pigeon1, pigeon2) -> Tuple[int, int]:
+        """The canonical (lower id, higher id) key for two pigeons or pigeon ids."""
+        id1, id2 = getattr(pigeon1, "id", pigeon1), getattr(pigeon2, "id", pigeon2)
+        return (id1, id2) if id1 <= id2 else (id2, id1)
 
     @classmethod
-    def get_or_create_for(cls, pigeon1, pigeon2):
-        query = cls.select()
-        query = query.where((cls.pigeon1 == pigeon1) | (cls.pigeon1 == pigeon2))
-        query = query.where((cls.pigeon2 == pigeon1) | (cls.pigeon2 == pigeon2))
-        relationship = query.first()
-        if relationship is not None:
-            return relationship
+    def add_score(cls, pigeon1, pigeon2, amount: int):
+        """Creates the pair or adds `amount` to its score in a single statement."""
+        id1, id2 = cls.pair(pigeon1, pigeon2)
+        query = cls.insert(pigeon1=id1, pigeon2=id2, score=amount)
+        update = {cls.score: cls.score + amount}
+        if isinstance(cls._meta.database, peewee.MySQLDatabase):
+            query = query.on_conflict(update=update)
         else:
-            return cls.create(pigeon1=pigeon1, pigeon2=pigeon2)
+            query = query.on_conflict(conflict_target=(cls.pigeon1, cls.pigeon2), update=update)
+        query.execute()
 
 
 @create()
@@ -306,10 +349,21 @@ class SystemMessage(BaseModel):
     text = peewee.TextField(null=False)
     read = peewee.BooleanField(null=False, default=False)
 
+    class Meta:
+        indexes = (
+            (('human', 'read'), False),
+        )
+
     @property
     def embed(self):
         return discord.Embed(description=self.text)
 
+    def save(self, *args, **kwargs):
+        from .inbox import inbox
+        result = super().save(*args, **kwargs)
+        inbox.invalidate(self.human_id)
+        return result
+
 
 @create()
 class Mail(TravelActivity):
@@ -320,6 +374,24 @@ class Mail(TravelActivity):
     message = EmojiField(null=True)
     read = peewee.BooleanField(null=False, default=True)
 
+    class Meta:
+        indexes = (
+            (('recipient', 'read', 'finished'), False),
+        )
+
+    @property
+    def pigeon_ids(self) -> List[int]:
+        return [self.sender_id]
+
+    def save(self, *args, **kwargs):
+        from .inbox import inbox
+        result = super().save(*args, **kwargs)
+        inbox.invalidate(self.recipient_id)
+        return result
+
+    def stat_changes(self) -> Dict[int, Dict[str, int]]:
+        return {self.sender_id: {'mails_sent': 1, 'gold_sent': self.gold or 0}}
+
 
 @create()
 class Exploration(TravelActivity):
@@ -329,6 +401,22 @@ class Exploration(TravelActivity):
     class Meta:
         table_name = "legacy_exploration"
 
+    @property
+    def pigeon_ids(self) -> List[int]:
+        return [self.pigeon_id]
+
+    def stat_changes(self) -> Dict[int, Dict[str, int]]:
+        new_country = 0
+        if self.destination is not None:
+            query = Exploration.select(Exploration.id).where(
+                Exploration.pigeon == self.pigeon_id,
+                Exploration.destination == self.destination,
+                Exploration.finished == True,
+                Exploration.id != self.id
+            )
+            new_country = 0 if query.exists() else 1
+        return {self.pigeon_id: {'explorations': 1, 'countries_visited': new_country}}
+
     @property
     def xp_worth(self):
         return math.ceil(self.duration_in_minutes)
@@ -351,6 +439,15 @@ class Challenge(Activity):
         yield self.pigeon1
         yield self.pigeon2
 
+    @property
+    def pigeon_ids(self) -> List[int]:
+        return [self.pigeon1_id, self.pigeon2_id]
+
+    @property
+    def is_current(self) -> bool:
+        # a declined challenge is never marked finished, the pigeons are free again regardless.
+        return not self.finished and self.accepted is not False
+
     @property
     def type(self):
         return self.__class__.__name__
@@ -359,11 +456,14 @@ class Challenge(Activity):
         return None
 
     def delete_instance(self, *args, **kwargs):
+        from .activity_state import activity_state
         self.pigeon1.status = Pigeon.Status.idle
         self.pigeon2.status = Pigeon.Status.idle
         self.pigeon1.save()
         self.pigeon2.save()
-        return super().delete_instance(*args, **kwargs)
+        with self._meta.database.atomic():
+            activity_state.clear(self)
+            return super().delete_instance(*args, **kwargs)
 
 
 @create()
@@ -371,10 +471,24 @@ class Fight(Challenge):
     bet = peewee.BigIntegerField(null=False, default=50)
     won = peewee.BooleanField(null=True)  # null is not ended yet, true means challenger won, false means challengee won
 
+    class Meta:
+        indexes = (
+            (('finished', 'accepted', 'end_date'), False),
+        )
+
     @property
     def icon_url(self):
         return "https://cdn.discordapp.com/attachments/744172199770062899/779844965705842718/JJAIhfX.gif"
 
+    def stat_changes(self) -> Dict[int, Dict[str, int]]:
+        if self.won is None:
+            return {}
+        winner, loser = (self.pigeon1_id, self.pigeon2_id) if self.won else (self.pigeon2_id, self.pigeon1_id)
+        return {
+            winner: {'fights_won': 1, 'gold_won': self.bet},
+            loser: {'fights_lost': 1, 'gold_lost': self.bet},
+        }
+
     def validate(self, ctx):
         error_messages = []
         i = 1
@@ -407,10 +521,50 @@ class Date(Challenge):
     gift = peewee.ForeignKeyField(Item, null=True)
     score = peewee.IntegerField(null=False, default=0)  # max 100, min -100
 
+    class Meta:
+        indexes = (
+            (('finished', 'accepted', 'end_date'), False),
+        )
+
     @property
     def icon_url(self):
         return "https://tubelife.org/wp-content/uploads/2019/08/Valentines-Heart-GIF.gif"
 
+    def stat_changes(self) -> Dict[int, Dict[str, int]]:
+        if self.accepted:
+            return {self.pigeon1_id: {'dates': 1}, self.pigeon2_id: {'dates': 1}}
+        if self.accepted is False:
+            return {self.pigeon2_id: {'date_rejections': 1}}
+        return {}
+
+
+@create()
+class PigeonActivity(BaseModel):
+    """What a pigeon is currently busy with, one row per busy pigeon. Kept up to date by `Activity.save`."""
+    pigeon = peewee.ForeignKeyField(Pigeon, primary_key=True, on_delete="CASCADE")
+    type = peewee.CharField(max_length=32, null=False)
+    activity_id = peewee.BigIntegerField(null=False)
+
+
+@create()
+class PigeonStats(BaseModel):
+    """Lifetime totals over finished activities, see `pigeon_stats`."""
+    pigeon = peewee.ForeignKeyField(Pigeon, primary_key=True, on_delete="CASCADE")
+    explorations = peewee.IntegerField(null=False, default=0)
+    countries_visited = peewee.IntegerField(null=False, default=0)
+    mails_sent = peewee.IntegerField(null=False, default=0)
+    gold_sent = peewee.BigIntegerField(null=False, default=0)
+    fights_won = peewee.IntegerField(null=False, default=0)
+    fights_lost = peewee.IntegerField(null=False, default=0)
+    gold_won = peewee.BigIntegerField(null=False, default=0)
+    gold_lost = peewee.BigIntegerField(null=False, default=0)
+    dates = peewee.IntegerField(null=False, default=0)
+    date_rejections = peewee.IntegerField(null=False, default=0)
+
+    @property
+    def profit(self) -> int:
+        return self.gold_won - self.gold_lost
+
 
 @create()
 class ExplorationPlanet(BaseModel):
@@ -439,17 +593,8 @@ class ExplorationAction(BaseModel):
 
 class ToWinnings:
     def to_winnings(self) -> Winnings:
-        stats = [
-            HumanStat.gold(self.gold),
-            PigeonStat.health(self.health),
-            PigeonStat.happiness(self.happiness),
-            PigeonStat.experience(self.experience),
-            PigeonStat.cleanliness(self.cleanliness),
-            PigeonStat.food(self.food)
-        ]
-        if self.item is not None:
-            stats.append(HumanStat.item(self.item))
-        return Winnings(*[x for x in stats if x.amount])
+        return Winnings.of(self.gold, self.health, self.happiness, self.experience, self.cleanliness, self.food,
+                           self.item)
 
 
 @create()
@@ -0,0 +1,102 @@
+from collections import defaultdict
+from typing import Dict
+
+import peewee
+
+from .pigeon import Date, Exploration, Fight, Mail, PigeonStats
+
+Changes = Dict[int, Dict[str, int]]
+
+
+def get(pigeon_id: int) -> PigeonStats:
+    """The stats row for a pigeon, an unsaved row of zeroes when it has none yet."""
+    return PigeonStats.get_or_none(PigeonStats.pigeon == pigeon_id) or PigeonStats(pigeon=pigeon_id)
+
+
+def is_empty() -> bool:
+    return not PigeonStats.select().exists()
+
+
+def _increment(pigeon_id: int, deltas: Dict[str, int]) -> int:
+    update = {getattr(PigeonStats, k): getattr(PigeonStats, k) + v for k, v in deltas.items()}
+    return PigeonStats.update(update).where(PigeonStats.pigeon == pigeon_id).execute()
+
+
+def apply(changes: Changes):
+    """Adds `changes` (see `Activity.stat_changes`), call it inside the transaction finishing the activity."""
+    database = PigeonStats._meta.database
+    for pigeon_id, deltas in changes.items():
+        deltas = {k: v for k, v in deltas.items() if v}
+        if pigeon_id is None or not deltas or _increment(pigeon_id, deltas):
+            continue
+        try:
+            with database.atomic():
+                PigeonStats.insert(pigeon=pigeon_id, **deltas).execute()
+        except peewee.IntegrityError:
+            # someone else created the row in between.
+            _increment(pigeon_id, deltas)
+
+
+def _add(totals: Dict[int, Dict[str, int]], query, *names: str):
+    for pigeon_id, *values in query.tuples():
+        for name, value in zip(names, values):
+            totals[pigeon_id][name] += int(value or 0)
+
+
+def compute() -> Dict[int, Dict[str, int]]:
+    """Totals straight from the activity history, grouped per pigeon in one query per side."""
+    totals: Dict[int, Dict[str, int]] = defaultdict(lambda: defaultdict(int))
+
+    _add(totals,
+         Exploration.select(Exploration.pigeon, peewee.fn.COUNT(Exploration.id),
+                            peewee.fn.COUNT(Exploration.destination.distinct()))
+         .where(Exploration.finished == True)
+         .group_by(Exploration.pigeon),
+         'explorations', 'countries_visited')
+
+    _add(totals,
+         Mail.select(Mail.sender, peewee.fn.COUNT(Mail.id), peewee.fn.SUM(Mail.gold))
+         .where(Mail.finished == True)
+         .group_by(Mail.sender),
+         'mails_sent', 'gold_sent')
+
+    def when(condition, value):
+        return peewee.fn.SUM(peewee.Case(None, [(condition, value)], 0))
+
+    # won is true when pigeon1 (the challenger) won, fights finished without a winner count for neither.
+    sides = (
+        (Fight.pigeon1, Fight.won == True, Fight.won == False),
+        (Fight.pigeon2, Fight.won == False, Fight.won == True),
+    )
+    for pigeon, won, lost in sides:
+        _add(totals,
+             Fight.select(pigeon, when(won, 1), when(lost, 1), when(won, Fight.bet), when(lost, Fight.bet))
+             .where(Fight.finished == True)
+             .group_by(pigeon),
+             'fights_won', 'fights_lost', 'gold_won', 'gold_lost')
+
+    _add(totals,
+         Date.select(Date.pigeon1, when(Date.accepted == True, 1))
+         .where(Date.finished == True)
+         .group_by(Date.pigeon1),
+         'dates')
+    _add(totals,
+         Date.select(Date.pigeon2, when(Date.accepted == True, 1), when(Date.accepted == False, 1))
+         .where(Date.finished == True)
+         .group_by(Date.pigeon2),
+         'dates', 'date_rejections')
+
+    return totals
+
+
+def rebuild() -> int:
+    """Replaces every stats row with totals recomputed from history, returns the amount of pigeons."""
+    totals = compute()
+    names = [x.name for x in PigeonStats._meta.sorted_fields if x is not PigeonStats.pigeon]
+    rows = [{'pigeon': pigeon_id, **{x: values[x] for x in names}}
+            for pigeon_id, values in totals.items() if any(values.values())]
+    with PigeonStats._meta.database.atomic():
+        PigeonStats.delete().execute()
+        for batch in peewee.chunked(rows, 100):
+            PigeonStats.insert_many(batch).execute()
+    return len(rows)
@@ -0,0 +1,94 @@
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+from src.database.deferred import after_commit
+from .pigeon import Pigeon, PigeonRelationship
+
+# (other pigeon id, score), highest score first.
+Adjacency = List[Tuple[int, int]]
+
+
+class RelationshipStore:
+    """
+    Relationship scores per pigeon: the canonical `PigeonRelationship` pairs with a bounded LRU of adjacency
+    lists in front of them, so "top relationships" listings don't hit the table every time.
+
+    `add_score` writes through, the cached lists are only updated once the enclosing `deferred` block commits.
+    """
+
+    def __init__(self, max_size: int = 2000):
+        self.max_size = max_size
+        self._cache: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _store(self, pigeon_id: int, adjacency: Adjacency):
+        with self._lock:
+            self._cache[pigeon_id] = adjacency
+            self._cache.move_to_end(pigeon_id)
+            while len(self._cache) > self.max_size:
+                self._cache.popitem(last=False)
+
+    def _load(self, pigeon_id: int) -> Adjacency:
+        query = PigeonRelationship.select(PigeonRelationship.pigeon1, PigeonRelationship.pigeon2,
+                                          PigeonRelationship.score)
+        query = query.where((PigeonRelationship.pigeon1 == pigeon_id) | (PigeonRelationship.pigeon2 == pigeon_id))
+        adjacency = [(pigeon2 if pigeon1 == pigeon_id else pigeon1, score)
+                     for pigeon1, pigeon2, score in query.tuples()]
+        adjacency.sort(key=lambda x: (-x[1], x[0]))
+        return adjacency
+
+    def get(self, pigeon_id: int) -> Adjacency:
+        with self._lock:
+            if pigeon_id in self._cache:
+                self._cache.move_to_end(pigeon_id)
+                return list(self._cache[pigeon_id])
+        adjacency = self._load(pigeon_id)
+        self._store(pigeon_id, adjacency)
+        return list(adjacency)
+
+    def score(self, pigeon1, pigeon2) -> int:
+        id1, id2 = PigeonRelationship.pair(pigeon1, pigeon2)
+        for other_id, score in self.get(id1):
+            if other_id == id2:
+                return score
+        return 0
+
+    def add_score(self, pigeon1, pigeon2, amount: int):
+        id1, id2 = PigeonRelationship.pair(pigeon1, pigeon2)
+        PigeonRelationship.add_score(id1, id2, amount)
+        after_commit(self._add_cached, id1, id2, amount)
+
+    def _add_cached(self, id1: int, id2: int, amount: int):
+        with self._lock:
+            for pigeon_id, other_id in ((id1, id2), (id2, id1)):
+                adjacency = self._cache.get(pigeon_id)
+                if adjacency is None:
+                    continue
+                scores: Dict[int, int] = dict(adjacency)
+                scores[other_id] = scores.get(other_id, 0) + amount
+                self._cache[pigeon_id] = sorted(scores.items(), key=lambda x: (-x[1], x[0]))
+
+    def top(self, pigeon_id: int, limit: int = None) -> Adjacency:
+        return self.get(pigeon_id)[:limit]
+
+    def worst_enemy(self, pigeon_id: int, below: int = -15) -> Optional[int]:
+        """Id of the active pigeon `pigeon_id` has the lowest score with, if that score is under `below`."""
+        candidates = [(other_id, score) for other_id, score in reversed(self.get(pigeon_id)) if score < below]
+        if not candidates:
+            return None
+        query = Pigeon.select(Pigeon.id)
+        query = query.where(Pigeon.id.in_([x for x, _ in candidates]), Pigeon.condition == Pigeon.Condition.active)
+        active = {x for x, in query.tuples()}
+        return next((x for x, _ in candidates if x in active), None)
+
+    def forget(self, pigeon_id: int):
+        with self._lock:
+            self._cache.pop(pigeon_id, None)
+
+    def clear(self):
+        with self._lock:
+            self._cache.clear()
+
+
+relationships = RelationshipStore()
@@ -0,0 +1,23 @@
+import unittest
+
+from src.models import Human, Pigeon, database, tables_to_create
+
+
+class ModelTestCase(unittest.TestCase):
+    """
+    Runs every test on its own connection to the in-memory database set up by the root conftest.py,
+    so each one starts with empty tables.
+    """
+
+    def setUp(self):
+        database.connect(reuse_if_open=True)
+        database.create_tables(tables_to_create)
+        self.addCleanup(database.close)
+
+    @staticmethod
+    def create_human(user_id: int, **kwargs) -> Human:
+        return Human.create(user_id=user_id, **kwargs)
+
+    @staticmethod
+    def create_pigeon(human: Human, name: str = "McPigeon", **kwargs) -> Pigeon:
+        return Pigeon.create(human=human, name=name, **kwargs)
@@ -0,0 +1,424 @@
+import collections
+import datetime
+import logging
+import random
+import unittest
+
+import peewee
+
+from src.database import deferred
+from src.models import (Date, Exploration, Fight, Item, ItemCategory, Mail, Pigeon, PigeonRelationship,
+                        PigeonStats, SystemMessage, database)
+from src.models import pigeon_stats
+from src.models.activity_state import activity_state
+from src.models.base import CountryField
+from src.models.inbox import inbox
+from src.models.migrations import SchemaVersion, migrate
+from src.models.pigeon import PigeonActivity
+from src.models.relationships import relationships
+from src.models.testing import ModelTestCase
+from src.utils.country import countries
+
+
+class CountingDatabase(peewee.SqliteDatabase):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.statements = []
+
+    def execute_sql(self, sql, params=None, *args, **kwargs):
+        self.statements.append(sql)
+        return super().execute_sql(sql, params, *args, **kwargs)
+
+    def ddl(self):
+        return [x for x in self.statements if x.split(" ", 1)[0] in ("CREATE", "DROP", "ALTER")]
+
+
+_schema_database = CountingDatabase(":memory:")
+
+
+class Kept(peewee.Model):
+    value = peewee.IntegerField()
+
+    class Meta:
+        database = _schema_database
+
+
+class Scratch(peewee.Model):
+    value = peewee.IntegerField()
+
+    class Meta:
+        database = _schema_database
+
+
+class Added(peewee.Model):
+    value = peewee.IntegerField()
+
+    class Meta:
+        database = _schema_database
+
+
+class Residence(peewee.Model):
+    country = CountryField(null=True)
+
+    class Meta:
+        database = _schema_database
+
+
+class MigrateTest(unittest.TestCase):
+    def setUp(self):
+        _schema_database.connect()
+        self.addCleanup(_schema_database.close)
+
+    def test_unchanged_schema_issues_no_ddl(self):
+        self.assertTrue(migrate(_schema_database, [Kept]))
+        self.assertTrue(_schema_database.table_exists("kept"))
+
+        _schema_database.statements.clear()
+        self.assertFalse(migrate(_schema_database, [Kept]))
+        self.assertEqual(_schema_database.ddl(), [])
+        with SchemaVersion.bind_ctx(_schema_database):
+            self.assertEqual(SchemaVersion.select().count(), 1)
+
+    def test_changed_schema_is_applied(self):
+        migrate(_schema_database, [Kept])
+        Kept.create(value=1)
+        self.assertTrue(migrate(_schema_database, [Kept, Added]))
+        self.assertTrue(_schema_database.table_exists("added"))
+        self.assertEqual(Kept.select().count(), 1)
+
+    def test_drop_only_on_change(self):
+        migrate(_schema_database, [Kept], drop=[Scratch])
+        Scratch.create(value=1)
+
+        _schema_database.statements.clear()
+        self.assertFalse(migrate(_schema_database, [Kept], drop=[Scratch]))
+        self.assertEqual(_schema_database.ddl(), [])
+        self.assertEqual(Scratch.select().count(), 1)
+
+        migrate(_schema_database, [Kept, Added], drop=[Scratch])
+        self.assertEqual(Scratch.select().count(), 0)
+
+
+class CountryFieldTest(unittest.TestCase):
+    def setUp(self):
+        _schema_database.connect()
+        _schema_database.create_tables([Residence])
+        self.addCleanup(_schema_database.close)
+
+    def test_round_trip(self):
+        netherlands = countries.get("NL")
+        Residence.create(country=netherlands)
+        Residence.create(country=netherlands)
+        Residence.create(country=None)
+
+        stored = _schema_database.execute_sql("SELECT country FROM residence ORDER BY id").fetchall()
+        self.assertEqual(stored, [("NL",), ("NL",), (None,)])
+        # every row decodes to the shared instance.
+        decoded = [x.country for x in Residence.select().order_by(Residence.id)]
+        self.assertIs(decoded[0], netherlands)
+        self.assertIs(decoded[1], netherlands)
+        self.assertIsNone(decoded[2])
+
+
+class ItemSamplerTest(ModelTestCase):
+    def setUp(self):
+        super().setUp()
+        Item.invalidate_samplers()
+        self.addCleanup(Item.invalidate_samplers)
+        # category 1 is left out of the unfiltered draws.
+        self.excluded = ItemCategory.create(name="excluded", code="excluded")
+        self.category = ItemCategory.create(name="category", code="category")
+        self.items = [self.item(f"item{x}", x, category=self.category if x == 4 else None) for x in (1, 2, 3, 4)]
+        self.item("hidden", 100, explorable=False)
+        self.item("excluded", 100, category=self.excluded)
+
+    def item(self, name: str, chance: int, explorable: bool = True, category: ItemCategory = None) -> Item:
+        return Item.create(name=name, code=name, description="", image_url="", chance=chance,
+                           explorable=explorable, category=category)
+
+    def draw(self, amount: int, category_id: int = None):
+        rng = random.Random(0)
+        return [Item.get_random(category_id, rng=rng).name for _ in range(amount)]
+
+    def test_seeded_draws_repeat(self):
+        self.assertEqual(self.draw(50), self.draw(50))
+
+    def test_weighted_by_chance(self):
+        amount = 10000
+        counts = collections.Counter(self.draw(amount))
+        self.assertEqual(set(counts), {x.name for x in self.items})
+        total = sum(x.chance for x in self.items)
+        chi_square = 0
+        for item in self.items:
+            expected = amount * item.chance / total
+            chi_square += (counts[item.name] - expected) ** 2 / expected
+        # 3 degrees of freedom, p = 0.001.
+        self.assertLess(chi_square, 16.27)
+
+    def test_category_filter(self):
+        self.assertEqual(set(self.draw(20, self.category.id)), {"item4"})
+        self.assertEqual(set(self.draw(20, self.excluded.id)), {"excluded"})
+
+    def test_changes_rebuild_the_sampler(self):
+        self.draw(1)
+        for item in self.items:
+            item.delete_instance()
+        self.assertIsNone(Item.get_random())
+
+
+class ActivityStateTest(ModelTestCase):
+    def setUp(self):
+        super().setUp()
+        activity_state._cache.clear()
+        self.addCleanup(activity_state._cache.clear)
+        self.human = self.create_human(1)
+        self.pigeon = self.create_pigeon(self.human)
+        self.other = self.create_pigeon(self.create_human(2), name="Bob")
+
+    def mail(self, **kwargs) -> Mail:
+        end_date = datetime.datetime.utcnow() + datetime.timedelta(hours=1)
+        return Mail.create(recipient=self.human, sender=self.pigeon, end_date=end_date, **kwargs)
+
+    def pointers(self):
+        return {x.pigeon_id: (x.type, x.activity_id) for x in PigeonActivity.select()}
+
+    def test_follows_the_activity(self):
+        self.assertIsNone(activity_state.get(self.pigeon.id))
+        mail = self.mail(gold=10)
+        self.assertEqual(activity_state.get(self.pigeon.id), ("Mail", mail.id))
+        self.assertEqual(activity_state.current(self.pigeon.id).id, mail.id)
+        self.assertIsNone(activity_state.current(self.pigeon.id, Fight))
+
+        mail.finished = True
+        mail.save()
+        self.assertIsNone(activity_state.get(self.pigeon.id))
+        self.assertEqual(self.pointers(), {})
+        self.assertEqual(PigeonStats.get(PigeonStats.pigeon == self.pigeon).gold_sent, 10)
+
+    def test_challenges_point_both_pigeons(self):
+        date = Date.create(pigeon1=self.pigeon, pigeon2=self.other, guild_id=1, accepted=True)
+        self.assertEqual(self.pointers(), {self.pigeon.id: ("Date", date.id), self.other.id: ("Date", date.id)})
+
+        date.accepted = False
+        date.save()
+        # declined, the pigeons are free again.
+        self.assertEqual(self.pointers(), {})
+        self.assertIsNone(activity_state.get(self.other.id))
+
+    def test_rolled_back_activity_leaves_the_cache_alone(self):
+        activity_state.get(self.pigeon.id)
+        with self.assertRaises(ValueError):
+            with deferred(), database.atomic():
+                self.mail()
+                raise ValueError()
+        self.assertIsNone(activity_state.get(self.pigeon.id))
+        self.assertEqual(self.pointers(), {})
+
+    def test_finish_stale(self):
+        self.assertIsNone(activity_state.finish_stale(self.pigeon.id))
+        mail = self.mail()
+        self.assertEqual(activity_state.finish_stale(self.pigeon.id).id, mail.id)
+        self.assertTrue(Mail.get_by_id(mail.id).finished)
+        self.assertIsNone(activity_state.get(self.pigeon.id))
+
+        # a pointer to a row that is gone.
+        PigeonActivity.insert(pigeon=self.pigeon, type="Mail", activity_id=mail.id + 1).execute()
+        activity_state._cache.clear()
+        self.assertIsNone(activity_state.finish_stale(self.pigeon.id))
+        self.assertEqual(self.pointers(), {})
+
+    def test_reconcile(self):
+        self.pigeon.status = Pigeon.Status.mailing
+        self.pigeon.save()
+        # written around `save`, so without pointers.
+        mail_id = Mail.insert(recipient=self.human, sender=self.pigeon).execute()
+        fight_id = Fight.insert(pigeon1=self.pigeon, pigeon2=self.other, guild_id=1, accepted=True,
+                                won=True).execute()
+        PigeonActivity.insert(pigeon=self.other, type="Fight", activity_id=fight_id + 1).execute()
+
+        counts = activity_state.reconcile()
+        # the fight has an idle pigeon, it is finished, counted in the stats and the mail pointer stays.
+        self.assertEqual(counts, {"finished": 1, "added": 1, "updated": 0, "removed": 1})
+        self.assertEqual(self.pointers(), {self.pigeon.id: ("Mail", mail_id)})
+        self.assertTrue(Fight.get_by_id(fight_id).finished)
+        self.assertEqual(PigeonStats.get(PigeonStats.pigeon == self.pigeon).fights_won, 1)
+        self.assertEqual(activity_state.reconcile(), {"finished": 0, "added": 0, "updated": 0, "removed": 0})
+
+
+class PigeonStatsTest(ModelTestCase):
+    def setUp(self):
+        super().setUp()
+        activity_state._cache.clear()
+        self.addCleanup(activity_state._cache.clear)
+        self.human = self.create_human(1)
+        self.pigeon = self.create_pigeon(self.human)
+        self.other = self.create_pigeon(self.create_human(2), name="Bob")
+
+    def stats(self):
+        names = [x.name for x in PigeonStats._meta.sorted_fields if x is not PigeonStats.pigeon]
+        return {x.pigeon_id: {k: getattr(x, k) for k in names if getattr(x, k)} for x in PigeonStats.select()}
+
+    def finish(self, activity):
+        activity.finished = True
+        activity.save()
+
+    def test_apply(self):
+        self.assertTrue(pigeon_stats.is_empty())
+        pigeon_stats.apply({self.pigeon.id: {"mails_sent": 1, "gold_sent": 0}, None: {"dates": 1},
+                            self.other.id: {"dates": 0}})
+        pigeon_stats.apply({self.pigeon.id: {"mails_sent": 2, "gold_sent": 5}})
+        self.assertEqual(self.stats(), {self.pigeon.id: {"mails_sent": 3, "gold_sent": 5}})
+        self.assertEqual(pigeon_stats.get(self.other.id).dates, 0)
+
+    def test_finishing_counts_once(self):
+        mail = Mail.create(recipient=self.human, sender=self.pigeon, gold=20)
+        self.finish(mail)
+        mail.save()
+        self.finish(Mail.get_by_id(mail.id))
+        self.assertEqual(self.stats(), {self.pigeon.id: {"mails_sent": 1, "gold_sent": 20}})
+
+    def test_rebuild_matches_applied(self):
+        self.finish(Mail.create(recipient=self.human, sender=self.pigeon, gold=20))
+        self.finish(Exploration.create(pigeon=self.pigeon, destination=countries.get("NL")))
+        self.finish(Exploration.create(pigeon=self.pigeon, destination=countries.get("NL")))
+        self.finish(Exploration.create(pigeon=self.other, destination=countries.get("BE")))
+        self.finish(Fight.create(pigeon1=self.pigeon, pigeon2=self.other, guild_id=1, accepted=True, won=False,
+                                 bet=30))
+        self.finish(Date.create(pigeon1=self.pigeon, pigeon2=self.other, guild_id=1, accepted=True))
+        self.finish(Date.create(pigeon1=self.other, pigeon2=self.pigeon, guild_id=1, accepted=False))
+        # unfinished activities count for nothing.
+        Mail.create(recipient=self.human, sender=self.other, gold=50)
+
+        applied = self.stats()
+        self.assertEqual(applied[self.pigeon.id], {
+            "mails_sent": 1, "gold_sent": 20, "explorations": 2, "countries_visited": 1, "fights_lost": 1,
+            "gold_lost": 30, "dates": 1, "date_rejections": 1,
+        })
+        self.assertEqual(pigeon_stats.rebuild(), 2)
+        self.assertEqual(self.stats(), applied)
+
+    def test_rebuild_replaces_rows(self):
+        pigeon_stats.apply({self.pigeon.id: {"dates": 5}})
+        self.assertEqual(pigeon_stats.rebuild(), 0)
+        self.assertTrue(pigeon_stats.is_empty())
+
+
+class RelationshipsTest(ModelTestCase):
+    def setUp(self):
+        super().setUp()
+        relationships.clear()
+        self.addCleanup(relationships.clear)
+        self.pigeons = [self.create_pigeon(self.create_human(x), name=str(x)) for x in range(1, 5)]
+
+    def rows(self):
+        return list(PigeonRelationship.select(PigeonRelationship.pigeon1, PigeonRelationship.pigeon2,
+                                              PigeonRelationship.score).tuples())
+
+    def test_canonical_pair(self):
+        a, b = self.pigeons[:2]
+        relationships.add_score(a, b, 5)
+        relationships.add_score(b.id, a.id, 3)
+        self.assertEqual(self.rows(), [(a.id, b.id, 8)])
+        self.assertEqual(relationships.score(a, b), relationships.score(b, a))
+        self.assertEqual(relationships.score(b, a), 8)
+
+    def test_either_order_gives_the_same_row(self):
+        a, b = self.pigeons[:2]
+        relationships.add_score(b, a, 4)
+        forward = self.rows()
+        PigeonRelationship.delete().execute()
+        relationships.add_score(a, b, 4)
+        self.assertEqual(self.rows(), forward)
+        self.assertEqual(forward, [(a.id, b.id, 4)])
+
+    def test_cached_lists_follow_the_commit(self):
+        a, b, c, d = self.pigeons
+        relationships.add_score(a, b, 10)
+        self.assertEqual(relationships.top(a.id), [(b.id, 10)])
+        relationships.add_score(c, a, 20)
+        relationships.add_score(a, d, -20)
+        self.assertEqual(relationships.top(a.id), [(c.id, 20), (b.id, 10), (d.id, -20)])
+        self.assertEqual(relationships.top(a.id, 1), [(c.id, 20)])
+
+        with self.assertRaises(ValueError):
+            with deferred(), database.atomic():
+                relationships.add_score(a, b, 100)
+                raise ValueError()
+        self.assertEqual(relationships.score(a, b), 10)
+        relationships.forget(a.id)
+        self.assertEqual(relationships.score(a, b), 10)
+
+    def test_worst_enemy(self):
+        a, b, c, d = self.pigeons
+        relationships.add_score(a, b, -30)
+        relationships.add_score(a, c, -50)
+        relationships.add_score(a, d, -10)
+        self.assertEqual(relationships.worst_enemy(a.id), c.id)
+        c.condition = Pigeon.Condition.dead
+        c.save()
+        self.assertEqual(relationships.worst_enemy(a.id), b.id)
+        self.assertIsNone(relationships.worst_enemy(a.id, below=-40))
+
+
+class InboxTest(ModelTestCase):
+    def setUp(self):
+        super().setUp()
+        inbox.clear()
+        self.addCleanup(inbox.clear)
+        self.human = self.create_human(1)
+        self.sender = self.create_pigeon(self.create_human(2))
+
+    def statements(self, func, *args):
+        """The statements `func` issues, from peewee's query log."""
+        with self.assertLogs("peewee", level="DEBUG") as logs:
+            result = func(*args)
+            # assertLogs fails when nothing was logged.
+            logging.getLogger("peewee").debug("done")
+        return result, [x.msg[0] for x in logs.records[:-1]]
+
+    def message(self, text: str = "hello") -> SystemMessage:
+        return SystemMessage.create(human=self.human, text=text)
+
+    def mail(self, finished: bool = True) -> Mail:
+        return Mail.create(recipient=self.human, sender=self.sender, read=False, finished=finished, gold=5)
+
+    def test_counts_are_cached(self):
+        self.message()
+        self.mail()
+        self.mail(finished=False)
+        counts, statements = self.statements(inbox.counts, self.human.id)
+        self.assertEqual((counts, len(statements)), ((1, 1), 1))
+        _, statements = self.statements(inbox.counts, self.human.id)
+        self.assertEqual(statements, [])
+
+        # saving drops the cached counts.
+        self.message()
+        self.assertEqual(inbox.counts(self.human.id), (2, 1))
+
+    def test_nothing_unread_costs_nothing(self):
+        inbox.counts(self.human.id)
+        result, statements = self.statements(lambda: (inbox.unread_messages(self.human.id),
+                                                      inbox.unread_mail(self.human.id)))
+        self.assertEqual((result, statements), (([], []), []))
+
+    def test_mark_read(self):
+        messages = [self.message(str(x)) for x in range(3)]
+        mail = [self.mail(), self.mail()]
+        self.assertEqual(inbox.counts(self.human.id), (3, 2))
+        self.assertEqual([x.id for x in inbox.unread_mail(self.human.id)], [x.id for x in mail])
+
+        _, statements = self.statements(inbox.mark_read, self.human.id, messages[:2], mail)
+        self.assertEqual([x.split(" ", 1)[0] for x in statements], ["UPDATE", "UPDATE"])
+        self.assertTrue(all(x.read and "read" not in x._dirty for x in messages[:2] + mail))
+        # the cached counts follow without a query.
+        _, statements = self.statements(inbox.counts, self.human.id)
+        self.assertEqual(statements, [])
+        self.assertEqual(inbox.counts(self.human.id), (1, 0))
+
+        inbox.invalidate(self.human.id)
+        self.assertEqual(inbox.counts(self.human.id), (1, 0))
+        self.assertEqual([x.text for x in inbox.unread_messages(self.human.id)], ["2"])
+
+
+if __name__ == "__main__":
+    unittest.main()
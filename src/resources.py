@@ -1,55 +1,236 @@
+import operator
+from collections import defaultdict
+from functools import reduce
+from typing import Dict, Hashable, List, Sequence, Tuple
+
 import peewee
 
 from src.config import config
 from src.models.pigeon import ExplorationPlanet, ExplorationPlanetLocation, ExplorationAction, ExplorationActionScenario
 
+SCENARIOS_PATH = 'resources/scenarios/scenarios.yml'
+SCENARIO_STATS = ('gold', 'health', 'happiness', 'cleanliness', 'food', 'experience')
+
 
 def process_items():
     pass
 
 
-def process_scenarios():
+class ImportReport:
+    """Inserted / updated / deleted counts per table of one scenario import."""
+
+    def __init__(self):
+        self.counts: Dict[str, Dict[str, int]] = defaultdict(lambda: {'inserted': 0, 'updated': 0, 'deleted': 0})
+        self.stale: List[str] = []
+
+    def add(self, table: str, kind: str, amount: int):
+        self.counts[table][kind] += amount
+
+    @property
+    def changed(self) -> bool:
+        return any(any(x.values()) for x in self.counts.values())
+
+    def to_dict(self) -> dict:
+        return {'counts': dict(self.counts), 'stale': self.stale}
+
+    def format(self) -> str:
+        if not self.changed:
+            lines = ['scenarios: unchanged']
+        else:
+            lines = [f'{table}: ' + ', '.join(f'{k}={v}' for k, v in counts.items())
+                     for table, counts in self.counts.items() if any(counts.values())]
+        if self.stale:
+            lines.append('not in file (kept): ' + ', '.join(self.stale))
+        return '\n'.join(lines)
+
+
+def parse_scenarios(raw: dict) -> List[dict]:
+    """Flattens the yml into planets -> locations -> actions -> scenario rows, stats resolved."""
+    planets = []
+    for raw_planet in raw['planets']:
+        locations = []
+        for raw_location in raw_planet['locations']:
+            actions = []
+            for raw_action in raw_location['actions']:
+                scenarios = []
+                for raw_scenario in raw_action['scenarios']:
+                    stats = [0 if x == '' else int(x) for x in raw_scenario['stats'].split(',')]
+                    scenarios.append({
+                        'text': raw_scenario['text'],
+                        'gold': stats[0],
+                        'health': stats[1],
+                        'happiness': stats[2],
+                        'cleanliness': stats[3],
+                        'food': stats[4],
+                        'experience': sum([abs(x) for x in stats]),
+                    })
+                actions.append({'name': raw_action['name'], 'symbol': raw_action['emoji'], 'scenarios': scenarios})
+            locations.append({'name': raw_location['name'], 'image_url': raw_location.get('image_url'),
+                              'actions': actions})
+        planets.append({'name': raw_planet['name'], 'image_url': raw_planet['image_url'], 'locations': locations})
+    return planets
+
+
+def _sync_table(model,
+                key_fields: Sequence[str],
+                value_fields: Sequence[str],
+                rows: List[dict],
+                report: ImportReport,
+                insert_only: Sequence[str] = ()) -> Tuple[Dict[Tuple, int], Dict[Tuple, int]]:
+    """
+    Upserts `rows` by their natural key in one select, one `insert_many` and one `bulk_update`.
+    Returns natural key -> id for every row, old and new, and for the rows that are no longer in `rows`.
+    Those are left for `_remove_stale`, once the rows below them are gone.
+    """
+
+    def key_of(row) -> Tuple[Hashable, ...]:
+        return tuple(getattr(row, x) for x in key_fields)
+
+    existing = {}
+    for instance in model.select().order_by(model.id):
+        # get_or_none used to pick the first match, keep doing so with duplicates.
+        existing.setdefault(key_of(instance), instance)
+
+    to_insert, to_update = [], []
+    seen = set()
+    for row in rows:
+        key = tuple(row[x] for x in key_fields)
+        if key in seen:
+            continue
+        seen.add(key)
+        instance = existing.get(key)
+        if instance is None:
+            to_insert.append(row)
+        elif any(getattr(instance, x) != row[x] for x in value_fields):
+            for field in value_fields:
+                setattr(instance, field, row[field])
+            to_update.append(instance)
+
+    if to_insert:
+        fields = (*key_fields, *value_fields, *insert_only)
+        model.insert_many([{x: row[x] for x in fields} for row in to_insert]).execute()
+    if to_update:
+        model.bulk_update(to_update, fields=list(value_fields), batch_size=100)
+
+    report.add(model._meta.table_name, 'inserted', len(to_insert))
+    report.add(model._meta.table_name, 'updated', len(to_update))
+    stale = {key: instance.id for key, instance in existing.items() if key not in seen}
+
+    if not to_insert:
+        return {key: instance.id for key, instance in existing.items()}, stale
+    columns = [getattr(model, x) for x in key_fields]
+    ids = {}
+    for row in model.select(model.id, *columns).order_by(model.id).tuples():
+        ids.setdefault(tuple(row[1:]), row[0])
+    return ids, stale
+
+
+def _remove_stale(model, stale: Dict[Tuple, int], report: ImportReport, disable: dict = None):
+    """
+    Deletes the rows that left the file, unless another table still points at them (explorations do, for one).
+    Those are kept and reported, and updated with `disable` when given so they are no longer offered.
+    """
+    if not stale:
+        return
+
+    ids = list(stale.values())
+    referenced = set()
+    for field in model._meta.backrefs:
+        query = field.model.select(field).where(field.in_(ids)).distinct()
+        referenced.update(x for x, in query.tuples())
+
+    to_delete = [x for x in ids if x not in referenced]
+    if to_delete:
+        model.delete().where(model.id.in_(to_delete)).execute()
+    report.add(model._meta.table_name, 'deleted', len(to_delete))
+
+    kept = [key for key, id in stale.items() if id in referenced]
+    if kept and disable:
+        changed = [getattr(model, field) != value for field, value in disable.items()]
+        query = model.update(disable).where(model.id.in_([stale[x] for x in kept]) & reduce(operator.or_, changed))
+        report.add(model._meta.table_name, 'updated', query.execute())
+    report.stale.extend(f'{model.__name__}({", ".join(map(str, key))})' for key in kept)
+
+
+def _sync_scenarios(planets: List[dict], action_ids: Dict[Tuple, int], report: ImportReport):
+    """Scenarios have no name, they are matched on (action, text) and removed once they leave the file."""
+    existing: Dict[Tuple[int, str], List[ExplorationActionScenario]] = defaultdict(list)
+    for scenario in ExplorationActionScenario.select().order_by(ExplorationActionScenario.id):
+        existing[(scenario.action_id, scenario.text)].append(scenario)
+
+    to_insert, to_update = [], []
+    for planet, location, action in _walk_actions(planets):
+        action_id = action_ids[(location['id'], action['name'])]
+        for row in action['scenarios']:
+            matches = existing.get((action_id, row['text']))
+            if not matches:
+                to_insert.append({'action': action_id, **row})
+                continue
+            scenario = matches.pop(0)
+            if any(getattr(scenario, x) != row[x] for x in SCENARIO_STATS):
+                for field in SCENARIO_STATS:
+                    setattr(scenario, field, row[field])
+                to_update.append(scenario)
+
+    to_delete = [x.id for matches in existing.values() for x in matches]
+    if to_delete:
+        ExplorationActionScenario.delete().where(ExplorationActionScenario.id.in_(to_delete)).execute()
+    if to_insert:
+        ExplorationActionScenario.insert_many(to_insert).execute()
+    if to_update:
+        ExplorationActionScenario.bulk_update(to_update, fields=list(SCENARIO_STATS), batch_size=100)
+
+    table = ExplorationActionScenario._meta.table_name
+    report.add(table, 'inserted', len(to_insert))
+    report.add(table, 'updated', len(to_update))
+    report.add(table, 'deleted', len(to_delete))
+
+
+def _walk_actions(planets: List[dict]):
+    for planet in planets:
+        for location in planet['locations']:
+            for action in location['actions']:
+                yield planet, location, action
+
+
+def import_scenarios(planets: List[dict]) -> ImportReport:
+    """
+    Makes the exploration tables match `planets` (see `parse_scenarios`) in one transaction,
+    diffing against what is already there so an unchanged file costs a handful of selects.
+    Removed locations that explorations still point at are deactivated instead of deleted.
+    """
+    report = ImportReport()
+    with config.settings.base_database.atomic():
+        planet_ids, stale_planets = _sync_table(ExplorationPlanet, ['name'], ['image_url'], planets, report)
+        for planet in planets:
+            planet['id'] = planet_ids[(planet['name'],)]
+
+        locations = [{'planet_id': planet['id'], **location} for planet in planets for location in planet['locations']]
+        location_ids, stale_locations = _sync_table(ExplorationPlanetLocation, ['planet_id', 'name'], ['image_url'],
+                                                    locations, report)
+        for planet in planets:
+            for location in planet['locations']:
+                location['id'] = location_ids[(planet['id'], location['name'])]
+
+        actions = [{'location_id': location['id'], 'planet_id': planet['id'], **action}
+                   for planet, location, action in _walk_actions(planets)]
+        action_ids, stale_actions = _sync_table(ExplorationAction, ['location_id', 'name'], ['symbol'], actions,
+                                                report, insert_only=['planet_id'])
+
+        _sync_scenarios(planets, action_ids, report)
+
+        # bottom up, a row can only go once the rows below it are gone.
+        _remove_stale(ExplorationAction, stale_actions, report)
+        _remove_stale(ExplorationPlanetLocation, stale_locations, report, disable={'active': False})
+        _remove_stale(ExplorationPlanet, stale_planets, report)
+    return report
+
+
+def process_scenarios(path: str = SCENARIOS_PATH) -> ImportReport:
     import yaml
     if not isinstance(config.settings.base_database, peewee.SqliteDatabase):
         raise Exception('No, I don\'t think so.')
 
-    ExplorationActionScenario.drop_table()
-    ExplorationActionScenario.create_table()
-    # for table in [ExplorationPlanet, ExplorationPlanetLocation, ExplorationAction, ExplorationActionScenario]:
-    #     table.drop_table()
-    #     table.create_table()
-
-    with open('resources/scenarios/scenarios.yml', 'r', encoding='utf8') as file:
-        scenarios = yaml.safe_load(file)
-        for raw_planet in scenarios['planets']:
-            planet = ExplorationPlanet.get_or_none(name=raw_planet['name']) or ExplorationPlanet()
-            planet.image_url = raw_planet['image_url']
-            planet.name = raw_planet['name']
-            planet.save()
-            for raw_location in raw_planet['locations']:
-                location = ExplorationPlanetLocation.get_or_none(name=raw_location['name'],
-                                                                 planet=planet) or ExplorationPlanetLocation()
-                location.image_url = raw_location.get('image_url')
-                location.name = raw_location['name']
-                location.planet = planet
-                location.save()
-                for raw_action in raw_location['actions']:
-                    action = ExplorationAction.get_or_none(name=raw_action['name'],
-                                                           location=location) or ExplorationAction()
-                    action.name = raw_action['name']
-                    action.symbol = raw_action['emoji']
-                    action.location = location
-                    action.planet = planet
-                    action.save()
-                    for raw_scenario in raw_action['scenarios']:
-                        stats = [0 if x == '' else int(x) for x in raw_scenario['stats'].split(',')]
-                        scenario = ExplorationActionScenario()
-                        scenario.action = action
-                        scenario.text = raw_scenario['text']
-                        scenario.gold = stats[0]
-                        scenario.health = stats[1]
-                        scenario.happiness = stats[2]
-                        scenario.cleanliness = stats[3]
-                        scenario.food = stats[4]
-                        scenario.experience = sum([abs(x) for x in stats])
-                        scenario.save()
+    with open(path, 'r', encoding='utf8') as file:
+        planets = parse_scenarios(yaml.safe_load(file))
+    return import_scenarios(planets)
@@ -0,0 +1,138 @@
+import copy
+import datetime
+import unittest
+
+from src.models import Human, Pigeon
+from src.models.pigeon import ExplorationPlanet, ExplorationPlanetLocation, ExplorationAction, \
+    ExplorationActionScenario, SpaceExploration
+from src.models.testing import ModelTestCase
+from src.resources import import_scenarios, parse_scenarios
+
+RAW = {
+    "planets": [
+        {
+            "name": "Mars",
+            "image_url": "mars.png",
+            "locations": [
+                {
+                    "name": "Crater",
+                    "actions": [
+                        {"name": "Dig", "emoji": "⛏", "scenarios": [
+                            {"text": "Your pigeon finds gold.", "stats": "10,,,,"},
+                            {"text": "Your pigeon gets dirty.", "stats": ",,,-5,"},
+                        ]},
+                        {"name": "Rest", "emoji": "💤", "scenarios": [
+                            {"text": "Your pigeon naps.", "stats": ",5,5,,"},
+                        ]},
+                    ],
+                },
+                {
+                    "name": "Cave",
+                    "actions": [
+                        {"name": "Explore", "emoji": "🔦", "scenarios": [
+                            {"text": "It is dark.", "stats": ",,-1,,"},
+                        ]},
+                    ],
+                },
+            ],
+        },
+        {
+            "name": "Moon",
+            "image_url": "moon.png",
+            "locations": [
+                {
+                    "name": "Sea of Tranquility",
+                    "actions": [
+                        {"name": "Jump", "emoji": "🦘", "scenarios": [
+                            {"text": "Your pigeon jumps high.", "stats": ",,5,,"},
+                        ]},
+                    ],
+                },
+            ],
+        },
+    ]
+}
+
+
+class ImportScenariosTest(ModelTestCase):
+    def run_import(self, raw: dict = RAW):
+        return import_scenarios(parse_scenarios(copy.deepcopy(raw)))
+
+    def snapshot(self):
+        return [list(model.select().order_by(model.id).tuples())
+                for model in (ExplorationPlanet, ExplorationPlanetLocation, ExplorationAction,
+                              ExplorationActionScenario)]
+
+    def location(self, name: str) -> ExplorationPlanetLocation:
+        return ExplorationPlanetLocation.get(ExplorationPlanetLocation.name == name)
+
+    def test_second_import_is_a_no_op(self):
+        report = self.run_import()
+        self.assertEqual(report.counts["exploration_action_scenario"]["inserted"], 5)
+        before = self.snapshot()
+
+        report = self.run_import()
+        self.assertFalse(report.changed)
+        self.assertEqual(report.format(), "scenarios: unchanged")
+        self.assertEqual(self.snapshot(), before)
+
+    def test_edits(self):
+        self.run_import()
+        raw = copy.deepcopy(RAW)
+        mars = raw["planets"][0]
+        mars["image_url"] = "red.png"
+        mars["locations"][0]["actions"][0]["emoji"] = "🪓"
+        mars["locations"][0]["actions"][0]["scenarios"][0]["stats"] = "20,,,,"
+
+        report = self.run_import(raw)
+        self.assertEqual(report.counts["exploration_planet"]["updated"], 1)
+        self.assertEqual(report.counts["exploration_action"]["updated"], 1)
+        self.assertEqual(report.counts["exploration_action_scenario"]["updated"], 1)
+        self.assertEqual(ExplorationPlanet.get(ExplorationPlanet.name == "Mars").image_url, "red.png")
+        self.assertEqual(ExplorationAction.get(ExplorationAction.name == "Dig").symbol, "🪓")
+        scenario = ExplorationActionScenario.get(ExplorationActionScenario.text == "Your pigeon finds gold.")
+        self.assertEqual((scenario.gold, scenario.experience), (20, 20))
+
+    def test_deletes(self):
+        self.run_import()
+        raw = copy.deepcopy(RAW)
+        crater = raw["planets"][0]["locations"][0]
+        crater["actions"][0]["scenarios"].pop()
+        crater["actions"].pop()
+        raw["planets"].pop()
+
+        report = self.run_import(raw)
+        self.assertEqual(report.counts["exploration_action_scenario"]["deleted"], 3)
+        self.assertEqual(report.counts["exploration_action"]["deleted"], 2)
+        self.assertEqual(report.counts["exploration_planet_location"]["deleted"], 1)
+        self.assertEqual(report.counts["exploration_planet"]["deleted"], 1)
+        self.assertEqual(report.stale, [])
+        self.assertEqual(ExplorationPlanet.select().count(), 1)
+        self.assertEqual([x.name for x in ExplorationAction.select()], ["Dig", "Explore"])
+
+    def test_referenced_location_is_deactivated(self):
+        self.run_import()
+        cave = self.location("Cave")
+        cave.active = True
+        cave.save()
+        human_id = Human.insert(user_id=1).execute()
+        pigeon_id = Pigeon.insert(name="McPigeon", human=human_id).execute()
+        now = datetime.datetime.utcnow()
+        SpaceExploration.insert(location=cave, pigeon=pigeon_id, start_date=now, arrival_date=now,
+                                actions_remaining=0, total_actions=3).execute()
+
+        raw = copy.deepcopy(RAW)
+        raw["planets"][0]["locations"].pop()
+        report = self.run_import(raw)
+        self.assertEqual(report.counts["exploration_planet_location"], {"inserted": 0, "updated": 1, "deleted": 0})
+        self.assertEqual(report.stale, ["ExplorationPlanetLocation(1, Cave)"])
+        self.assertFalse(self.location("Cave").active)
+        # nothing points at the action, it goes either way.
+        self.assertFalse(ExplorationAction.select().where(ExplorationAction.name == "Explore").exists())
+
+        report = self.run_import(raw)
+        self.assertFalse(report.changed)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,141 @@
+import functools
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, List, Optional
+
+_missing = object()
+
+
+class CacheStats:
+    __slots__ = ("hits", "misses", "evictions", "expirations")
+
+    def __init__(self):
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    @property
+    def hit_ratio(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    def to_dict(self) -> dict:
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+        }
+
+
+class FunctionCache:
+    """LRU store for a single memoized function, entries optionally expire after `ttl` seconds."""
+
+    def __init__(self, name: str, namespace: Optional[str], max_size: int = 128, ttl: Optional[float] = None):
+        self.name = name
+        self.namespace = namespace
+        self.max_size = max_size
+        self.ttl = ttl
+        self.stats = CacheStats()
+        self._entries: OrderedDict = OrderedDict()
+        self._lock = threading.RLock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key, _missing)
+            if entry is _missing:
+                self.stats.misses += 1
+                return _missing
+
+            value, expires_at = entry
+            if expires_at is not None and expires_at <= time.monotonic():
+                del self._entries[key]
+                self.stats.expirations += 1
+                self.stats.misses += 1
+                return _missing
+
+            self._entries.move_to_end(key)
+            self.stats.hits += 1
+            return value
+
+    def set(self, key, value):
+        expires_at = time.monotonic() + self.ttl if self.ttl is not None else None
+        with self._lock:
+            self._entries[key] = (value, expires_at)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.stats.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+class Cache:
+    """Memoization decorator factory, every decorated function gets its own bounded LRU store."""
+
+    def __init__(self, default_max_size: int = 128, default_ttl: Optional[float] = None):
+        self.default_max_size = default_max_size
+        self.default_ttl = default_ttl
+        self._functions: Dict[str, FunctionCache] = {}
+
+    @staticmethod
+    def _make_key(args, kwargs):
+        key = args
+        if kwargs:
+            key += (_missing,) + tuple(sorted(kwargs.items()))
+        hash(key)
+        return key
+
+    def __call__(self, category: str = None, max_size: int = None, ttl: float = None):
+        def wrapper(func):
+            name = f"{func.__module__}.{func.__qualname__}"
+            store = FunctionCache(
+                name,
+                category,
+                max_size=max_size or self.default_max_size,
+                ttl=ttl if ttl is not None else self.default_ttl,
+            )
+            self._functions[name] = store
+
+            @functools.wraps(func)
+            def decorator(*args, **kwargs):
+                try:
+                    key = self._make_key(args, kwargs)
+                except TypeError:
+                    store.stats.misses += 1
+                    return func(*args, **kwargs)
+
+                cached = store.get(key)
+                if cached is not _missing:
+                    return cached
+                result = func(*args, **kwargs)
+                if result is not None:
+                    store.set(key, result)
+                return result
+
+            decorator.cache = store
+            return decorator
+
+        return wrapper
+
+    def invalidate(self, category: str = None):
+        """Clears every function in `category`, or everything when no category is given."""
+        for store in self.functions(category):
+            store.clear()
+
+    def functions(self, category: str = None) -> List[FunctionCache]:
+        return [x for x in self._functions.values() if category is None or x.namespace == category]
+
+    def stats(self) -> Dict[str, dict]:
+        return {x.name: {"namespace": x.namespace, "size": len(x), **x.stats.to_dict()} for x in self.functions()}
+
+
+# the instance `config.cache` is created with, so functions memoized at import time are in `cachestats` too.
+shared_cache = Cache()
@@ -0,0 +1,53 @@
+import threading
+from typing import Dict, Optional, Set
+
+import emoji
+import pycountry
+
+from src.utils.cache import shared_cache
+
+
+class LookupTable:
+    """
+    Code -> pycountry object table, built once on first use and shared by every field using it.
+    Keys are lowercased, pycountry's own `get` is case insensitive as well.
+    """
+
+    def __init__(self, database, attribute: str):
+        self._database = database
+        self._attribute = attribute
+        self._table: Optional[Dict[str, object]] = None
+        self._lock = threading.Lock()
+
+    @property
+    def table(self) -> Dict[str, object]:
+        if self._table is None:
+            with self._lock:
+                if self._table is None:
+                    self._table = {getattr(x, self._attribute).lower(): x
+                                   for x in self._database if hasattr(x, self._attribute)}
+        return self._table
+
+    def decode(self, code: str):
+        return self.table.get(code.lower())
+
+    def decode_many(self, value: str, separator: str = ";") -> Set[object]:
+        table = self.table
+        return {table.get(x.lower()) for x in value.split(separator)}
+
+    def encode(self, value) -> str:
+        return getattr(value, self._attribute)
+
+
+languages = LookupTable(pycountry.languages, "alpha_2")
+currencies = LookupTable(pycountry.currencies, "alpha_3")
+
+
+@shared_cache(category="codecs", max_size=4096)
+def emojize(value: str) -> str:
+    return emoji.emojize(value)
+
+
+@shared_cache(category="codecs", max_size=4096)
+def demojize(value: str) -> str:
+    return emoji.demojize(value)
@@ -1,4 +1,6 @@
 import random
+import threading
+from typing import Dict, List
 
 import pycountry
 from countryinfo import CountryInfo
@@ -20,7 +22,8 @@ class Country(CountryInfo):
         except KeyError:
             raise CountryNotFound("Not found.")
 
-        self._country = pycountry.countries.get(alpha_2=iso["alpha2"])
+        self._alpha_2 = iso["alpha2"]
+        self._country = pycountry.countries.get(alpha_2=self._alpha_2)
 
         self._covid_status = None
 
@@ -43,22 +46,22 @@ class Country(CountryInfo):
 
     @property
     def alpha_2(self):
-        return self.iso()["alpha2"]
+        return self._alpha_2
 
     def __str__(self):
         return self.alpha_2
 
     @classmethod
     def from_alpha_2(cls, alpha_2):
-        return cls(alpha_2)
+        return countries.get(alpha_2)
 
     @classmethod
     def from_alpha_3(cls, alpha_3):
-        return cls(alpha_3)
+        return countries.find(alpha_3)
 
     @classmethod
     def from_name(cls, name):
-        return cls(name)
+        return countries.find(name)
 
     def flag(self):
         return f"https://www.countryflags.io/{self.alpha_2.lower()}/flat/64.png"
@@ -69,16 +72,75 @@ class Country(CountryInfo):
 
     @classmethod
     def random(cls):
-        alpha_2 = None
-        countries = list(pycountry.countries)
-        while alpha_2 is None:
-            alpha_2 = random.choice(countries).alpha_2
+        return random.choice(countries.travelable())
+
+
+class CountryRegistry:
+    """
+    One shared Country per alpha-2 code for the whole process, so rows, waiters and travel activities
+    don't each reload the country data. The instances are shared, treat them as read-only.
+    """
+
+    def __init__(self):
+        self._countries: Dict[str, Country] = {}
+        self._missing = set()
+        self._travelable: List[Country] = None
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._countries)
+
+    def get(self, alpha_2: str) -> Country:
+        alpha_2 = alpha_2.upper()
+        country = self._countries.get(alpha_2)
+        if country is not None:
+            return country
+        if alpha_2 in self._missing:
+            raise CountryNotFound("Not found.")
+
+        with self._lock:
+            country = self._countries.get(alpha_2)
+            if country is None:
+                try:
+                    country = Country(alpha_2)
+                except (CountryNotFound, LookupError):
+                    self._missing.add(alpha_2)
+                    raise CountryNotFound("Not found.")
+                self._countries[alpha_2] = country
+            return country
+
+    def find(self, argument: str) -> Country:
+        """Looks up a name, alpha-2 or alpha-3 code (or anything else countryinfo understands)."""
+        try:
+            return self.get(pycountry.countries.lookup(argument).alpha_2)
+        except LookupError:
+            pass
+        try:
+            country = Country(argument)
+        except LookupError:
+            raise CountryNotFound("Not found.")
+        return self.get(country.alpha_2)
+
+    def travelable(self) -> List[Country]:
+        """Countries with a known capital location, the ones pigeons can fly to."""
+        if self._travelable is None:
+            self.load()
+        return self._travelable
+
+    def load(self):
+        """Builds every country up front, called once at startup."""
+        travelable = []
+        for item in pycountry.countries:
             try:
-                CountryInfo(alpha_2).capital_latlng()
-            except KeyError:
-                alpha_2 = None
+                country = self.get(item.alpha_2)
+                country.capital_latlng()
+            except (CountryNotFound, KeyError, LookupError):
+                continue
+            travelable.append(country)
+        self._travelable = travelable
+
 
-        return cls.from_alpha_2(alpha_2)
+countries = CountryRegistry()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,100 @@
+import bisect
+import itertools
+import random
+from typing import Generic, List, Sequence, TypeVar, Union
+
+T = TypeVar("T")
+
+
+class AliasTable(Generic[T]):
+    """
+    Walker / Vose alias table: O(n) to build, O(1) per weighted draw.
+    Items with a weight of zero or less can never be drawn.
+    """
+
+    __slots__ = ("items", "_probability", "_alias")
+
+    def __init__(self, items: Sequence[T], weights: Sequence[float]):
+        pairs = [(x, float(w)) for x, w in zip(items, weights) if w > 0]
+        if not pairs:
+            raise ValueError("An alias table needs at least one item with a positive weight.")
+
+        self.items: List[T] = [x for x, _ in pairs]
+        count = len(pairs)
+        total = sum(w for _, w in pairs)
+        scaled = [w * count / total for _, w in pairs]
+
+        self._probability = [1.0] * count
+        self._alias = list(range(count))
+        small = [i for i, x in enumerate(scaled) if x < 1.0]
+        large = [i for i, x in enumerate(scaled) if x >= 1.0]
+        while small and large:
+            less, more = small.pop(), large.pop()
+            self._probability[less] = scaled[less]
+            self._alias[less] = more
+            scaled[more] = scaled[more] + scaled[less] - 1.0
+            (small if scaled[more] < 1.0 else large).append(more)
+        # whatever is left is 1 up to float rounding.
+        for i in small + large:
+            self._probability[i] = 1.0
+
+    def __len__(self):
+        return len(self.items)
+
+    def draw(self, rng: random.Random = None) -> T:
+        # one random number: the integer part picks the column, the fraction decides between it and its alias.
+        u = (rng or random).random() * len(self.items)
+        i = int(u)
+        return self.items[i] if u - i < self._probability[i] else self.items[self._alias[i]]
+
+    def draw_many(self, k: int, rng: random.Random = None) -> List[T]:
+        rand = (rng or random).random
+        items, probability, alias = self.items, self._probability, self._alias
+        count = len(items)
+        drawn = []
+        for _ in range(k):
+            u = rand() * count
+            i = int(u)
+            drawn.append(items[i] if u - i < probability[i] else items[alias[i]])
+        return drawn
+
+
+class CumulativeTable(Generic[T]):
+    """
+    Cumulative weights searched with bisect: O(n) to build, O(log n) per draw.
+    For small distributions that's cheaper than an alias table. Items with a weight of zero or less can never be drawn.
+    """
+
+    __slots__ = ("items", "_cumulative", "_total")
+
+    def __init__(self, items: Sequence[T], weights: Sequence[float]):
+        pairs = [(x, float(w)) for x, w in zip(items, weights) if w > 0]
+        if not pairs:
+            raise ValueError("A cumulative table needs at least one item with a positive weight.")
+
+        self.items: List[T] = [x for x, _ in pairs]
+        self._cumulative = list(itertools.accumulate(w for _, w in pairs))
+        self._total = self._cumulative[-1]
+
+    def __len__(self):
+        return len(self.items)
+
+    def draw(self, rng: random.Random = None) -> T:
+        rng = rng or random
+        return self.items[bisect.bisect_right(self._cumulative, rng.random() * self._total, 0, len(self.items) - 1)]
+
+    def draw_many(self, k: int, rng: random.Random = None) -> List[T]:
+        return (rng or random).choices(self.items, cum_weights=self._cumulative, k=k)
+
+
+WeightedTable = Union[AliasTable, CumulativeTable]
+
+# below this many items a bisect over the cumulative weights is faster in CPython than an alias lookup.
+CUMULATIVE_LIMIT = 64
+
+
+def weighted_table(items: Sequence[T], weights: Sequence[float]) -> WeightedTable:
+    """Compiles a distribution once into whichever table draws from it fastest."""
+    if len(items) <= CUMULATIVE_LIMIT:
+        return CumulativeTable(items, weights)
+    return AliasTable(items, weights)
@@ -84,6 +84,22 @@ class Winnings:
     def to_dict(self):
         return {x.name: x.info or x.amount for x in self._stats}
 
+    @classmethod
+    def of(cls, gold: int = 0, health: int = 0, happiness: int = 0, experience: int = 0, cleanliness: int = 0,
+           food: int = 0, item: Item = None) -> 'Winnings':
+        """The winnings of a scenario row, stats that amount to nothing are left out."""
+        stats = [
+            HumanStat.gold(gold),
+            PigeonStat.health(health),
+            PigeonStat.happiness(happiness),
+            PigeonStat.experience(experience),
+            PigeonStat.cleanliness(cleanliness),
+            PigeonStat.food(food)
+        ]
+        if item is not None:
+            stats.append(HumanStat.item(item))
+        return cls(*[x for x in stats if x.amount])
+
     def add_stat(self, stat: Stat):
         self._stats.append(stat)
 
@@ -0,0 +1,58 @@
+import re
+from typing import Callable, List, Mapping, Optional, Tuple, Union
+
+from src.utils.cache import shared_cache
+
+# anything between square brackets, e.g. [name] or [Their2]. Matching is case insensitive.
+_placeholder = re.compile(r"\[[^\[\]]+\]")
+
+# a literal piece of text, or (lowercased placeholder, placeholder as written).
+Token = Union[str, Tuple[str, str]]
+# gets the placeholder as written, so it can match its capitalization.
+Getter = Callable[[str], str]
+
+
+class Template:
+    """A text split into literals and placeholders once, rendered with a single pass over the tokens."""
+
+    __slots__ = ("text", "tokens", "has_placeholders")
+
+    def __init__(self, text: str):
+        self.text = text
+        self.tokens: List[Token] = []
+        position = 0
+        for match in _placeholder.finditer(text):
+            if match.start() > position:
+                self.tokens.append(text[position:match.start()])
+            raw = match.group()
+            self.tokens.append((raw.lower(), raw))
+            position = match.end()
+        if position < len(text):
+            self.tokens.append(text[position:])
+        self.has_placeholders = any(not isinstance(x, str) for x in self.tokens)
+
+    def render(self, values: Mapping[str, Getter]) -> str:
+        """Fills in the placeholders `values` has a getter for, unknown ones are left as written."""
+        parts = []
+        for token in self.tokens:
+            if isinstance(token, str):
+                parts.append(token)
+                continue
+            key, raw = token
+            getter = values.get(key)
+            parts.append(raw if getter is None else getter(raw))
+        return "".join(parts)
+
+
+@shared_cache(category="templates", max_size=4096)
+def compile(text: str) -> Template:
+    return Template(text)
+
+
+def render(text: Optional[str], values: Mapping[str, Getter]) -> Optional[str]:
+    if not text or not values:
+        return text
+    template = compile(text)
+    if not template.has_placeholders:
+        return text
+    return template.render(values)
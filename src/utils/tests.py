@@ -0,0 +1,269 @@
+import collections
+import math
+import os
+import random
+import re
+import unittest
+
+import emoji
+import pycountry
+import yaml
+
+from src.utils import codecs, template
+from src.utils.cache import shared_cache
+from src.utils.country import CountryNotFound, CountryRegistry
+from src.utils.sampling import AliasTable, CumulativeTable, CUMULATIVE_LIMIT, weighted_table
+
+
+class LanguageCodecTest(unittest.TestCase):
+    def test_decode_matches_pycountry(self):
+        for language in pycountry.languages:
+            if not hasattr(language, "alpha_2"):
+                continue
+            for code in (language.alpha_2, language.alpha_2.upper()):
+                self.assertIs(codecs.languages.decode(code), pycountry.languages.get(alpha_2=code))
+
+    def test_round_trip(self):
+        for language in pycountry.languages:
+            if hasattr(language, "alpha_2"):
+                self.assertEqual(codecs.languages.encode(codecs.languages.decode(language.alpha_2)), language.alpha_2)
+
+    def test_unknown(self):
+        self.assertIsNone(codecs.languages.decode("zz"))
+        self.assertIsNone(pycountry.languages.get(alpha_2="zz"))
+
+
+class CurrencyCodecTest(unittest.TestCase):
+    def test_decode_matches_pycountry(self):
+        for currency in pycountry.currencies:
+            code = currency.alpha_3
+            self.assertIs(codecs.currencies.decode(code), pycountry.currencies.get(alpha_3=code))
+
+    def test_decode_many_matches_field(self):
+        for value in ("EUR", "EUR;USD", "USD;EUR;JPY", "eur;usd", "EUR;XXX;ZZZ"):
+            expected = set(pycountry.currencies.get(alpha_3=x) for x in value.split(";"))
+            self.assertEqual(codecs.currencies.decode_many(value), expected)
+
+    def test_round_trip(self):
+        value = {pycountry.currencies.get(alpha_3=x) for x in ("EUR", "USD", "GBP")}
+        encoded = ";".join(set(codecs.currencies.encode(x) for x in value))
+        self.assertEqual(codecs.currencies.decode_many(encoded), value)
+
+    def test_decode_many_returns_new_set(self):
+        first = codecs.currencies.decode_many("EUR")
+        first.add(None)
+        self.assertEqual(codecs.currencies.decode_many("EUR"), {pycountry.currencies.get(alpha_3="EUR")})
+
+
+class EmojiCodecTest(unittest.TestCase):
+    texts = [
+        "",
+        "plain text",
+        "Hello 👋 how are you? 🐦🐦",
+        ":pinching_hand:",
+        "mixed :thumbs_up: and 🎉",
+        ":not_an_emoji: stays",
+        "🇳🇱 flags 🏳️‍🌈",
+    ]
+
+    def test_matches_emoji(self):
+        samples = self.texts + list(emoji.EMOJI_DATA)[::25]
+        for text in samples:
+            self.assertEqual(codecs.demojize(text), emoji.demojize(text))
+            self.assertEqual(codecs.emojize(text), emoji.emojize(text))
+            demojized = emoji.demojize(text)
+            self.assertEqual(codecs.emojize(demojized), emoji.emojize(demojized))
+
+    def test_round_trip(self):
+        for text in self.texts:
+            self.assertEqual(codecs.emojize(codecs.demojize(text)), emoji.emojize(emoji.demojize(text)))
+
+    def test_cached(self):
+        codecs.demojize("cached 🐦")
+        hits = codecs.demojize.cache.stats.hits
+        codecs.demojize("cached 🐦")
+        self.assertEqual(codecs.demojize.cache.stats.hits, hits + 1)
+
+    def test_shared_cache(self):
+        self.assertIn(codecs.demojize.cache, shared_cache.functions("codecs"))
+        codecs.demojize("cached 🐦")
+        shared_cache.invalidate("codecs")
+        self.assertEqual(len(codecs.demojize.cache), 0)
+
+
+def _scenario_texts():
+    path = os.path.join(os.path.dirname(__file__), "..", "..", "resources", "scenarios", "scenarios.yml")
+    with open(path, encoding="utf-8") as file:
+        raw = yaml.safe_load(file)
+    return [scenario["text"]
+            for planet in raw["planets"]
+            for location in planet["locations"]
+            for action in location["actions"]
+            for scenario in action["scenarios"]]
+
+
+def _with_case(placeholder: str, value: str) -> str:
+    if placeholder.isupper():
+        return value.upper()
+    elif placeholder[1].isupper():
+        return value.capitalize()
+    return value
+
+
+def _reference_format(values: dict, text: str) -> str:
+    """The regex per placeholder implementation `format_placeholders` used before templates."""
+    for placeholder, value in values.items():
+        pattern = re.compile(re.escape(placeholder), re.IGNORECASE)
+        for match in pattern.findall(text):
+            text = text.replace(match, _with_case(match, value), 1)
+    return text
+
+
+class TemplateTest(unittest.TestCase):
+    values = {
+        "[name]": "McPigeon",
+        "[they]": "she",
+        "[them]": "her",
+        "[their]": "her",
+        "[theirs]": "hers",
+        "[themselves]": "herself",
+        "[name2]": "Bob",
+        "[they2]": "they",
+        "[them2]": "them",
+        "[their2]": "their",
+        "[theirs2]": "theirs",
+        "[themselves2]": "themselves",
+    }
+
+    @classmethod
+    def setUpClass(cls):
+        cls.getters = {k: (lambda raw, value=v: _with_case(raw, value)) for k, v in cls.values.items()}
+        cls.texts = []
+        for text in _scenario_texts():
+            cls.texts.extend([
+                text,
+                text.replace("Your pigeon", "[Name]").replace("your pigeon", "[name]"),
+                text.replace("Your pigeon", "[NAME]").replace("your", "[their]"),
+                f"{text} [They] hit [them2] with [THEIR] wing, [name2] hurts [themselves2]. [unknown] [name]",
+                f"[name][name2][nAmE] {text} [[their]] [theirs]",
+            ])
+
+    def test_scenarios_file_has_texts(self):
+        self.assertGreater(len(_scenario_texts()), 0)
+
+    def test_matches_reference(self):
+        for text in self.texts:
+            self.assertEqual(template.render(text, self.getters), _reference_format(self.values, text), text)
+
+    def test_without_placeholders(self):
+        self.assertIsNone(template.render(None, self.getters))
+        self.assertEqual(template.render("", self.getters), "")
+        self.assertEqual(template.render("[name]", {}), "[name]")
+        self.assertFalse(template.compile("no placeholders here").has_placeholders)
+
+    def test_compiled_once(self):
+        text = "[Name] flies back to [their] nest."
+        self.assertIs(template.compile(text), template.compile(text))
+        self.assertEqual(template.compile(text).tokens,
+                         [("[name]", "[Name]"), " flies back to ", ("[their]", "[their]"), " nest."])
+
+    def test_rendered_twice(self):
+        # the second pass renders from the cached templates.
+        expected = [_reference_format(self.values, x) for x in self.texts]
+        for _ in range(2):
+            self.assertEqual([template.render(x, self.getters) for x in self.texts], expected)
+        self.assertIn(template.compile.cache, shared_cache.functions("templates"))
+
+
+def _chi_square_limit(degrees: int, z: float = 3.09) -> float:
+    """Wilson-Hilferty approximation of the chi-square critical value, z=3.09 is p=0.001."""
+    h = 2 / (9 * degrees)
+    return degrees * (1 - h + z * math.sqrt(h)) ** 3
+
+
+class SamplingTest(unittest.TestCase):
+    draws = 60000
+    distributions = [
+        [1, 1],
+        [17, 15, 15, 10, 5],
+        [0.5, 0.25, 0.125, 0.125],
+        [1000, 1, 1, 1],
+        [3, 0, 7, 0, 1],
+        [random.Random(7).randint(1, 50) for _ in range(200)],
+    ]
+    tables = (AliasTable, CumulativeTable)
+
+    def assert_matches_weights(self, weights, drawn):
+        total = sum(w for w in weights if w > 0)
+        counts = collections.Counter(drawn)
+        chi_square = 0.0
+        degrees = -1
+        for i, weight in enumerate(weights):
+            if weight <= 0:
+                self.assertNotIn(i, counts)
+                continue
+            expected = len(drawn) * weight / total
+            chi_square += (counts[i] - expected) ** 2 / expected
+            degrees += 1
+        if degrees > 0:
+            self.assertLess(chi_square, _chi_square_limit(degrees), weights)
+
+    def test_single_draws_match_weights(self):
+        for table_type in self.tables:
+            for weights in self.distributions:
+                table = table_type(range(len(weights)), weights)
+                rng = random.Random(1)
+                self.assert_matches_weights(weights, [table.draw(rng) for _ in range(self.draws)])
+
+    def test_batched_draws_match_weights(self):
+        for table_type in self.tables:
+            for weights in self.distributions:
+                table = table_type(range(len(weights)), weights)
+                self.assert_matches_weights(weights, table.draw_many(self.draws, random.Random(2)))
+
+    def test_seeded_rng_is_reproducible(self):
+        for table_type in self.tables:
+            table = table_type("abcde", [17, 15, 15, 10, 5])
+            self.assertEqual(table.draw_many(100, random.Random(3)), table.draw_many(100, random.Random(3)))
+            first = [table.draw(random.Random(4)) for _ in range(10)]
+            self.assertEqual(len(set(first)), 1)
+
+    def test_needs_a_positive_weight(self):
+        for table_type in self.tables:
+            with self.assertRaises(ValueError):
+                table_type("ab", [0, -1])
+
+    def test_weighted_table(self):
+        self.assertIsInstance(weighted_table("abc", [1, 2, 3]), CumulativeTable)
+        large = list(range(CUMULATIVE_LIMIT + 1))
+        self.assertIsInstance(weighted_table(large, [1] * len(large)), AliasTable)
+
+
+class CountryRegistryTest(unittest.TestCase):
+    def setUp(self):
+        self.countries = CountryRegistry()
+
+    def test_one_instance_per_code(self):
+        country = self.countries.get("NL")
+        self.assertIs(self.countries.get("nl"), country)
+        self.assertEqual(country.alpha_2, "NL")
+        self.assertEqual(len(self.countries), 1)
+
+    def test_missing_code_is_cached(self):
+        with self.assertRaises(CountryNotFound):
+            self.countries.get("XX")
+        self.assertIn("XX", self.countries._missing)
+        with self.assertRaises(CountryNotFound):
+            self.countries.get("xx")
+        self.assertEqual(len(self.countries), 0)
+
+    def test_find(self):
+        country = self.countries.get("NL")
+        for argument in ("Netherlands", "NLD", "nl"):
+            self.assertIs(self.countries.find(argument), country)
+        with self.assertRaises(CountryNotFound):
+            self.countries.find("Atlantis")
+
+
+if __name__ == "__main__":
+    unittest.main()